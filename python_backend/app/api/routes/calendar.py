@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime
-from app.db.session import get_db
+from app.core.database import get_async_db
 from app.models.events import Event, EventType, EventRSVP, CalendarSync, NotificationPreference
 from app.services.calendar_service import CalendarService
 from app.services.notification_service import NotificationService
@@ -30,15 +31,15 @@ async def get_google_auth_url():
     return {"url": calendar_service.get_authorization_url()}
 
 @router.post("/callback")
-async def google_callback(code: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def google_callback(code: str, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Handle Google OAuth2 callback and save credentials."""
     try:
         credentials = calendar_service.get_credentials(code)
         
         # Create or update calendar sync settings
-        calendar_sync = db.query(CalendarSync).filter(
+        calendar_sync = (await db.execute(select(CalendarSync).where(
             CalendarSync.user_id == current_user.id
-        ).first()
+        ))).scalars().first()
         
         if not calendar_sync:
             calendar_sync = CalendarSync(
@@ -52,7 +53,7 @@ async def google_callback(code: str, current_user: User = Depends(get_current_us
             calendar_sync.last_sync = datetime.utcnow()
         
         db.add(calendar_sync)
-        db.commit()
+        await db.commit()
         
         return {"message": "Calendar sync enabled successfully"}
     except Exception as e:
@@ -62,17 +63,16 @@ async def google_callback(code: str, current_user: User = Depends(get_current_us
 async def create_event(
     event: EventCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new event and sync with Google Calendar."""
     try:
-        calendar_service.create_calendar_service(
-            db.query(CalendarSync).filter(
-                CalendarSync.user_id == current_user.id
-            ).first().credentials
-        )
+        calendar_sync = (await db.execute(select(CalendarSync).where(
+            CalendarSync.user_id == current_user.id
+        ))).scalars().first()
+        calendar_service.create_calendar_service(calendar_sync.credentials)
         
-        new_event = calendar_service.create_event(event.dict(), current_user.id, db)
+        new_event = await db.run_sync(calendar_service.create_event, event.dict(), current_user.id)
         if not new_event:
             raise HTTPException(status_code=400, detail="Failed to create event")
         
@@ -82,20 +82,19 @@ async def create_event(
 
 @router.put("/events/{event_id}", response_model=EventResponse)
 async def update_event(
-    event_id: str,
+    event_id: int,
     event: EventUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update an event and sync with Google Calendar."""
     try:
-        calendar_service.create_calendar_service(
-            db.query(CalendarSync).filter(
-                CalendarSync.user_id == current_user.id
-            ).first().credentials
-        )
+        calendar_sync = (await db.execute(select(CalendarSync).where(
+            CalendarSync.user_id == current_user.id
+        ))).scalars().first()
+        calendar_service.create_calendar_service(calendar_sync.credentials)
         
-        updated_event = calendar_service.update_event(event_id, event.dict(exclude_unset=True), db)
+        updated_event = await db.run_sync(calendar_service.update_event, event_id, event.dict(exclude_unset=True))
         if not updated_event:
             raise HTTPException(status_code=404, detail="Event not found")
         
@@ -105,19 +104,18 @@ async def update_event(
 
 @router.delete("/events/{event_id}")
 async def delete_event(
-    event_id: str,
+    event_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete an event and remove from Google Calendar."""
     try:
-        calendar_service.create_calendar_service(
-            db.query(CalendarSync).filter(
-                CalendarSync.user_id == current_user.id
-            ).first().credentials
-        )
+        calendar_sync = (await db.execute(select(CalendarSync).where(
+            CalendarSync.user_id == current_user.id
+        ))).scalars().first()
+        calendar_service.create_calendar_service(calendar_sync.credentials)
         
-        if not calendar_service.delete_event(event_id, db):
+        if not await db.run_sync(calendar_service.delete_event, event_id):
             raise HTTPException(status_code=404, detail="Event not found")
         
         return {"message": "Event deleted successfully"}
@@ -130,40 +128,40 @@ async def get_events(
     end_date: Optional[datetime] = None,
     event_type: Optional[EventType] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get events with optional filters."""
     try:
-        query = db.query(Event).filter(Event.organizer_id == current_user.id)
+        query = select(Event).where(Event.organizer_id == current_user.id)
         
         if start_date:
-            query = query.filter(Event.start_time >= start_date)
+            query = query.where(Event.start_time >= start_date)
         if end_date:
-            query = query.filter(Event.end_time <= end_date)
+            query = query.where(Event.end_time <= end_date)
         if event_type:
-            query = query.filter(Event.event_type == event_type)
+            query = query.where(Event.event_type == event_type)
         
-        return query.all()
+        return (await db.execute(query)).scalars().all()
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/events/{event_id}/rsvp", response_model=EventRSVPResponse)
 async def create_rsvp(
-    event_id: str,
+    event_id: int,
     status: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create or update RSVP for an event."""
     try:
-        event = db.query(Event).filter(Event.id == event_id).first()
+        event = await db.get(Event, event_id)
         if not event:
             raise HTTPException(status_code=404, detail="Event not found")
         
-        rsvp = db.query(EventRSVP).filter(
+        rsvp = (await db.execute(select(EventRSVP).where(
             EventRSVP.event_id == event_id,
             EventRSVP.user_id == current_user.id
-        ).first()
+        ))).scalars().first()
         
         if not rsvp:
             rsvp = EventRSVP(
@@ -175,24 +173,24 @@ async def create_rsvp(
         else:
             rsvp.status = status
         
-        db.commit()
+        await db.commit()
         return rsvp
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/events/{event_id}/rsvps", response_model=List[EventRSVPResponse])
 async def get_event_rsvps(
-    event_id: str,
+    event_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all RSVPs for an event."""
     try:
-        event = db.query(Event).filter(Event.id == event_id).first()
+        event = await db.get(Event, event_id)
         if not event:
             raise HTTPException(status_code=404, detail="Event not found")
         
-        return db.query(EventRSVP).filter(EventRSVP.event_id == event_id).all()
+        return (await db.execute(select(EventRSVP).where(EventRSVP.event_id == event_id))).scalars().all()
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -200,13 +198,13 @@ async def get_event_rsvps(
 async def create_notification_preferences(
     preferences: NotificationPreferenceCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create or update notification preferences."""
     try:
-        user_preference = db.query(NotificationPreference).filter(
+        user_preference = (await db.execute(select(NotificationPreference).where(
             NotificationPreference.user_id == current_user.id
-        ).first()
+        ))).scalars().first()
         
         if not user_preference:
             user_preference = NotificationPreference(
@@ -218,7 +216,7 @@ async def create_notification_preferences(
             for key, value in preferences.dict().items():
                 setattr(user_preference, key, value)
         
-        db.commit()
+        await db.commit()
         return user_preference
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -226,13 +224,13 @@ async def create_notification_preferences(
 @router.get("/notifications/preferences", response_model=NotificationPreferenceResponse)
 async def get_notification_preferences(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get user's notification preferences."""
     try:
-        preferences = db.query(NotificationPreference).filter(
+        preferences = (await db.execute(select(NotificationPreference).where(
             NotificationPreference.user_id == current_user.id
-        ).first()
+        ))).scalars().first()
         
         if not preferences:
             raise HTTPException(status_code=404, detail="Notification preferences not found")
@@ -245,13 +243,13 @@ async def get_notification_preferences(
 async def test_notifications(
     background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Test notification delivery."""
     try:
-        preferences = db.query(NotificationPreference).filter(
+        preferences = (await db.execute(select(NotificationPreference).where(
             NotificationPreference.user_id == current_user.id
-        ).first()
+        ))).scalars().first()
         
         if not preferences:
             raise HTTPException(status_code=404, detail="Notification preferences not found")
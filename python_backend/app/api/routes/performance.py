@@ -1,273 +1,305 @@
 from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, Any, List
-from app.services.performance_analyzer import PerformanceAnalyzer
-from app.models.student import Student
-from app.core.database import get_db
-from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+from app.services.aggregate_store import aggregate_store
+from app.services.analysis_cache import analysis_cache
+from app.services.analysis_service import analysis_service
+from app.services.at_risk_sweep import at_risk_sweep
+from app.services.cohort_ranks import cohort_rank_service
+from app.services.feature_store import feature_store
+from app.services.prediction_engine import prediction_engine
+from app.services.stage_timing import stage_metrics
+from app.services.student_data_loader import student_data_loader, ANALYSIS_FIELDS
+from app.services.task_executor import ExecutorError, analysis_executor
+from app.services.trend_windows import TrendWindowError, resolve_window
+from app.core.database import get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
 
 router = APIRouter()
-analyzer = PerformanceAnalyzer()
+
+# Columns each endpoint reads, per table
+PREDICTION_FIELDS = {
+    'grades': ('course_id', 'score'),
+    'attendance': ('course_id', 'status'),
+    'study_habits': ('subject', 'duration')
+}
+
+TREND_FIELDS = {
+    'grades': ('course_id', 'score', 'date'),
+    'attendance': ('course_id', 'status', 'date'),
+    'study_habits': ('subject', 'duration', 'date')
+}
+
+TREND_SECTIONS = (
+    'grade_analysis.trends', 'attendance_analysis.trends', 'study_habits_analysis.trends',
+    'grade_analysis.features', 'attendance_analysis.features', 'study_habits_analysis.features'
+)
 
 @router.get("/student/{student_id}")
 async def get_student_performance(
     student_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """Get comprehensive performance analysis for a student."""
     try:
         # Fetch student data
-        student = db.query(Student).filter(Student.student_id == student_id).first()
+        student = await db.run_sync(student_data_loader.load_student, student_id)
         if not student:
             raise HTTPException(status_code=404, detail="Student not found")
-        
-        # Prepare student data for analysis
-        student_data = {
-            'student_id': student.student_id,
-            'name': student.name,
-            'major': student.major,
-            'academic_year': student.academic_year,
-            'grades': [
-                {
-                    'course_id': grade.course_id,
-                    'score': grade.score,
-                    'max_score': grade.max_score,
-                    'grade_type': grade.grade_type,
-                    'date': grade.date.isoformat()
-                }
-                for grade in student.grades
-            ],
-            'attendance': [
-                {
-                    'date': attendance.date.isoformat(),
-                    'status': attendance.status,
-                    'course_id': attendance.course_id
-                }
-                for attendance in student.attendance
-            ],
-            'assignments': [
-                {
-                    'course_id': assignment.course_id,
-                    'title': assignment.title,
-                    'status': assignment.status,
-                    'submission_date': assignment.submission_date.isoformat() if assignment.submission_date else None
-                }
-                for assignment in student.assignments
-            ],
-            'study_habits': [
-                {
-                    'date': habit.date.isoformat(),
-                    'subject': habit.subject,
-                    'duration': habit.duration,
-                    'activity_type': habit.activity_type,
-                    'notes': habit.notes
-                }
-                for habit in student.study_habits
-            ],
-            'performance_metrics': [
-                {
-                    'date': metric.date.isoformat(),
-                    'metric_type': metric.metric_type,
-                    'value': metric.value,
-                    'metadata': metric.metadata
-                }
-                for metric in student.performance_metrics
-            ]
-        }
-        
+
         # Analyze performance
-        analysis_results = analyzer.analyze_performance(student_data)
-        
+        analysis_results = await analysis_service.analyze(db, student['id'], student_data_loader.loader(student, ANALYSIS_FIELDS))
+
         return {
             'student_info': {
-                'id': student.student_id,
-                'name': student.name,
-                'major': student.major,
-                'academic_year': student.academic_year
+                'id': student['student_id'],
+                'name': student['name'],
+                'major': student['major'],
+                'academic_year': student['academic_year']
             },
             'analysis': analysis_results
         }
-    
+
+    except HTTPException:
+        raise
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/student/{student_id}/predictions")
 async def get_student_predictions(
     student_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """Get performance predictions for a student."""
     try:
         # Fetch student data
-        student = db.query(Student).filter(Student.student_id == student_id).first()
+        student = await db.run_sync(student_data_loader.load_student, student_id)
         if not student:
             raise HTTPException(status_code=404, detail="Student not found")
-        
-        # Prepare student data
-        student_data = {
-            'grades': [
-                {
-                    'course_id': grade.course_id,
-                    'score': grade.score,
-                    'date': grade.date.isoformat()
-                }
-                for grade in student.grades
-            ],
-            'attendance': [
-                {
-                    'date': attendance.date.isoformat(),
-                    'status': attendance.status
-                }
-                for attendance in student.attendance
-            ],
-            'study_habits': [
-                {
-                    'date': habit.date.isoformat(),
-                    'duration': habit.duration,
-                    'activity_type': habit.activity_type
-                }
-                for habit in student.study_habits
-            ],
-            'performance_metrics': [
-                {
-                    'date': metric.date.isoformat(),
-                    'value': metric.value
-                }
-                for metric in student.performance_metrics
-            ]
-        }
-        
-        # Analyze performance and get predictions
-        analysis_results = analyzer.analyze_performance(student_data)
-        
+
+        # Answer from stored features when the aggregates they come from cover the whole history
+        features = await db.run_sync(feature_store.load_frame, student['id'])
+        if not features.empty and await db.run_sync(aggregate_store.is_complete, student['id']):
+            return {
+                'student_id': student_id,
+                'predictions': analysis_service.analyzer.predict_from_features(features)
+            }
+
+        # Only the prediction features are needed
+        analysis_results = await analysis_service.analyze(db, student['id'], student_data_loader.loader(student, PREDICTION_FIELDS), sections=['predictions'])
+
         return {
             'student_id': student_id,
             'predictions': analysis_results['predictions']
         }
-    
+
+    except HTTPException:
+        raise
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/student/{student_id}/improvement-areas")
 async def get_improvement_areas(
     student_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """Get identified improvement areas for a student."""
     try:
         # Fetch student data
-        student = db.query(Student).filter(Student.student_id == student_id).first()
+        student = await db.run_sync(student_data_loader.load_student, student_id)
         if not student:
             raise HTTPException(status_code=404, detail="Student not found")
-        
-        # Prepare student data
-        student_data = {
-            'grades': [
-                {
-                    'course_id': grade.course_id,
-                    'score': grade.score,
-                    'date': grade.date.isoformat()
-                }
-                for grade in student.grades
-            ],
-            'attendance': [
-                {
-                    'date': attendance.date.isoformat(),
-                    'status': attendance.status
-                }
-                for attendance in student.attendance
-            ],
-            'study_habits': [
-                {
-                    'date': habit.date.isoformat(),
-                    'subject': habit.subject,
-                    'duration': habit.duration,
-                    'activity_type': habit.activity_type
-                }
-                for habit in student.study_habits
-            ]
-        }
-        
-        # Analyze performance and get improvement areas
-        analysis_results = analyzer.analyze_performance(student_data)
-        
+
+        # Answer from running aggregates when they cover the whole history
+        aggregates = await db.run_sync(aggregate_store.load_frame, student['id'])
+        if not aggregates.empty and await db.run_sync(aggregate_store.is_complete, student['id']):
+            return {
+                'student_id': student_id,
+                'improvement_areas': analysis_service.analyzer.analyze_aggregates(aggregates)['improvement_areas']
+            }
+
+        # Only course trends and per-course patterns feed the improvement areas
+        analysis_results = await analysis_service.analyze(
+            db,
+            student['id'],
+            student_data_loader.loader(student, ANALYSIS_FIELDS),
+            sections=['improvement_areas']
+        )
+
         return {
             'student_id': student_id,
             'improvement_areas': analysis_results['improvement_areas']
         }
-    
+
+    except HTTPException:
+        raise
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/student/{student_id}/trends")
 async def get_performance_trends(
     student_id: str,
-    period: str = "semester",  # semester, year, all
-    db: Session = Depends(get_db)
+    period: str = "semester",  # semester, year, rolling, current_semester, previous_semester, custom, all
+    days: Optional[int] = None,  # window length for rolling
+    start_date: Optional[datetime] = None,  # custom window bounds
+    end_date: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """Get performance trends for a student over a specified period."""
     try:
+        try:
+            window = resolve_window(period, datetime.utcnow(), days, start_date, end_date)
+        except TrendWindowError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
         # Fetch student data
-        student = db.query(Student).filter(Student.student_id == student_id).first()
+        student = await db.run_sync(student_data_loader.load_student, student_id)
         if not student:
             raise HTTPException(status_code=404, detail="Student not found")
-        
-        # Calculate date range based on period
-        end_date = datetime.utcnow()
-        if period == "semester":
-            start_date = end_date - timedelta(days=90)
-        elif period == "year":
-            start_date = end_date - timedelta(days=365)
-        else:
-            start_date = student.created_at
-        
-        # Prepare student data
-        student_data = {
-            'grades': [
-                {
-                    'course_id': grade.course_id,
-                    'score': grade.score,
-                    'date': grade.date.isoformat()
-                }
-                for grade in student.grades
-                if start_date <= grade.date <= end_date
-            ],
-            'attendance': [
-                {
-                    'date': attendance.date.isoformat(),
-                    'status': attendance.status
-                }
-                for attendance in student.attendance
-                if start_date <= attendance.date <= end_date
-            ],
-            'study_habits': [
-                {
-                    'date': habit.date.isoformat(),
-                    'duration': habit.duration,
-                    'activity_type': habit.activity_type
-                }
-                for habit in student.study_habits
-                if start_date <= habit.date <= end_date
-            ]
-        }
-        
-        # Analyze performance and get trends
-        analysis_results = analyzer.analyze_performance(student_data)
-        
+
+        # Only the trend sections are needed, over rows inside the window,
+        # which the (student_id, date) indexes serve as range scans
+        analysis_results = await analysis_service.analyze(
+            db,
+            student['id'],
+            student_data_loader.loader(student, TREND_FIELDS, window.start, window.end),
+            sections=TREND_SECTIONS,
+            variant=('trends',) + window.variant
+        )
+
         return {
             'student_id': student_id,
             'period': period,
-            'start_date': start_date.isoformat(),
-            'end_date': end_date.isoformat(),
+            'start_date': window.start.isoformat() if window.start else None,
+            'end_date': window.end.isoformat(),
             'trends': {
-                'grade_trend': analysis_results['overall_performance']['grade_trend'],
-                'attendance_trend': analysis_results['attendance_analysis']['trend'],
                 'subject_trends': {
-                    subject: data['trend']
-                    for subject, data in analysis_results['subject_performance'].items()
-                }
+                    course_id: data['trend']
+                    for course_id, data in analysis_results['grade_analysis'].get('trends', {}).items()
+                },
+                'attendance_trend': analysis_results['attendance_analysis'].get('trends', {}).get('weekly_trends', {}),
+                'study_trend': analysis_results['study_habits_analysis'].get('trends', {}).get('weekly_trends', {})
+            },
+            'features': {
+                'grades': analysis_results['grade_analysis'].get('features', {}),
+                'attendance': analysis_results['attendance_analysis'].get('features', {}),
+                'study': analysis_results['study_habits_analysis'].get('features', {})
             }
         }
-    
+
+    except HTTPException:
+        raise
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/student/{student_id}/ranks")
+async def get_student_ranks(
+    student_id: str,
+    db: AsyncSession = Depends(get_async_db)
+) -> Dict[str, Any]:
+    """Get a student's rank and percentile within each of their courses."""
+    try:
+        # Fetch student data
+        student = await db.run_sync(student_data_loader.load_student, student_id)
+        if not student:
+            raise HTTPException(status_code=404, detail="Student not found")
+
+        await cohort_rank_service.ensure_loaded()
+
+        return {
+            'student_id': student_id,
+            'ranks': cohort_rank_service.student_ranks(student['id']),
+            'as_of': cohort_rank_service.refreshed_at
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/courses/{course_id}/cohort")
+async def get_course_cohort(course_id: str) -> Dict[str, Any]:
+    """Get the cohort size, mean and score quantiles of a course."""
+    await cohort_rank_service.ensure_loaded()
+
+    summary = cohort_rank_service.course_summary(course_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    return {**summary, 'as_of': cohort_rank_service.refreshed_at}
+
+@router.get("/courses/{course_id}/percentile")
+async def get_course_percentile(course_id: str, score: float) -> Dict[str, Any]:
+    """Get the rank and percentile a score would hold within a course."""
+    await cohort_rank_service.ensure_loaded()
+
+    result = cohort_rank_service.percentile(course_id, score)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    return {**result, 'as_of': cohort_rank_service.refreshed_at}
+
+@router.get("/courses/{course_id}/at-risk")
+async def get_at_risk_students(
+    course_id: str,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_async_db)
+) -> Dict[str, Any]:
+    """List a course's at-risk students from the latest nightly sweep."""
+    try:
+        students = await db.run_sync(at_risk_sweep.list_at_risk, course_id, min(max(limit, 1), 1000))
+        return {
+            'course_id': course_id,
+            'students': students
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/cache/stats")
+async def get_analysis_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss counters and occupancy of the shared analysis cache."""
+    return analysis_cache.stats()
+
+@router.get("/executor/stats")
+async def get_analysis_executor_stats() -> Dict[str, Any]:
+    """Get queue depth, outcome counters and utilization of the analysis pool."""
+    return analysis_executor.stats()
+
+@router.get("/coalescing/stats")
+async def get_request_coalescing_stats() -> Dict[str, Any]:
+    """Get how many analyses ran and how many concurrent requests joined one already running."""
+    return analysis_service.single_flight.stats()
+
+@router.get("/model/info")
+async def get_prediction_model_info() -> Dict[str, Any]:
+    """Get the version and holdout metrics of the served prediction model."""
+    return prediction_engine.info()
+
+@router.get("/timing/stats")
+async def get_stage_timing_stats() -> Dict[str, Any]:
+    """Get p50/p90/p99 durations of each analysis and report stage over recent requests."""
+    return stage_metrics.stats()
+
+@router.get("/predictions/batching/stats")
+async def get_prediction_batching_stats() -> Dict[str, Any]:
+    """Get batch size and latency histograms of the prediction micro-batcher."""
+    return analysis_service.batcher.stats()
+
+@router.get("/cohorts/stats")
+async def get_cohort_rank_stats() -> Dict[str, Any]:
+    """Get the size and age of the cohort rank snapshot."""
+    return cohort_rank_service.stats()
+
+@router.get("/at-risk/stats")
+async def get_at_risk_sweep_stats() -> Dict[str, Any]:
+    """Get the outcome of this process's latest at-risk sweep."""
+    return {'last_run': at_risk_sweep.last_run}
@@ -1,262 +1,284 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, Any, List
-from app.services.report_generator import ReportGenerator
-from app.services.performance_analyzer import PerformanceAnalyzer
-from app.models.student import Student
-from app.core.database import get_db
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import Dict, Any, List, Optional
+from app.schemas.reports import BulkReportRequest
+from app.services.analysis_service import analysis_service
+from app.services.bulk_reports import BULK_FORMATS, bulk_report_service
+from app.services.chart_payload import CHART_FORMATS, chart_templates
+from app.services.pdf_reports import PdfJob, pdf_render_queue
+from app.services.student_data_loader import student_data_loader, ANALYSIS_FIELDS
+from app.services.task_executor import ExecutorError
+from app.core.config import settings
+from app.core.database import get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
+import os
+import re
 
 router = APIRouter()
-report_generator = ReportGenerator()
-analyzer = PerformanceAnalyzer()
+
+# Columns the full report reads, per table
+FULL_REPORT_FIELDS = {
+    'grades': ('course_id', 'score', 'max_score', 'grade_type', 'date'),
+    'attendance': ('course_id', 'status', 'date'),
+    'assignments': ('course_id', 'title', 'status', 'submission_date'),
+    'study_habits': ('subject', 'duration', 'activity_type', 'notes', 'date'),
+    'performance_metrics': ('metric_type', 'value', 'date')
+}
+
+def check_chart_format(charts: str) -> None:
+    """Reject an unknown visualization format with a 400."""
+    if charts not in CHART_FORMATS:
+        raise HTTPException(status_code=400, detail=f"charts must be one of {', '.join(CHART_FORMATS)}")
+
+def resolve_max_points(max_points: Optional[int]) -> int:
+    """Return the requested points per chart series, or the configured default."""
+    if max_points is None:
+        return settings.CHART_MAX_POINTS
+    if max_points < 0:
+        raise HTTPException(status_code=400, detail="max_points must be 0 (no downsampling) or positive")
+    return max_points
 
 @router.get("/student/{student_id}/full-report")
 async def generate_full_report(
     student_id: str,
-    db: Session = Depends(get_db)
+    charts: str = "plotly",  # plotly or compact
+    max_points: Optional[int] = None,  # points per time series, CHART_MAX_POINTS by default
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """Generate a comprehensive performance report for a student."""
     try:
+        check_chart_format(charts)
+        max_points = resolve_max_points(max_points)
+
         # Fetch student data
-        student = db.query(Student).filter(Student.student_id == student_id).first()
+        student = await db.run_sync(student_data_loader.load_student, student_id)
         if not student:
             raise HTTPException(status_code=404, detail="Student not found")
         
-        # Prepare student data
-        student_data = {
-            'student_id': student.student_id,
-            'name': student.name,
-            'major': student.major,
-            'academic_year': student.academic_year,
-            'grades': [
-                {
-                    'course_id': grade.course_id,
-                    'score': grade.score,
-                    'max_score': grade.max_score,
-                    'grade_type': grade.grade_type,
-                    'date': grade.date.isoformat()
-                }
-                for grade in student.grades
-            ],
-            'attendance': [
-                {
-                    'date': attendance.date.isoformat(),
-                    'status': attendance.status,
-                    'course_id': attendance.course_id
-                }
-                for attendance in student.attendance
-            ],
-            'assignments': [
-                {
-                    'course_id': assignment.course_id,
-                    'title': assignment.title,
-                    'status': assignment.status,
-                    'submission_date': assignment.submission_date.isoformat() if assignment.submission_date else None
-                }
-                for assignment in student.assignments
-            ],
-            'study_habits': [
-                {
-                    'date': habit.date.isoformat(),
-                    'subject': habit.subject,
-                    'duration': habit.duration,
-                    'activity_type': habit.activity_type,
-                    'notes': habit.notes
-                }
-                for habit in student.study_habits
-            ],
-            'performance_metrics': [
-                {
-                    'date': metric.date.isoformat(),
-                    'metric_type': metric.metric_type,
-                    'value': metric.value,
-                    'metadata': metric.metadata
-                }
-                for metric in student.performance_metrics
-            ]
-        }
-        
-        # Analyze performance
-        analysis_results = analyzer.analyze_performance(student_data)
-        
-        # Generate report
-        report = report_generator.generate_report(student_data, analysis_results)
+        # Analyze performance and generate report, reusing cached results
+        report = await analysis_service.full_report(db, student['id'], student_data_loader.loader(student, FULL_REPORT_FIELDS), charts, max_points)
         
         return {
             'student_info': {
-                'id': student.student_id,
-                'name': student.name,
-                'major': student.major,
-                'academic_year': student.academic_year
+                'id': student['student_id'],
+                'name': student['name'],
+                'major': student['major'],
+                'academic_year': student['academic_year']
             },
             'report': report
         }
     
+    except HTTPException:
+        raise
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/student/{student_id}/summary-report")
 async def generate_summary_report(
     student_id: str,
-    db: Session = Depends(get_db)
+    charts: str = "plotly",  # plotly or compact
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """Generate a concise summary report for a student."""
     try:
+        check_chart_format(charts)
+
         # Fetch student data
-        student = db.query(Student).filter(Student.student_id == student_id).first()
+        student = await db.run_sync(student_data_loader.load_student, student_id)
         if not student:
             raise HTTPException(status_code=404, detail="Student not found")
         
-        # Prepare student data
-        student_data = {
-            'student_id': student.student_id,
-            'name': student.name,
-            'major': student.major,
-            'academic_year': student.academic_year,
-            'grades': [
-                {
-                    'course_id': grade.course_id,
-                    'score': grade.score,
-                    'date': grade.date.isoformat()
-                }
-                for grade in student.grades
-            ],
-            'attendance': [
-                {
-                    'date': attendance.date.isoformat(),
-                    'status': attendance.status
-                }
-                for attendance in student.attendance
-            ],
-            'study_habits': [
-                {
-                    'date': habit.date.isoformat(),
-                    'duration': habit.duration,
-                    'activity_type': habit.activity_type
-                }
-                for habit in student.study_habits
-            ]
-        }
-        
-        # Analyze performance
-        analysis_results = analyzer.analyze_performance(student_data)
-        
-        # Generate summary report
-        summary_report = report_generator.generate_summary_report(student_data, analysis_results)
+        # Generate summary report from the summary section alone
+        summary_report = await analysis_service.summary_report(db, student['id'], student_data_loader.loader(student, ANALYSIS_FIELDS), charts)
         
         return {
             'student_id': student_id,
             'summary_report': summary_report
         }
     
+    except HTTPException:
+        raise
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/student/{student_id}/recommendations-report")
 async def generate_recommendations_report(
     student_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """Generate a focused report on recommendations for a student."""
     try:
         # Fetch student data
-        student = db.query(Student).filter(Student.student_id == student_id).first()
+        student = await db.run_sync(student_data_loader.load_student, student_id)
         if not student:
             raise HTTPException(status_code=404, detail="Student not found")
         
-        # Prepare student data
-        student_data = {
-            'grades': [
-                {
-                    'course_id': grade.course_id,
-                    'score': grade.score,
-                    'date': grade.date.isoformat()
-                }
-                for grade in student.grades
-            ],
-            'attendance': [
-                {
-                    'date': attendance.date.isoformat(),
-                    'status': attendance.status
-                }
-                for attendance in student.attendance
-            ],
-            'study_habits': [
-                {
-                    'date': habit.date.isoformat(),
-                    'subject': habit.subject,
-                    'duration': habit.duration,
-                    'activity_type': habit.activity_type
-                }
-                for habit in student.study_habits
-            ]
-        }
-        
-        # Analyze performance
-        analysis_results = analyzer.analyze_performance(student_data)
-        
-        # Generate recommendations report
-        recommendations_report = report_generator.generate_recommendations_report(analysis_results)
+        # Generate recommendations report from the improvement areas alone
+        recommendations_report = await analysis_service.recommendations_report(db, student['id'], student_data_loader.loader(student, ANALYSIS_FIELDS))
         
         return {
             'student_id': student_id,
             'recommendations_report': recommendations_report
         }
     
+    except HTTPException:
+        raise
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/student/{student_id}/visualizations")
 async def get_report_visualizations(
     student_id: str,
-    db: Session = Depends(get_db)
+    charts: str = "plotly",  # plotly or compact
+    max_points: Optional[int] = None,  # points per time series, CHART_MAX_POINTS by default
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """Get visualizations for a student's performance report."""
     try:
+        check_chart_format(charts)
+        max_points = resolve_max_points(max_points)
+
         # Fetch student data
-        student = db.query(Student).filter(Student.student_id == student_id).first()
+        student = await db.run_sync(student_data_loader.load_student, student_id)
         if not student:
             raise HTTPException(status_code=404, detail="Student not found")
         
-        # Prepare student data
-        student_data = {
-            'grades': [
-                {
-                    'course_id': grade.course_id,
-                    'score': grade.score,
-                    'date': grade.date.isoformat()
-                }
-                for grade in student.grades
-            ],
-            'attendance': [
-                {
-                    'date': attendance.date.isoformat(),
-                    'status': attendance.status
-                }
-                for attendance in student.attendance
-            ],
-            'study_habits': [
-                {
-                    'date': habit.date.isoformat(),
-                    'subject': habit.subject,
-                    'duration': habit.duration,
-                    'activity_type': habit.activity_type
-                }
-                for habit in student.study_habits
-            ]
-        }
-        
-        # Analyze performance
-        analysis_results = analyzer.analyze_performance(student_data)
-        
-        # Generate report to get visualizations
-        report = report_generator.generate_report(student_data, analysis_results)
+        # Visualizations are drawn from the raw data, so no analysis sections are needed
+        visualizations = await analysis_service.visualizations(db, student['id'], student_data_loader.loader(student, ANALYSIS_FIELDS), charts, max_points)
         
         return {
             'student_id': student_id,
-            'visualizations': report['visualizations']
+            'visualizations': visualizations
         }
     
+    except HTTPException:
+        raise
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) 
+
+@router.get("/chart-templates")
+async def get_chart_templates(request: Request, response: Response) -> Dict[str, Any]:
+    """Get the plotly template and per-chart trace and layout that compact visualizations omit."""
+    templates = chart_templates()
+    etag = f"\"{templates['version']}\""
+    headers = {'ETag': etag, 'Cache-Control': 'public, max-age=86400'}
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return templates
+
+def pdf_job_response(request: Request, job: PdfJob) -> Dict[str, Any]:
+    """Describe a PDF job with links to poll it and download the file."""
+    return {
+        **job.to_dict(),
+        'status_url': str(request.url_for('get_pdf_report_job', job_id=job.id)),
+        'download_url': str(request.url_for('download_pdf_report', job_id=job.id)) if job.status == 'done' else None
+    }
+
+@router.post("/student/{student_id}/pdf", status_code=202)
+async def submit_pdf_report(
+    student_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+) -> Dict[str, Any]:
+    """Queue a PDF of a student's full report, reusing one already rendered for the same data."""
+    try:
+        # Fetch student data
+        student = await db.run_sync(student_data_loader.load_student, student_id)
+        if not student:
+            raise HTTPException(status_code=404, detail="Student not found")
+        
+        job = await pdf_render_queue.submit(db, student, FULL_REPORT_FIELDS)
+        return pdf_job_response(request, job)
+    
+    except HTTPException:
+        raise
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/pdf/stats")
+async def get_pdf_report_stats() -> Dict[str, Any]:
+    """Get PDF job counts, reuse and the render pool's occupancy."""
+    return pdf_render_queue.stats()
+
+@router.get("/pdf/{job_id}")
+async def get_pdf_report_job(job_id: str, request: Request) -> Dict[str, Any]:
+    """Get the status of a PDF job."""
+    job = pdf_render_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="PDF job not found")
+    return pdf_job_response(request, job)
+
+@router.get("/pdf/{job_id}/download")
+async def download_pdf_report(job_id: str) -> FileResponse:
+    """Stream a finished PDF from disk."""
+    job = pdf_render_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="PDF job not found")
+    if job.status != 'done':
+        raise HTTPException(status_code=409, detail=f"PDF job is {job.status}")
+    if not os.path.exists(job.path):
+        raise HTTPException(status_code=410, detail="PDF was replaced by a newer version, submit again")
+    return FileResponse(job.path, media_type='application/pdf', filename=f"report-{job.student['student_id']}.pdf")
+
+@router.post("/bulk")
+async def generate_bulk_reports(
+    request: BulkReportRequest,
+    db: AsyncSession = Depends(get_async_db)
+) -> StreamingResponse:
+    """Stream full reports for a course's students or a list of students, as a ZIP archive or NDJSON."""
+    try:
+        check_chart_format(request.charts)
+        max_points = resolve_max_points(request.max_points)
+        if request.format not in BULK_FORMATS:
+            raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(BULK_FORMATS)}")
+        if (request.course_id is None) == (request.student_ids is None):
+            raise HTTPException(status_code=400, detail="Provide exactly one of course_id or student_ids")
+
+        # Fetch every student row in one query
+        missing = []
+        if request.course_id is not None:
+            students = await db.run_sync(student_data_loader.load_course_students, request.course_id)
+        else:
+            if len(request.student_ids) > settings.BULK_REPORT_MAX_STUDENTS:
+                raise HTTPException(status_code=400, detail=f"At most {settings.BULK_REPORT_MAX_STUDENTS} students per request")
+            students = await db.run_sync(student_data_loader.load_students, request.student_ids)
+            found = {student['student_id'] for student in students}
+            missing = [student_id for student_id in dict.fromkeys(request.student_ids) if student_id not in found]
+        if not students:
+            raise HTTPException(status_code=404, detail="No students found")
+        if len(students) > settings.BULK_REPORT_MAX_STUDENTS:
+            raise HTTPException(status_code=400, detail=f"At most {settings.BULK_REPORT_MAX_STUDENTS} students per request")
+
+        name = re.sub(r'[^A-Za-z0-9_-]+', '-', request.course_id or 'students')
+        filename = f"reports-{name}-{datetime.utcnow():%Y%m%d%H%M%S}.{'zip' if request.format == 'zip' else 'ndjson'}"
+        if request.format == 'zip':
+            body = bulk_report_service.zip(students, FULL_REPORT_FIELDS, request.charts, max_points, missing)
+            media_type = 'application/zip'
+        else:
+            body = bulk_report_service.ndjson(students, FULL_REPORT_FIELDS, request.charts, max_points, missing)
+            media_type = 'application/x-ndjson'
+
+        return StreamingResponse(
+            body,
+            media_type=media_type,
+            headers={'Content-Disposition': f'attachment; filename="{filename}"', 'X-Student-Count': str(len(students))}
+        )
+    
+    except HTTPException:
+        raise
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
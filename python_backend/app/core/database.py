@@ -0,0 +1,49 @@
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Any, AsyncIterator, Dict, Iterator
+from app.core.config import settings
+
+def async_database_url(url: str) -> str:
+    """Return the asyncpg form of a PostgreSQL URL."""
+    parsed = make_url(url)
+    if parsed.drivername in ('postgresql', 'postgresql+psycopg2'):
+        parsed = parsed.set(drivername='postgresql+asyncpg')
+    return parsed.render_as_string(hide_password=False)
+
+def pool_options() -> Dict[str, Any]:
+    """Connection pool settings shared by the sync and async engines."""
+    return {
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_timeout': settings.DB_POOL_TIMEOUT,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+        'echo': settings.DB_ECHO
+    }
+
+# Synchronous engine for scripts, maintenance jobs and benchmarks
+engine = create_engine(settings.DATABASE_URL, **pool_options())
+SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+# Asynchronous engine for the API routes and the scheduler, so queries
+# yield to the event loop instead of blocking it
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL),
+    **pool_options()
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+def get_db() -> Iterator[Session]:
+    """Yield a synchronous session and close it afterwards."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Yield an async session and close it afterwards."""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,7 +1,18 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+import time
 from app.api.routes import performance, reports
 from app.core.config import settings
+from app.core.database import async_engine, engine
+from app.services.aggregate_store import aggregate_store
+from app.services.analysis_cache import analysis_cache
+from app.services.at_risk_sweep import at_risk_sweep
+from app.services.cohort_ranks import cohort_rank_service
+from app.services.feature_store import feature_store
+from app.services.pdf_reports import pdf_render_queue
+from app.services.prediction_engine import prediction_engine
+from app.services import stage_timing
+from app.services.task_executor import analysis_executor
 
 app = FastAPI(
     title="Student Performance Analysis API",
@@ -18,10 +29,70 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def time_request_stages(request: Request, call_next):
+    # Report per-stage durations of analysis and report requests in a Server-Timing header
+    if not settings.STAGE_TIMING_ENABLED:
+        return await call_next(request)
+
+    start = time.perf_counter()
+    with stage_timing.collect() as timings:
+        response = await call_next(request)
+
+    if timings:
+        total = time.perf_counter() - start
+        response.headers['Server-Timing'] = stage_timing.server_timing_header(timings + [('total', total)])
+        stage_timing.stage_metrics.observe(timings, total)
+    return response
+
 # Include routers
 app.include_router(performance.router, prefix="/api/performance", tags=["performance"])
 app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
 
+# Keep per-course running aggregates current as rows are written
+aggregate_store.register()
+
+# Refresh the stored prediction features of the aggregates changed in each flush
+feature_store.register()
+
+# Drop cached analyses for students whose rows are written in this process
+analysis_cache.register()
+
+@app.on_event("startup")
+async def load_prediction_model():
+    # Map the model before the analysis pool forks so workers share it
+    prediction_engine.load()
+
+@app.on_event("startup")
+async def start_cohort_ranks():
+    await cohort_rank_service.start()
+
+@app.on_event("startup")
+async def start_at_risk_sweep():
+    if settings.AT_RISK_SWEEP_ENABLED:
+        await at_risk_sweep.start()
+
+@app.on_event("shutdown")
+async def stop_at_risk_sweep():
+    await at_risk_sweep.stop()
+
+@app.on_event("shutdown")
+async def stop_cohort_ranks():
+    await cohort_rank_service.stop()
+
+@app.on_event("shutdown")
+async def shutdown_analysis_pool():
+    analysis_executor.shutdown()
+
+@app.on_event("shutdown")
+async def shutdown_pdf_render_queue():
+    await pdf_render_queue.shutdown()
+
+@app.on_event("shutdown")
+async def close_database_pools():
+    await async_engine.dispose()
+    engine.dispose()
+
 @app.get("/")
 async def root():
     return {
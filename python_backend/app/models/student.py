@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Index, UniqueConstraint, Boolean
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -23,9 +23,14 @@ class Student(Base):
     assignments = relationship("Assignment", back_populates="student")
     study_habits = relationship("StudyHabit", back_populates="student")
     performance_metrics = relationship("PerformanceMetric", back_populates="student")
+    course_aggregates = relationship("StudentCourseAggregate", back_populates="student")
+    course_features = relationship("StudentCourseFeature", back_populates="student")
 
 class Attendance(Base):
     __tablename__ = "attendance"
+    __table_args__ = (
+        Index("ix_attendance_student_date", "student_id", "date"),  # windowed trend queries
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id"))
@@ -38,6 +43,9 @@ class Attendance(Base):
 
 class Grade(Base):
     __tablename__ = "grades"
+    __table_args__ = (
+        Index("ix_grades_student_date", "student_id", "date"),  # windowed trend queries
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id"))
@@ -68,6 +76,9 @@ class Assignment(Base):
 
 class StudyHabit(Base):
     __tablename__ = "study_habits"
+    __table_args__ = (
+        Index("ix_study_habits_student_date", "student_id", "date"),  # windowed trend queries
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id"))
@@ -82,13 +93,86 @@ class StudyHabit(Base):
 
 class PerformanceMetric(Base):
     __tablename__ = "performance_metrics"
+    __table_args__ = (
+        Index("ix_performance_metrics_type_course_value", "metric_type", "course_id", "value"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id"))
     date = Column(DateTime)
-    metric_type = Column(String)  # overall, subject-specific, etc.
+    metric_type = Column(String)  # overall, subject-specific, at_risk, etc.
+    course_id = Column(String, nullable=True)  # set for per-course metrics
     value = Column(Float)
-    metadata = Column(JSON)  # Additional metrics and context
+    metric_metadata = Column("metadata", JSON)  # Additional metrics and context; `metadata` is reserved by declarative models
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    student = relationship("Student", back_populates="performance_metrics") 
\ No newline at end of file
+    student = relationship("Student", back_populates="performance_metrics") 
+
+class StudentCourseAggregate(Base):
+    __tablename__ = "student_course_aggregates"
+    __table_args__ = (
+        UniqueConstraint("student_id", "course_id", name="uq_student_course_aggregate"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("students.id"), index=True)
+    course_id = Column(String)  # course_id for grades/attendance, subject for study habits
+
+    # Grade running statistics (Welford) and regression sums over row position
+    grade_rows = Column(Integer, default=0)
+    grade_count = Column(Integer, default=0)
+    grade_mean = Column(Float, default=0.0)
+    grade_m2 = Column(Float, default=0.0)
+    grade_min = Column(Float, nullable=True)
+    grade_max = Column(Float, nullable=True)
+    grade_sum_x = Column(Float, default=0.0)
+    grade_sum_y = Column(Float, default=0.0)
+    grade_sum_xy = Column(Float, default=0.0)
+    grade_sum_xx = Column(Float, default=0.0)
+    grade_last = Column(Float, nullable=True)
+    grade_scored_sum_xy = Column(Float, default=0.0)  # same sum over position among scored rows only
+    grade_last_date = Column(DateTime, nullable=True)  # latest grade date folded in
+
+    # Attendance tallies
+    attendance_count = Column(Integer, default=0)
+    present_count = Column(Integer, default=0)
+    absent_count = Column(Integer, default=0)
+
+    # Study time tallies
+    study_sessions = Column(Integer, default=0)
+    study_minutes = Column(Float, default=0.0)
+    hourly_minutes = Column(JSON)  # 24 study-minute totals indexed by hour of day
+    hourly_sessions = Column(JSON)  # 24 session counts indexed by hour of day
+
+    # Set when a folded row is edited or deleted, or a grade arrives out of date order; a rebuild clears it
+    stale = Column(Boolean, default=False)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    student = relationship("Student", back_populates="course_aggregates")
+
+class StudentCourseFeature(Base):
+    __tablename__ = "student_course_features"
+    __table_args__ = (
+        UniqueConstraint("student_id", "course_id", name="uq_student_course_feature"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("students.id"), index=True)
+    course_id = Column(String)  # course_id for grades/attendance, subject for study habits
+
+    # Prediction model inputs, null where the course has no rows in the source
+    grade_mean = Column(Float, nullable=True)
+    grade_std = Column(Float, nullable=True)
+    grade_count = Column(Float, nullable=True)
+    grade_slope = Column(Float, nullable=True)
+    grade_last = Column(Float, nullable=True)
+    attendance_rate = Column(Float, nullable=True)
+    attendance_count = Column(Float, nullable=True)
+    study_minutes = Column(Float, nullable=True)
+    study_session_mean = Column(Float, nullable=True)
+    study_sessions = Column(Float, nullable=True)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    student = relationship("Student", back_populates="course_features")
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from typing import Optional, List
+
+class BulkReportRequest(BaseModel):
+    course_id: Optional[str] = None  # every student with grades or attendance in the course
+    student_ids: Optional[List[str]] = None  # or these students, by external student_id
+    format: str = "zip"  # zip or ndjson
+    charts: str = "compact"  # plotly or compact
+    max_points: Optional[int] = None  # points per time series, CHART_MAX_POINTS by default
@@ -0,0 +1,306 @@
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from typing import Dict, Any, Callable, List, Optional, Tuple
+import pandas as pd
+import sys
+import time
+import logging
+from app.models.student import Attendance, Grade, Student, StudyHabit, StudentCourseAggregate
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_DAY = 24
+
+AGGREGATE_COLUMNS = [
+    'course_id',
+    'grade_rows',
+    'grade_count',
+    'grade_mean',
+    'grade_m2',
+    'grade_min',
+    'grade_max',
+    'grade_sum_x',
+    'grade_sum_y',
+    'grade_sum_xy',
+    'grade_sum_xx',
+    'attendance_count',
+    'present_count',
+    'absent_count',
+    'study_sessions',
+    'study_minutes',
+    'hourly_minutes',
+    'hourly_sessions'
+]
+
+# Columns each history table folds into its aggregate, the course key second
+FOLDED_COLUMNS = {
+    Grade: ('student_id', 'course_id', 'score', 'date'),
+    Attendance: ('student_id', 'course_id', 'status'),
+    StudyHabit: ('student_id', 'subject', 'duration', 'date')
+}
+
+class AggregateStore:
+    """Running per-student, per-course aggregates kept current on every insert.
+
+    Each new grade, attendance or study habit row is folded into its
+    (student, course) record in O(1): Welford mean/variance and regression
+    sums for grades, present/absent tallies for attendance, and study minutes
+    per subject and hour of day. Study habits use their subject as the course
+    key. ``PerformanceAnalyzer.analyze_aggregates`` answers stats, trends and
+    improvement areas from these records without reading the history tables.
+
+    Grade sums follow each row's position in date order. A grade dated
+    before one already folded in, or an edit or deletion of a folded row,
+    cannot be applied in O(1), so its course record is marked ``stale``
+    instead. Only rows inserted while the listener is registered are folded
+    in, so history written before it, or rows deleted through Core
+    statements, also leave a student's records incomplete. ``is_complete``
+    checks the records against the history tables' row counts and for stale
+    courses, and ``backfill`` rebuilds every student's records from their
+    full history.
+    """
+
+    def __init__(self):
+        self._registered = False
+
+    def register(self, session_class=Session):
+        """Fold newly added rows into their aggregates on every flush."""
+        if self._registered:
+            return
+
+        event.listen(session_class, 'before_flush', self._before_flush)
+        self._registered = True
+
+    def _before_flush(self, session: Session, flush_context, instances) -> None:
+        """Apply pending grade, attendance and study habit inserts, and mark the courses of edits and deletions stale."""
+        cache = {}
+        for obj in list(session.new):
+            if isinstance(obj, Grade):
+                self.apply_grade(session, obj, cache)
+            elif isinstance(obj, Attendance):
+                self.apply_attendance(session, obj, cache)
+            elif isinstance(obj, StudyHabit):
+                self.apply_study_habit(session, obj, cache)
+
+        for obj in list(session.dirty) + list(session.deleted):
+            if type(obj) in FOLDED_COLUMNS:
+                for student_id, course_id in self._changed_keys(session, obj, obj in session.deleted):
+                    self._get_aggregate(session, student_id, course_id, cache).stale = True
+
+    def apply_grade(self, db: Session, grade: Grade, cache: Optional[Dict[Tuple[int, str], StudentCourseAggregate]] = None) -> None:
+        """Fold a new grade row into its course aggregate."""
+        aggregate = self._get_aggregate(db, self._student_key(grade), grade.course_id, cache)
+
+        # Position of this row within the course, in date order
+        x = float(aggregate.grade_rows)
+        aggregate.grade_rows += 1
+        if grade.date is not None:
+            if aggregate.grade_last_date is not None and grade.date < aggregate.grade_last_date:
+                aggregate.stale = True
+            else:
+                aggregate.grade_last_date = grade.date
+
+        if grade.score is None:
+            return
+
+        score = float(grade.score)
+        aggregate.grade_count += 1
+        delta = score - aggregate.grade_mean
+        aggregate.grade_mean += delta / aggregate.grade_count
+        aggregate.grade_m2 += delta * (score - aggregate.grade_mean)
+        aggregate.grade_min = score if aggregate.grade_min is None else min(aggregate.grade_min, score)
+        aggregate.grade_max = score if aggregate.grade_max is None else max(aggregate.grade_max, score)
+        aggregate.grade_last = score
+
+        aggregate.grade_sum_x += x
+        aggregate.grade_sum_y += score
+        aggregate.grade_sum_xy += x * score
+        aggregate.grade_sum_xx += x * x
+        aggregate.grade_scored_sum_xy += (aggregate.grade_count - 1) * score
+
+    def apply_attendance(self, db: Session, attendance: Attendance, cache: Optional[Dict[Tuple[int, str], StudentCourseAggregate]] = None) -> None:
+        """Fold a new attendance row into its course aggregate."""
+        aggregate = self._get_aggregate(db, self._student_key(attendance), attendance.course_id, cache)
+
+        aggregate.attendance_count += 1
+        if attendance.status == 'present':
+            aggregate.present_count += 1
+        elif attendance.status == 'absent':
+            aggregate.absent_count += 1
+
+    def apply_study_habit(self, db: Session, habit: StudyHabit, cache: Optional[Dict[Tuple[int, str], StudentCourseAggregate]] = None) -> None:
+        """Fold a new study habit row into its subject aggregate."""
+        aggregate = self._get_aggregate(db, self._student_key(habit), habit.subject, cache)
+        duration = float(habit.duration or 0)
+
+        aggregate.study_sessions += 1
+        aggregate.study_minutes += duration
+
+        if habit.date is not None:
+            # Reassign the lists so the JSON columns register the change
+            hourly_minutes = list(aggregate.hourly_minutes)
+            hourly_sessions = list(aggregate.hourly_sessions)
+            hourly_minutes[habit.date.hour] += duration
+            hourly_sessions[habit.date.hour] += 1
+            aggregate.hourly_minutes = hourly_minutes
+            aggregate.hourly_sessions = hourly_sessions
+
+    def load_frame(self, db: Session, student_id: int) -> pd.DataFrame:
+        """Load a student's aggregates as one row per course."""
+        rows = db.query(*[getattr(StudentCourseAggregate, column) for column in AGGREGATE_COLUMNS]).filter(
+            StudentCourseAggregate.student_id == student_id
+        ).order_by(StudentCourseAggregate.id).all()
+
+        return pd.DataFrame([tuple(row) for row in rows], columns=AGGREGATE_COLUMNS)
+
+    def is_complete(self, db: Session, student_id: int) -> bool:
+        """Return whether a student's aggregates have folded in every one of their history rows, and none is stale."""
+        def total(column):
+            return select(func.coalesce(func.sum(column), 0)).where(StudentCourseAggregate.student_id == student_id).scalar_subquery()
+
+        def count(model, *criteria):
+            return select(func.count()).select_from(model).where(model.student_id == student_id, *criteria).scalar_subquery()
+
+        row = db.execute(select(
+            total(StudentCourseAggregate.grade_rows), count(Grade),
+            total(StudentCourseAggregate.attendance_count), count(Attendance),
+            total(StudentCourseAggregate.study_sessions), count(StudyHabit),
+            count(StudentCourseAggregate, StudentCourseAggregate.stale.is_(True))
+        )).one()
+        return row[0] == row[1] and row[2] == row[3] and row[4] == row[5] and row[6] == 0
+
+    def rebuild_student(self, db: Session, student_id: int) -> None:
+        """Recompute a student's aggregates from the full history tables."""
+        db.query(StudentCourseAggregate).filter(
+            StudentCourseAggregate.student_id == student_id
+        ).delete(synchronize_session=False)
+
+        cache = {}
+        for grade in db.query(Grade).filter(Grade.student_id == student_id).order_by(Grade.date, Grade.id):
+            self.apply_grade(db, grade, cache)
+        for attendance in db.query(Attendance).filter(Attendance.student_id == student_id).order_by(Attendance.id):
+            self.apply_attendance(db, attendance, cache)
+        for habit in db.query(StudyHabit).filter(StudyHabit.student_id == student_id).order_by(StudyHabit.id):
+            self.apply_study_habit(db, habit, cache)
+
+        logger.info(f"Rebuilt {len(cache)} course aggregates for student {student_id}")
+
+    def backfill(self, db: Session, batch_size: int = 100, after_rebuild: Optional[Callable[[Session, int], None]] = None, stale_only: bool = False) -> Dict[str, Any]:
+        """Rebuild every student's aggregates from their full history, committing every ``batch_size`` students.
+
+        ``after_rebuild`` runs after each student's rebuild, for example
+        ``feature_store.rebuild_student`` to refresh the derived features.
+        With ``stale_only``, only students with a stale course are rebuilt.
+        """
+        started = time.perf_counter()
+        if stale_only:
+            query = select(StudentCourseAggregate.student_id).where(StudentCourseAggregate.stale.is_(True)).distinct().order_by(StudentCourseAggregate.student_id)
+        else:
+            query = select(Student.id).order_by(Student.id)
+        student_ids = db.execute(query).scalars().all()
+        for number, student_id in enumerate(student_ids, 1):
+            self.rebuild_student(db, student_id)
+            if after_rebuild is not None:
+                after_rebuild(db, student_id)
+            if number % batch_size == 0:
+                db.commit()
+                logger.info(f"Backfilled aggregates for {number} of {len(student_ids)} students")
+        db.commit()
+
+        return {'students': len(student_ids), 'seconds': time.perf_counter() - started}
+
+    def _changed_keys(self, db: Session, row: Any, deleted: bool) -> List[Tuple[int, str]]:
+        """Return the (student, course) keys a row was folded into and now belongs to, if it changed."""
+        model = type(row)
+        student_column, course_column = FOLDED_COLUMNS[model][:2]
+        state = inspect(row)
+        moved = any(state.attrs[column].history.has_changes() for column in (student_column, course_column))
+        if not deleted and not moved and not any(state.attrs[column].history.has_changes() for column in FOLDED_COLUMNS[model][2:]):
+            return []
+
+        new = (getattr(row, student_column), getattr(row, course_column))
+        if not moved:
+            return [new]
+
+        # The old key may not be loaded, but the row is still unchanged in the database
+        old = db.execute(select(getattr(model, student_column), getattr(model, course_column)).where(model.id == row.id)).first()
+        keys = [tuple(old)] if old is not None else []
+        return keys if deleted or new in keys else keys + [new]
+
+    def _student_key(self, row: Any) -> int:
+        """Resolve the student primary key of a pending row."""
+        if row.student_id is not None:
+            return row.student_id
+        return row.student.id
+
+    def _get_aggregate(self, db: Session, student_id: int, course_id: str, cache: Optional[Dict[Tuple[int, str], StudentCourseAggregate]]) -> StudentCourseAggregate:
+        """Fetch or create the aggregate record for a student and course."""
+        key = (student_id, course_id)
+        if cache is not None and key in cache:
+            return cache[key]
+
+        aggregate = self._lock_aggregate(db, student_id, course_id)
+        if aggregate is None:
+            # Another session may create the same record concurrently; whichever
+            # insert loses does nothing, and both then lock the one row
+            db.execute(
+                self._insert(db).values(**self._empty_aggregate(student_id, course_id)).on_conflict_do_nothing()
+            )
+            aggregate = self._lock_aggregate(db, student_id, course_id)
+
+        if cache is not None:
+            cache[key] = aggregate
+
+        return aggregate
+
+    def _lock_aggregate(self, db: Session, student_id: int, course_id: str) -> Optional[StudentCourseAggregate]:
+        """Select a student's course aggregate, locking it until the transaction ends."""
+        return db.query(StudentCourseAggregate).filter(
+            StudentCourseAggregate.student_id == student_id,
+            StudentCourseAggregate.course_id == course_id
+        ).with_for_update().first()
+
+    def _insert(self, db: Session):
+        """Return the dialect's INSERT construct, which supports ON CONFLICT DO NOTHING."""
+        if db.get_bind().dialect.name == 'sqlite':
+            return sqlite.insert(StudentCourseAggregate)
+        return postgresql.insert(StudentCourseAggregate)
+
+    def _empty_aggregate(self, student_id: int, course_id: str) -> Dict[str, Any]:
+        """Column values of a course aggregate before any row is folded in."""
+        return {
+            'student_id': student_id,
+            'course_id': course_id,
+            'grade_rows': 0,
+            'grade_count': 0,
+            'grade_mean': 0.0,
+            'grade_m2': 0.0,
+            'grade_sum_x': 0.0,
+            'grade_sum_y': 0.0,
+            'grade_sum_xy': 0.0,
+            'grade_sum_xx': 0.0,
+            'grade_scored_sum_xy': 0.0,
+            'grade_last_date': None,
+            'attendance_count': 0,
+            'present_count': 0,
+            'absent_count': 0,
+            'study_sessions': 0,
+            'study_minutes': 0.0,
+            'hourly_minutes': [0.0] * HOURS_PER_DAY,
+            'hourly_sessions': [0] * HOURS_PER_DAY,
+            'stale': False
+        }
+
+aggregate_store = AggregateStore()
+
+def main():
+    from app.core.database import SessionLocal
+    from app.services.feature_store import feature_store
+
+    logging.basicConfig(level=logging.INFO)
+    with SessionLocal() as db:
+        print(aggregate_store.backfill(db, after_rebuild=feature_store.rebuild_student, stale_only='--stale' in sys.argv[1:]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, Optional, Set, Tuple
+import threading
+import time
+from app.core.config import settings
+from app.models.student import Attendance, Grade, StudyHabit
+
+class AnalysisCache:
+    """Size-bounded LRU/TTL cache for analysis and report results.
+
+    Entries are keyed by the student's primary key, a data version and a tag
+    naming what was computed (for example the requested analysis sections).
+    The data version combines the latest ``created_at`` across the student's
+    grades, attendance and study habits with each table's row count, so rows
+    added or deleted by any worker make older entries unreachable. Writes
+    seen by this process also invalidate the student's entries explicitly.
+    Those tables carry no update timestamp, so an in-place edit made by
+    another worker is only picked up once the entry's TTL runs out.
+    """
+
+    def __init__(self, max_entries: int = settings.ANALYSIS_CACHE_MAX_ENTRIES, ttl_seconds: float = settings.ANALYSIS_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[int, Optional[str], Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._keys_by_student: Dict[int, Set[Tuple[int, Optional[str], Hashable]]] = {}
+        self._lock = threading.Lock()
+        self._registered = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def register(self, session_class=Session):
+        """Invalidate cached results when student rows are written."""
+        if self._registered:
+            return
+
+        event.listen(session_class, 'after_flush', self._after_flush)
+        self._registered = True
+
+    def _after_flush(self, session: Session, flush_context) -> None:
+        """Drop entries for students whose grades, attendance or study habits changed."""
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, (Grade, Attendance, StudyHabit)) and obj.student_id is not None:
+                self.invalidate(obj.student_id)
+
+    def data_version(self, db: Session, student_id: int) -> Optional[str]:
+        """Return the latest created_at and the row counts of the student's analysis rows, in one query."""
+        tables = (Grade, Attendance, StudyHabit)
+        row = db.query(
+            *(select(func.max(table.created_at)).where(table.student_id == student_id).scalar_subquery() for table in tables),
+            *(select(func.count()).select_from(table).where(table.student_id == student_id).scalar_subquery() for table in tables)
+        ).one()
+
+        timestamps, counts = row[:len(tables)], row[len(tables):]
+        if not any(counts):
+            return None
+        latest = max((timestamp for timestamp in timestamps if timestamp is not None), default=None)
+        return f"{latest.isoformat() if latest else ''}/{'-'.join(str(count) for count in counts)}"
+
+    def get(self, student_id: int, version: Optional[str], tag: Hashable) -> Tuple[bool, Any]:
+        """Look up an entry, returning (found, value)."""
+        key = (student_id, version, tag)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                self._remove(key)
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, student_id: int, version: Optional[str], tag: Hashable, value: Any) -> None:
+        """Store an entry, evicting the least recently used ones past capacity."""
+        key = (student_id, version, tag)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            self._keys_by_student.setdefault(student_id, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, student_id: int) -> None:
+        """Drop every cached entry for a student."""
+        with self._lock:
+            keys = self._keys_by_student.pop(student_id, set())
+            for key in keys:
+                self._entries.pop(key, None)
+            if keys:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_student.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+    def _remove(self, key: Tuple[int, Optional[str], Hashable]) -> None:
+        """Remove one entry; the caller holds the lock."""
+        self._entries.pop(key, None)
+        student_keys = self._keys_by_student.get(key[0])
+        if student_keys is not None:
+            student_keys.discard(key)
+            if not student_keys:
+                del self._keys_by_student[key[0]]
+
+analysis_cache = AnalysisCache()
@@ -0,0 +1,135 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, Awaitable, Callable, Hashable, Iterable, Optional
+from app.core.config import settings
+from app.services import analysis_tasks
+from app.services.analysis_cache import AnalysisCache, analysis_cache
+from app.services.frame_bundle import FrameBundle
+from app.services.performance_analyzer import PerformanceAnalyzer, DEFAULT_SECTIONS
+from app.services.prediction_batcher import PredictionBatcher, prediction_batcher
+from app.services.single_flight import SingleFlight
+from app.services.stage_timing import stage
+from app.services.task_executor import AnalysisExecutor, analysis_executor
+
+DataLoader = Callable[[], Awaitable[Dict[str, Any]]]
+
+def load_once(load_data: DataLoader) -> DataLoader:
+    """Wrap a data loader so repeated calls share the first load's frame bundle."""
+    loaded = []
+
+    async def load():
+        if not loaded:
+            loaded.append(FrameBundle.of(await load_data()))
+        return loaded[0]
+
+    return load
+
+class AnalysisService:
+    """Shared analysis and report entry point for the API routers.
+
+    Serves results through the versioned analysis cache, so the performance
+    and reports routers reuse each other's work for the same student and data
+    version. Cache misses are computed in the analysis process pool to keep
+    the event loop free, and concurrent misses for the same student, version
+    and result are coalesced into one computation. Prediction-only analyses
+    for different students are micro-batched into one pool task. Callers
+    pass a loader instead of the student's rows, so cache hits and coalesced
+    requests skip the table fetch entirely. A coalesced computation can
+    outlive the request that started it, so loaders read through a session
+    of their own (see ``StudentDataLoader.loader``). The fetched rows become
+    one read-only frame bundle shared by the analysis and report tasks.
+    """
+
+    def __init__(self, cache: AnalysisCache = analysis_cache, executor: AnalysisExecutor = analysis_executor, batcher: PredictionBatcher = prediction_batcher):
+        self.cache = cache
+        self.executor = executor
+        self.batcher = batcher
+        self.single_flight = SingleFlight()
+        self.analyzer = PerformanceAnalyzer()
+
+    async def data_version(self, db: AsyncSession, student_id: int) -> Optional[str]:
+        """Return the cache version for a student's current data."""
+        with stage('db.version'):
+            return await db.run_sync(self.cache.data_version, student_id)
+
+    async def analyze(self, db: AsyncSession, student_id: int, load_data: DataLoader, sections: Optional[Iterable[str]] = None, variant: Hashable = None, version: Optional[str] = None) -> Dict[str, Any]:
+        """Analyze a student, reusing a cached result for the same sections and data.
+
+        ``variant`` distinguishes analyses of a filtered slice of the data,
+        such as a trends window.
+        """
+        sections = DEFAULT_SECTIONS if sections is None else tuple(sections)
+        if version is None:
+            version = await self.data_version(db, student_id)
+
+        async def build():
+            student_data = FrameBundle.of(await load_data())
+            if sections == ('predictions',):
+                return {'predictions': await self.batcher.predict(student_data)}
+            return await self.executor.run(analysis_tasks.analyze_performance, student_data, sections)
+
+        return await self._cached(student_id, version, ('analysis', tuple(sorted(set(sections))), variant), build)
+
+    async def full_report(self, db: AsyncSession, student_id: int, load_data: DataLoader, chart_format: str = 'plotly', max_points: int = settings.CHART_MAX_POINTS) -> Dict[str, Any]:
+        """Build or reuse the full report for a student, with charts in ``chart_format`` and ``max_points`` per series."""
+        version = await self.data_version(db, student_id)
+        load_data = load_once(load_data)
+
+        async def build():
+            student_data = await load_data()
+            analysis_results = await self.analyze(db, student_id, load_data, version=version)
+            return await self.executor.run(analysis_tasks.generate_report, student_data, analysis_results, chart_format, max_points)
+
+        return await self._cached(student_id, version, ('full-report', chart_format, max_points), build)
+
+    async def summary_report(self, db: AsyncSession, student_id: int, load_data: DataLoader, chart_format: str = 'plotly') -> Dict[str, Any]:
+        """Build or reuse the summary report for a student, with charts in ``chart_format``."""
+        version = await self.data_version(db, student_id)
+        load_data = load_once(load_data)
+
+        async def build():
+            student_data = await load_data()
+            analysis_results = await self.analyze(db, student_id, load_data, sections=['summary'], version=version)
+            return await self.executor.run(analysis_tasks.generate_summary_report, student_data, analysis_results, chart_format)
+
+        return await self._cached(student_id, version, ('summary-report', chart_format), build)
+
+    async def recommendations_report(self, db: AsyncSession, student_id: int, load_data: DataLoader) -> Dict[str, Any]:
+        """Build or reuse the recommendations report for a student."""
+        version = await self.data_version(db, student_id)
+
+        async def build():
+            analysis_results = await self.analyze(db, student_id, load_data, sections=['improvement_areas'], version=version)
+            return await self.executor.run(analysis_tasks.generate_recommendations_report, analysis_results)
+
+        return await self._cached(student_id, version, ('recommendations-report',), build)
+
+    async def visualizations(self, db: AsyncSession, student_id: int, load_data: DataLoader, chart_format: str = 'plotly', max_points: int = settings.CHART_MAX_POINTS) -> Dict[str, Any]:
+        """Build or reuse the report visualizations for a student, in ``chart_format`` with ``max_points`` per series."""
+        version = await self.data_version(db, student_id)
+
+        # A cached full report already carries the visualizations
+        found, report = self.cache.get(student_id, version, ('full-report', chart_format, max_points))
+        if found:
+            return report['visualizations']
+
+        async def build():
+            # The charts are drawn from the rows alone, without an analysis
+            student_data = FrameBundle.of(await load_data())
+            return await self.executor.run(analysis_tasks.generate_visualizations, student_data, chart_format, max_points)
+
+        return await self._cached(student_id, version, ('visualizations', chart_format, max_points), build)
+
+    async def _cached(self, student_id: int, version: Optional[str], tag: Hashable, build: Callable[[], Awaitable[Any]]) -> Any:
+        """Return a cached value, or build and store it once for all concurrent callers."""
+        found, value = self.cache.get(student_id, version, tag)
+        if found:
+            return value
+
+        async def build_and_store():
+            value = await build()
+            self.cache.set(student_id, version, tag, value)
+            return value
+
+        return await self.single_flight.run((student_id, version, tag), build_and_store)
+
+analysis_service = AnalysisService()
@@ -0,0 +1,55 @@
+from typing import Dict, Any, Iterable, List, Optional
+from app.core.config import settings
+from app.services.performance_analyzer import PerformanceAnalyzer, DEFAULT_SECTIONS
+from app.services.report_generator import ReportGenerator
+
+# Picklable entry points for the analysis process pool. Each worker process
+# builds its analyzer and report generator once and reuses them for every task.
+_analyzer: Optional[PerformanceAnalyzer] = None
+_report_generator: Optional[ReportGenerator] = None
+
+def get_analyzer() -> PerformanceAnalyzer:
+    """Return this process's analyzer."""
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = PerformanceAnalyzer()
+    return _analyzer
+
+def get_report_generator() -> ReportGenerator:
+    """Return this process's report generator."""
+    global _report_generator
+    if _report_generator is None:
+        _report_generator = ReportGenerator()
+    return _report_generator
+
+def analyze_performance(student_data: Dict[str, Any], sections: Iterable[str]) -> Dict[str, Any]:
+    """Analyze one student's data."""
+    return get_analyzer().analyze_performance(student_data, sections)
+
+def predict_batch(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Generate predictions for a micro-batch of students."""
+    return get_analyzer().predict_batch(batch)
+
+def generate_report(student_data: Dict[str, Any], analysis_results: Dict[str, Any], chart_format: str = 'plotly', max_points: int = settings.CHART_MAX_POINTS) -> Dict[str, Any]:
+    """Build a full report."""
+    return get_report_generator().generate_report(student_data, analysis_results, chart_format, max_points)
+
+def build_full_report(student_data: Dict[str, Any], chart_format: str = 'plotly', max_points: int = settings.CHART_MAX_POINTS) -> Dict[str, Any]:
+    """Analyze one student and build the full report in a single task."""
+    return generate_report(student_data, analyze_performance(student_data, DEFAULT_SECTIONS), chart_format, max_points)
+
+def generate_summary_report(student_data: Dict[str, Any], analysis_results: Dict[str, Any], chart_format: str = 'plotly') -> Dict[str, Any]:
+    """Build a summary report."""
+    return get_report_generator().generate_summary_report(student_data, analysis_results, chart_format)
+
+def generate_recommendations_report(analysis_results: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a recommendations report."""
+    return get_report_generator().generate_recommendations_report(analysis_results)
+
+def generate_visualizations(student_data: Dict[str, Any], chart_format: str = 'plotly', max_points: int = settings.CHART_MAX_POINTS) -> Dict[str, Any]:
+    """Build the report visualizations."""
+    return get_report_generator().generate_visualizations(student_data, chart_format, max_points)
+
+def render_pdf_report(student_info: Dict[str, Any], report: Dict[str, Any], path: str) -> int:
+    """Render a full report to a PDF file and return its size in bytes."""
+    return get_report_generator().render_pdf(student_info, report, path)
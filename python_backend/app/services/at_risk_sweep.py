@@ -0,0 +1,248 @@
+"""Nightly at-risk scoring over every student.
+
+Runs inside the API when ``AT_RISK_SWEEP_ENABLED`` is set, or on demand from
+the python_backend directory:
+
+    python -m app.services.at_risk_sweep
+"""
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta
+import asyncio
+import time
+import logging
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+from app.models.student import PerformanceMetric, Student, StudentCourseAggregate
+from app.services.trend_engine import TrendEngine
+
+logger = logging.getLogger(__name__)
+
+AT_RISK_METRIC = 'at_risk'
+
+# Rules from PerformanceAnalyzer._identify_improvement_areas with their severities
+RISK_FLAGS = (
+    ('declining_grades', 'high'),
+    ('low_average', 'medium'),
+    ('low_attendance', 'medium'),
+    ('low_study_time', 'low')
+)
+SEVERITY_WEIGHTS = {'high': 3, 'medium': 2, 'low': 1}
+
+SWEEP_COLUMNS = [
+    'student_id',
+    'course_id',
+    'grade_rows',
+    'grade_count',
+    'grade_mean',
+    'grade_sum_x',
+    'grade_sum_y',
+    'grade_sum_xy',
+    'grade_sum_xx',
+    'attendance_count',
+    'present_count',
+    'study_sessions',
+    'study_minutes'
+]
+
+class AtRiskSweep:
+    """Flag at-risk students in every course with one vectorized pass.
+
+    Reads the running course aggregates of the whole student body and
+    applies the improvement-area rules as column operations: a declining
+    grade trend or an average below 70, attendance below 80% and too little
+    study time. Every flagged (student, course) is written as an ``at_risk``
+    ``PerformanceMetric`` whose value is the summed severity weight of its
+    flags, replacing the previous sweep in the same transaction.
+    """
+
+    def __init__(self, hour: int = settings.AT_RISK_SWEEP_HOUR, batch_size: int = settings.AT_RISK_SWEEP_BATCH_SIZE):
+        self.hour = hour
+        self.batch_size = batch_size
+        self.trend_engine = TrendEngine()
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    async def start(self) -> None:
+        """Run the sweep every night at ``hour`` UTC."""
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._nightly_loop())
+
+    async def stop(self) -> None:
+        """Stop the nightly sweep."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _nightly_loop(self) -> None:
+        """Sleep until the next run time, then sweep in a worker thread."""
+        while True:
+            await asyncio.sleep(self.seconds_until_next_run())
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.run_once)
+            except Exception as e:
+                logger.error(f"Error running at-risk sweep: {str(e)}")
+
+    def seconds_until_next_run(self, now: Optional[datetime] = None) -> float:
+        """Return the seconds until the next ``hour`` o'clock UTC."""
+        now = now or datetime.utcnow()
+        next_run = now.replace(hour=self.hour, minute=0, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    def run_once(self) -> Dict[str, Any]:
+        """Sweep with a session of its own."""
+        from app.core.database import SessionLocal
+
+        with SessionLocal() as db:
+            return self.run(db)
+
+    def run(self, db: Session) -> Dict[str, Any]:
+        """Score every student and replace the stored at-risk metrics."""
+        started = time.perf_counter()
+        swept_at = datetime.utcnow()
+
+        aggregates = self.load_aggregates(db)
+        flagged = self.score(aggregates)
+        self.write(db, flagged, swept_at)
+        db.commit()
+
+        self.last_run = {
+            'swept_at': swept_at.isoformat(),
+            'students': int(aggregates['student_id'].nunique()),
+            'courses_scored': len(aggregates),
+            'flagged_students': int(flagged['student_id'].nunique()),
+            'flagged_courses': len(flagged),
+            'seconds': time.perf_counter() - started
+        }
+        logger.info(f"At-risk sweep flagged {self.last_run['flagged_courses']} courses of {self.last_run['flagged_students']} students in {self.last_run['seconds']:.1f}s")
+        return self.last_run
+
+    def load_aggregates(self, db: Session) -> pd.DataFrame:
+        """Read the rule inputs of every student's course aggregates."""
+        rows = db.execute(select(*[getattr(StudentCourseAggregate, column) for column in SWEEP_COLUMNS])).all()
+        return pd.DataFrame([tuple(row) for row in rows], columns=SWEEP_COLUMNS)
+
+    def score(self, aggregates: pd.DataFrame) -> pd.DataFrame:
+        """Apply the improvement-area rules to every aggregate row at once.
+
+        Returns one row per flagged (student, course) with a boolean column
+        per flag, the highest severity and the summed severity weight.
+        """
+        if aggregates.empty:
+            return pd.DataFrame(columns=['student_id', 'course_id', *[flag for flag, _ in RISK_FLAGS], 'severity', 'value'])
+
+        counts = aggregates['grade_count']
+        slopes = self.trend_engine.slopes_from_sums(
+            counts,
+            aggregates['grade_sum_x'],
+            aggregates['grade_sum_y'],
+            aggregates['grade_sum_xy'],
+            aggregates['grade_sum_xx']
+        )
+
+        # Grade trends exist for courses with more than one grade row, as in analyze_aggregates
+        has_trend = (aggregates['grade_rows'] > 1).to_numpy()
+        average = aggregates['grade_mean'].where(counts > 0).to_numpy(dtype=np.float64)
+        attended = aggregates['attendance_count'].to_numpy(dtype=np.float64)
+        attendance_rate = aggregates['present_count'].to_numpy(dtype=np.float64) / np.where(attended > 0, attended, 1)
+        sessions = aggregates['study_sessions'].to_numpy(dtype=np.float64)
+
+        flags = {
+            'declining_grades': has_trend & (self.trend_engine.classify_slopes(slopes).to_numpy() == 'declining'),
+            'low_average': has_trend & (average < 70),
+            'low_attendance': (attended > 0) & (attendance_rate < 0.8),
+            # Study patterns report total minutes under the total_hours name; the rule compares that value
+            'low_study_time': (sessions > 0) & (aggregates['study_minutes'].to_numpy(dtype=np.float64) < 10)
+        }
+
+        # An academic flag counts once, high when the trend is declining
+        academic = np.where(flags['declining_grades'], SEVERITY_WEIGHTS['high'], np.where(flags['low_average'], SEVERITY_WEIGHTS['medium'], 0))
+        value = academic + flags['low_attendance'] * SEVERITY_WEIGHTS['medium'] + flags['low_study_time'] * SEVERITY_WEIGHTS['low']
+        severity = np.select(
+            [flags['declining_grades'], flags['low_average'] | flags['low_attendance'], flags['low_study_time']],
+            ['high', 'medium', 'low'],
+            default=''
+        )
+
+        flagged = value > 0
+        return pd.DataFrame({
+            'student_id': aggregates['student_id'].to_numpy()[flagged],
+            'course_id': aggregates['course_id'].to_numpy()[flagged],
+            **{flag: values[flagged] for flag, values in flags.items()},
+            'severity': severity[flagged],
+            'value': value[flagged].astype(np.float64)
+        })
+
+    def write(self, db: Session, flagged: pd.DataFrame, swept_at: datetime) -> None:
+        """Replace the previous sweep's metrics with the flagged rows, in batches."""
+        db.execute(delete(PerformanceMetric).where(PerformanceMetric.metric_type == AT_RISK_METRIC))
+
+        flag_names = [flag for flag, _ in RISK_FLAGS]
+        flag_values = flagged[flag_names].to_numpy()
+        rows = [
+            {
+                'student_id': student_id,
+                'course_id': course_id,
+                'date': swept_at,
+                'metric_type': AT_RISK_METRIC,
+                'value': value,
+                'metric_metadata': {
+                    'severity': severity,
+                    'flags': [name for name, is_set in zip(flag_names, flag_row) if is_set]
+                }
+            }
+            for student_id, course_id, value, severity, flag_row in zip(
+                flagged['student_id'].tolist(),
+                flagged['course_id'].tolist(),
+                flagged['value'].tolist(),
+                flagged['severity'].tolist(),
+                flag_values.tolist()
+            )
+        ]
+
+        for start in range(0, len(rows), self.batch_size):
+            db.execute(insert(PerformanceMetric), rows[start:start + self.batch_size])
+
+    def list_at_risk(self, db: Session, course_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """List a course's at-risk students from the latest sweep, highest risk first."""
+        rows = db.execute(
+            select(
+                Student.student_id,
+                Student.name,
+                PerformanceMetric.value,
+                PerformanceMetric.metric_metadata,
+                PerformanceMetric.date
+            )
+            .join(Student, Student.id == PerformanceMetric.student_id)
+            .where(PerformanceMetric.metric_type == AT_RISK_METRIC, PerformanceMetric.course_id == course_id)
+            .order_by(PerformanceMetric.value.desc())
+            .limit(limit)
+        ).all()
+
+        return [
+            {
+                'student_id': student_id,
+                'name': name,
+                'risk_score': value,
+                'severity': metadata['severity'],
+                'flags': metadata['flags'],
+                'swept_at': date
+            }
+            for student_id, name, value, metadata, date in rows
+        ]
+
+at_risk_sweep = AtRiskSweep()
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    print(at_risk_sweep.run_once())
+
+if __name__ == '__main__':
+    main()
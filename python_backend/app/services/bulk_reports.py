@@ -0,0 +1,184 @@
+from typing import Dict, Any, AsyncIterator, Iterable, List, Mapping
+from datetime import date, datetime
+import asyncio
+import io
+import json
+import logging
+import math
+import zipfile
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+from app.services import analysis_tasks, stage_timing
+from app.services.chart_payload import json_values
+from app.services.frame_bundle import FrameBundle
+from app.services.student_data_loader import student_data_loader
+from app.services.task_executor import AnalysisExecutor, ExecutorSaturatedError, analysis_executor
+
+logger = logging.getLogger(__name__)
+
+# Output formats of a bulk report request
+BULK_FORMATS = ('zip', 'ndjson')
+
+# Attempts per student when the analysis pool is saturated by other traffic
+SATURATED_RETRIES = 3
+
+class BulkReportService:
+    """Build full reports for many students and stream them as they finish.
+
+    Students are taken ``chunk_size`` at a time: each chunk's rows are read
+    with one query per table for the whole chunk, split into per-student
+    frame bundles, and analyzed and reported in the analysis pool with at
+    most ``concurrency`` students in flight. Reports are yielded in the
+    order they complete and dropped once written, so memory stays at about
+    one chunk of rows plus the reports in flight however large the class.
+    The next chunk is read while the pool works on the current one.
+
+    Bulk reports bypass the analysis cache: checking it costs a version
+    query per student, and a class-wide run seldom repeats soon enough to
+    hit it.
+    """
+
+    def __init__(self, executor: AnalysisExecutor = analysis_executor, concurrency: int = settings.BULK_REPORT_CONCURRENCY, chunk_size: int = settings.BULK_REPORT_CHUNK_SIZE):
+        self.executor = executor
+        self.concurrency = max(concurrency, 1)
+        self.chunk_size = max(chunk_size, 1)
+
+    async def reports(self, students: List[Dict[str, Any]], fields: Mapping[str, Iterable[str]], chart_format: str = 'compact', max_points: int = settings.CHART_MAX_POINTS, missing: Iterable[str] = ()) -> AsyncIterator[Dict[str, Any]]:
+        """Yield ``{'student_id', 'status', 'report' | 'error'}`` for each student as its report finishes.
+
+        Runs past the request that started it, so it reads through a session
+        of its own. A student whose report fails is yielded with status
+        ``failed``; the others carry on. Requested ids with no student row
+        come first, with status ``not_found``.
+        """
+        from app.core.database import AsyncSessionLocal
+
+        for student_id in missing:
+            yield {'student_id': student_id, 'status': 'not_found', 'error': 'Student not found'}
+
+        running = set()
+        try:
+            async with AsyncSessionLocal() as db:
+                for offset in range(0, len(students), self.chunk_size):
+                    chunk = students[offset:offset + self.chunk_size]
+                    tables = await self._load_chunk(db, chunk, fields)
+                    for student in chunk:
+                        if len(running) >= self.concurrency:
+                            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                            for task in done:
+                                yield task.result()
+                        bundle = FrameBundle.of({**student, **tables.pop(student['id'])})
+                        running.add(asyncio.create_task(self._build(bundle, chart_format, max_points)))
+
+            while running:
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            # The client went away or the stream failed; stop waiting on the rest
+            for task in running:
+                task.cancel()
+
+    async def ndjson(self, students: List[Dict[str, Any]], fields: Mapping[str, Iterable[str]], chart_format: str = 'compact', max_points: int = settings.CHART_MAX_POINTS, missing: Iterable[str] = ()) -> AsyncIterator[bytes]:
+        """Stream one JSON line per student as its report finishes."""
+        async for entry in self.reports(students, fields, chart_format, max_points, missing):
+            yield to_json(entry) + b'\n'
+
+    async def zip(self, students: List[Dict[str, Any]], fields: Mapping[str, Iterable[str]], chart_format: str = 'compact', max_points: int = settings.CHART_MAX_POINTS, missing: Iterable[str] = ()) -> AsyncIterator[bytes]:
+        """Stream a ZIP archive with ``<student_id>.json`` per finished report and a closing ``manifest.json``.
+
+        Each member is compressed and sent as soon as its report finishes.
+        The manifest lists every student's status, and the error of those
+        that failed.
+        """
+        output = _StreamOutput()
+        manifest = []
+        with zipfile.ZipFile(output, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+            async for entry in self.reports(students, fields, chart_format, max_points, missing):
+                if entry['status'] == 'done':
+                    archive.writestr(f"{entry['student_id']}.json", to_json(entry['report']))
+                    manifest.append({'student_id': entry['student_id'], 'status': 'done', 'file': f"{entry['student_id']}.json"})
+                else:
+                    manifest.append({'student_id': entry['student_id'], 'status': entry['status'], 'error': entry['error']})
+                yield output.drain()
+            archive.writestr('manifest.json', to_json({'students': manifest}))
+        yield output.drain()
+
+    async def _load_chunk(self, db: Any, chunk: List[Dict[str, Any]], fields: Mapping[str, Iterable[str]]) -> Dict[int, Dict[str, Any]]:
+        """Read a chunk of students' tables, outside the starting request's timings."""
+        with stage_timing.detach():
+            return await db.run_sync(student_data_loader.load_tables_many, [student['id'] for student in chunk], fields)
+
+    async def _build(self, student_data: FrameBundle, chart_format: str, max_points: int) -> Dict[str, Any]:
+        """Build one student's full report in the pool, backing off while the pool is saturated."""
+        student_id = student_data['student_id']
+        with stage_timing.detach():
+            for attempt in range(SATURATED_RETRIES):
+                try:
+                    report = await self.executor.run(analysis_tasks.build_full_report, student_data, chart_format, max_points)
+                    return {'student_id': student_id, 'status': 'done', 'report': report}
+                except ExecutorSaturatedError as e:
+                    if attempt == SATURATED_RETRIES - 1:
+                        return {'student_id': student_id, 'status': 'failed', 'error': str(e)}
+                    await asyncio.sleep(0.5 * (attempt + 1))
+                except Exception as e:
+                    logger.error(f"Error building bulk report for student {student_id}: {str(e)}")
+                    return {'student_id': student_id, 'status': 'failed', 'error': str(e)}
+
+class _StreamOutput(io.RawIOBase):
+    """Write-only buffer a ZIP archive is written into and drained from.
+
+    It cannot seek or tell, so ``zipfile`` writes each member's sizes in a
+    data descriptor after its data and nothing already sent is rewritten.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        """Return and forget everything written since the last drain."""
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def to_json(value: Any) -> bytes:
+    """Encode a report as strict JSON: NumPy values unwrapped, dates as ISO 8601 and NaN as null."""
+    return json.dumps(_jsonable(value), separators=(',', ':'), allow_nan=False, default=str).encode()
+
+def _jsonable(value: Any) -> Any:
+    """Convert a report value to JSON-native types."""
+    if isinstance(value, dict):
+        return {_json_key(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return _jsonable(json_values(value))
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, np.datetime64):
+        return None if np.isnat(value) else pd.Timestamp(value).isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def _json_key(key: Any) -> Any:
+    """Return a dict key JSON can hold, with dates as ISO 8601."""
+    if isinstance(key, (datetime, date)):
+        return key.isoformat()
+    if isinstance(key, np.generic):
+        return key.item()
+    return key
+
+bulk_report_service = BulkReportService()
@@ -61,7 +61,7 @@ class CalendarService:
         )
         self.service = build('calendar', self.CALENDAR_API_VERSION, credentials=credentials)
 
-    def sync_events(self, user_id: int, db) -> List[Event]:
+    def sync_events(self, db, user_id: int) -> List[Event]:
         """Sync events from Google Calendar to local database."""
         try:
             # Get user's calendar sync settings
@@ -121,7 +121,7 @@ class CalendarService:
             print(f'An error occurred: {error}')
             return []
 
-    def create_event(self, event_data: Dict[str, Any], user_id: int, db) -> Optional[Event]:
+    def create_event(self, db, event_data: Dict[str, Any], user_id: int) -> Optional[Event]:
         """Create a new event in both Google Calendar and local database."""
         try:
             # Create event in Google Calendar
@@ -175,7 +175,7 @@ class CalendarService:
             print(f'An error occurred: {error}')
             return None
 
-    def update_event(self, event_id: str, event_data: Dict[str, Any], db) -> Optional[Event]:
+    def update_event(self, db, event_id: str, event_data: Dict[str, Any]) -> Optional[Event]:
         """Update an event in both Google Calendar and local database."""
         try:
             # Get event from database
@@ -215,7 +215,7 @@ class CalendarService:
             print(f'An error occurred: {error}')
             return None
 
-    def delete_event(self, event_id: str, db) -> bool:
+    def delete_event(self, db, event_id: str) -> bool:
         """Delete an event from both Google Calendar and local database."""
         try:
             # Get event from database
@@ -238,7 +238,7 @@ class CalendarService:
             print(f'An error occurred: {error}')
             return False
 
-    def get_upcoming_events(self, user_id: int, days: int = 7, db) -> List[Event]:
+    def get_upcoming_events(self, db, user_id: int, days: int = 7) -> List[Event]:
         """Get upcoming events for a user."""
         try:
             # Get user's calendar sync settings
@@ -0,0 +1,74 @@
+from typing import Dict, Any, Iterable, Mapping
+import numpy as np
+import pandas as pd
+
+# Low-cardinality string columns per table, with the dictionary each draws from.
+# Course ids and study subjects share one dictionary because predictions and
+# improvement areas line them up as the same key.
+CATEGORICAL_COLUMNS = {
+    'grades': {'course_id': 'key', 'grade_type': 'grade_type'},
+    'attendance': {'course_id': 'key', 'status': 'attendance_status'},
+    'assignments': {'course_id': 'key', 'status': 'assignment_status'},
+    'study_habits': {'subject': 'key', 'activity_type': 'activity_type'}
+}
+
+# Values every attendance dictionary holds, so status codes are stable across loads
+ATTENDANCE_STATUSES = ('absent', 'late', 'present')
+
+def build_dictionaries(tables: Mapping[str, Mapping[str, Any]]) -> Dict[str, pd.Index]:
+    """Collect the sorted categories of every dictionary across the given tables.
+
+    Categories are sorted so grouping with ``sort=True`` orders groups the
+    same way it orders the plain strings.
+    """
+    values: Dict[str, list] = {'attendance_status': [np.array(ATTENDANCE_STATUSES, dtype=object)]}
+    for table, columns in tables.items():
+        for column, dictionary in CATEGORICAL_COLUMNS.get(table, {}).items():
+            if column in columns:
+                values.setdefault(dictionary, []).append(_categories_of(columns[column]))
+
+    return {
+        dictionary: pd.Index(sorted(set().union(*parts)), dtype=object)
+        for dictionary, parts in values.items()
+    }
+
+def encode_tables(tables: Mapping[str, Any]) -> Dict[str, Any]:
+    """Encode the categorical columns of several tables with shared dictionaries.
+
+    Tables may be DataFrames or dicts of column arrays, and come back as the
+    same type with their categorical columns as ``pd.Categorical``. Every
+    column drawing from one dictionary gets the same categories, so frames
+    built from different tables group, align and concatenate on them
+    without falling back to object arrays. Groupbys over these columns
+    must pass ``observed=True``.
+    """
+    dictionaries = build_dictionaries(tables)
+    encoded = {}
+    for table, columns in tables.items():
+        updates = {
+            column: _encode(_values_of(columns[column]), dictionaries[dictionary])
+            for column, dictionary in CATEGORICAL_COLUMNS.get(table, {}).items()
+            if column in columns
+        }
+        if isinstance(columns, pd.DataFrame):
+            encoded[table] = columns.assign(**updates) if updates else columns
+        else:
+            encoded[table] = {**columns, **updates}
+    return encoded
+
+def _encode(values: Any, categories: pd.Index) -> pd.Categorical:
+    """Encode a column with a dictionary, keeping a categorical already drawn from it as is."""
+    if isinstance(values, pd.Categorical) and values.categories.equals(categories):
+        return values
+    return pd.Categorical(values, categories=categories)
+
+def _values_of(column: Any) -> Any:
+    """Return a column's values, unwrapping Series so their index is ignored."""
+    return column.array if isinstance(column, pd.Series) else column
+
+def _categories_of(column: Any) -> Iterable[Any]:
+    """Return the distinct non-null values of a column."""
+    values = _values_of(column)
+    if isinstance(values, pd.Categorical):
+        return values.categories
+    return pd.unique(pd.Series(values, dtype=object).dropna())
@@ -0,0 +1,133 @@
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
+import hashlib
+import json
+import numpy as np
+
+# Visualization formats the report endpoints can return
+CHART_FORMATS = ('plotly', 'compact')
+
+# Trace type, fixed trace attributes, layout and series value types of every
+# chart the report generator draws. Compact charts carry only their kind and
+# series; clients merge each series into the kind's trace and layout.
+CHART_KINDS = {
+    'grade_trend': {
+        'trace': {'type': 'scatter', 'mode': 'lines+markers'},
+        'layout': {'title': 'Grade Trends by Course', 'xaxis_title': 'Date', 'yaxis_title': 'Score', 'showlegend': True},
+        'types': {'name': 'category', 'x': 'datetime', 'y': 'number'}
+    },
+    'attendance_pattern': {
+        'trace': {'type': 'bar'},
+        'layout': {'title': 'Attendance Patterns by Course', 'xaxis_title': 'Course', 'yaxis_title': 'Percentage', 'barmode': 'stack'},
+        'types': {'name': 'category', 'x': 'category', 'y': 'number'}
+    },
+    'study_habits': {
+        'trace': {'type': 'pie'},
+        'layout': {'title': 'Study Time Distribution by Subject'},
+        'types': {'labels': 'category', 'values': 'number'}
+    },
+    'performance_distribution': {
+        'trace': {'type': 'histogram', 'nbinsx': 10},
+        'layout': {'title': 'Grade Distribution', 'xaxis_title': 'Score', 'yaxis_title': 'Frequency'},
+        'types': {'x': 'number'}
+    },
+    'grade_summary': {
+        'trace': {'type': 'bar'},
+        'layout': {'title': 'Average Grades by Course', 'xaxis_title': 'Course', 'yaxis_title': 'Average Score'},
+        'types': {'x': 'category', 'y': 'number'}
+    },
+    'attendance_summary': {
+        'trace': {'type': 'bar'},
+        'layout': {'title': 'Attendance Summary by Course', 'xaxis_title': 'Course', 'yaxis_title': 'Percentage', 'barmode': 'stack'},
+        'types': {'name': 'category', 'x': 'category', 'y': 'number'}
+    }
+}
+
+def chart(kind: str, series: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Describe a chart by its kind and data series, before it is rendered."""
+    return {'kind': kind, 'series': series}
+
+def render_chart(chart: Optional[Dict[str, Any]], chart_format: str = 'plotly') -> Optional[Dict[str, Any]]:
+    """Render a chart as a full plotly figure dict or as its compact payload."""
+    if chart is None:
+        return None
+    if chart_format == 'compact':
+        return compact_chart(chart)
+    return plotly_figure(chart)
+
+def plotly_figure(chart: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the plotly figure dict of a chart, template and layout included."""
+    import plotly.graph_objects as go
+
+    spec = CHART_KINDS[chart['kind']]
+    fig = go.Figure(data=[{**spec['trace'], **series} for series in chart['series']])
+    fig.update_layout(**spec['layout'])
+    return fig.to_dict()
+
+def compact_chart(chart: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a chart's kind and series as plain JSON values.
+
+    Dates become ISO 8601 strings and missing numbers ``None``, so the
+    payload serializes with the standard JSON encoder.
+    """
+    return {
+        'kind': chart['kind'],
+        'series': [
+            {key: json_values(values) for key, values in series.items()}
+            for series in chart['series']
+        ]
+    }
+
+@lru_cache(maxsize=1)
+def chart_templates() -> Dict[str, Any]:
+    """Return the plotly template and per-kind trace and layout compact charts omit.
+
+    Built once per process. ``version`` is a hash of the content, for use
+    as an HTTP validator.
+    """
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    templates = {
+        'template': pio.templates[pio.templates.default].to_plotly_json(),
+        'charts': {
+            kind: {
+                'trace': spec['trace'],
+                'layout': go.Layout(**spec['layout']).to_plotly_json(),
+                'types': spec['types']
+            }
+            for kind, spec in CHART_KINDS.items()
+        }
+    }
+    content = json.dumps(templates, sort_keys=True, default=str)
+    templates['version'] = hashlib.sha256(content.encode()).hexdigest()[:16]
+    return templates
+
+def json_values(values: Any) -> Any:
+    """Convert a series attribute to JSON-native values."""
+    if values is None or isinstance(values, (str, int, float)):
+        return values
+
+    array = np.asarray(values)
+    if np.issubdtype(array.dtype, np.datetime64):
+        missing = np.isnat(array)
+        strings = np.datetime_as_string(array, unit=_date_unit(array[~missing])).astype(object)
+        strings[missing] = None
+        return strings.tolist()
+    if array.dtype.kind == 'f':
+        missing = np.isnan(array)
+        if not missing.any():
+            return array.tolist()
+        result = array.astype(object)
+        result[missing] = None
+        return result.tolist()
+    return array.tolist()
+
+def _date_unit(dates: np.ndarray) -> str:
+    """Return the coarsest ISO 8601 unit, down to seconds, that all dates fit exactly."""
+    seconds = dates.astype('datetime64[s]').astype(np.int64)
+    if (seconds % 86400 == 0).all():
+        return 'D'
+    if (seconds % 60 == 0).all():
+        return 'm'
+    return 's'
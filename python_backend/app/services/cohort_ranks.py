@@ -0,0 +1,187 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Dict, Any, Optional, Tuple
+from datetime import datetime
+import asyncio
+import time
+import logging
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.student import StudentCourseAggregate
+
+logger = logging.getLogger(__name__)
+
+class CourseDistribution:
+    """Course-average scores of one course, sorted for binary search.
+
+    Courses with more than ``max_exact`` students keep evenly spaced
+    quantiles instead of every score, which bounds the percentile error by
+    one summary step while keeping memory fixed.
+    """
+
+    def __init__(self, scores: np.ndarray, max_exact: int, summary_size: int):
+        self.count = len(scores)
+        self.mean = float(scores.mean())
+        self.exact = self.count <= max_exact
+        if self.exact:
+            self.points = scores
+        else:
+            self.points = np.quantile(scores, np.linspace(0, 1, summary_size))
+
+    def counts(self, score: float) -> Tuple[float, float]:
+        """Return how many students scored below and exactly at ``score``."""
+        if self.exact:
+            below = int(np.searchsorted(self.points, score, side='left'))
+            at_or_below = int(np.searchsorted(self.points, score, side='right'))
+            return float(below), float(at_or_below - below)
+
+        # Interpolate the cumulative share between the summary quantiles
+        share = np.interp(score, self.points, np.linspace(0, 1, len(self.points)), left=0.0, right=1.0)
+        return float(share * self.count), 0.0
+
+    def quantiles(self, levels: Tuple[float, ...] = (0.1, 0.25, 0.5, 0.75, 0.9)) -> Dict[str, float]:
+        """Return score quantiles of the course."""
+        values = np.quantile(self.points, levels)
+        return {f"p{int(level * 100)}": float(value) for level, value in zip(levels, values)}
+
+class CohortRankService:
+    """Percentile and rank of students within each course's cohort.
+
+    A background loop reads every student's course average from the running
+    course aggregates, one row per student and course, and rebuilds sorted
+    per-course arrays. Queries then binary-search those arrays in O(log n)
+    without loading any student's history. Each refresh swaps in a new
+    snapshot, so queries never see a half-built one.
+    """
+
+    def __init__(self, refresh_seconds: int = settings.COHORT_RANK_REFRESH_SECONDS, max_exact: int = settings.COHORT_RANK_MAX_EXACT, summary_size: int = settings.COHORT_RANK_SUMMARY_SIZE):
+        self.refresh_seconds = refresh_seconds
+        self.max_exact = max_exact
+        self.summary_size = summary_size
+        self._courses: Dict[str, CourseDistribution] = {}
+        self._student_scores: Dict[int, Dict[str, float]] = {}
+        self._refresh_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.refreshed_at: Optional[datetime] = None
+        self.refresh_ms: Optional[float] = None
+
+    async def start(self, session_factory=AsyncSessionLocal) -> None:
+        """Start refreshing the snapshot in the background."""
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._refresh_loop(session_factory))
+
+    async def stop(self) -> None:
+        """Stop the background refresh."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _refresh_loop(self, session_factory) -> None:
+        """Refresh the snapshot every ``refresh_seconds``."""
+        while True:
+            try:
+                await self.refresh(session_factory)
+            except Exception as e:
+                logger.error(f"Error refreshing cohort ranks: {str(e)}")
+
+            await asyncio.sleep(self.refresh_seconds)
+
+    async def refresh(self, session_factory=AsyncSessionLocal) -> None:
+        """Rebuild the per-course sorted arrays from the course aggregates."""
+        async with self._refresh_lock:
+            started = time.perf_counter()
+            async with session_factory() as db:
+                scores = await db.run_sync(self.load_scores)
+
+            self._courses, self._student_scores = self.build(scores)
+            self.refreshed_at = datetime.utcnow()
+            self.refresh_ms = (time.perf_counter() - started) * 1000
+            logger.info(f"Refreshed cohort ranks for {len(self._courses)} courses in {self.refresh_ms:.0f} ms")
+
+    async def ensure_loaded(self) -> None:
+        """Build the first snapshot if the background loop has not yet."""
+        if self.refreshed_at is None:
+            await self.refresh()
+
+    def load_scores(self, db: Session) -> pd.DataFrame:
+        """Read every student's average score per graded course."""
+        rows = db.execute(
+            select(StudentCourseAggregate.course_id, StudentCourseAggregate.student_id, StudentCourseAggregate.grade_mean)
+            .where(StudentCourseAggregate.grade_count > 0)
+        ).all()
+        return pd.DataFrame([tuple(row) for row in rows], columns=['course_id', 'student_id', 'score'])
+
+    def build(self, scores: pd.DataFrame) -> Tuple[Dict[str, CourseDistribution], Dict[int, Dict[str, float]]]:
+        """Sort the scores once and split them into per-course distributions."""
+        scores = scores.sort_values(['course_id', 'score'], kind='stable')
+        course_ids = scores['course_id'].to_numpy()
+        values = scores['score'].to_numpy(dtype=np.float64)
+
+        # Courses are contiguous after the sort, so each one is a slice of the score array
+        starts = np.flatnonzero(np.r_[True, course_ids[1:] != course_ids[:-1]]) if len(course_ids) else np.array([], dtype=int)
+        ends = np.r_[starts[1:], len(course_ids)]
+        courses = {
+            course_ids[start]: CourseDistribution(values[start:end], self.max_exact, self.summary_size)
+            for start, end in zip(starts, ends)
+        }
+
+        student_scores = {}
+        for course_id, student_id, score in zip(course_ids, scores['student_id'].to_numpy(), values):
+            student_scores.setdefault(student_id, {})[course_id] = score
+
+        return courses, student_scores
+
+    def percentile(self, course_id: str, score: float) -> Optional[Dict[str, Any]]:
+        """Return the rank and percentile a score holds in a course."""
+        distribution = self._courses.get(course_id)
+        if distribution is None:
+            return None
+
+        below, equal = distribution.counts(score)
+        above = distribution.count - below - equal
+        return {
+            'course_id': course_id,
+            'score': float(score),
+            'students': distribution.count,
+            'rank': int(round(above)) + 1,
+            'percentile': round(100 * (below + equal / 2) / distribution.count, 1),
+            'exact': distribution.exact
+        }
+
+    def student_ranks(self, student_id: int) -> Dict[str, Dict[str, Any]]:
+        """Return a student's rank and percentile in every graded course."""
+        return {
+            course_id: self.percentile(course_id, score)
+            for course_id, score in self._student_scores.get(student_id, {}).items()
+        }
+
+    def course_summary(self, course_id: str) -> Optional[Dict[str, Any]]:
+        """Return a course's cohort size, mean and score quantiles."""
+        distribution = self._courses.get(course_id)
+        if distribution is None:
+            return None
+        return {
+            'course_id': course_id,
+            'students': distribution.count,
+            'mean': distribution.mean,
+            'quantiles': distribution.quantiles(),
+            'exact': distribution.exact
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the snapshot size and when it was built."""
+        return {
+            'courses': len(self._courses),
+            'students': len(self._student_scores),
+            'summarized_courses': sum(1 for distribution in self._courses.values() if not distribution.exact),
+            'refreshed_at': self.refreshed_at.isoformat() if self.refreshed_at else None,
+            'refresh_ms': self.refresh_ms,
+            'refresh_seconds': self.refresh_seconds
+        }
+
+cohort_rank_service = CohortRankService()
@@ -0,0 +1,79 @@
+from typing import Dict, Any, Tuple
+import numpy as np
+import pandas as pd
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Pick up to ``max_points`` indices of a series with Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. The points between are split
+    into ``max_points - 2`` equal buckets, and from each bucket the point
+    forming the largest triangle with the previously kept point and the
+    next bucket's mean is kept, which preserves peaks, dips and trend
+    changes far better than taking every n-th point. ``x`` must be sorted.
+    Series no longer than ``max_points`` are returned whole, and caps of one
+    or two points keep only the first, or the first and last, point.
+    """
+    n = len(x)
+    if max_points <= 0 or n <= max_points:
+        return np.arange(n)
+    if max_points < 3:
+        return np.array([0, n - 1][:max_points], dtype=np.int64)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    buckets = max_points - 2
+    edges = np.floor(np.linspace(1, n - 1, buckets + 1)).astype(np.int64)
+
+    # Mean point of every bucket, with the last point standing in after the last bucket
+    lengths = np.diff(edges)
+    mean_x = np.append(np.add.reduceat(x[:n - 1], edges[:-1]) / lengths, x[-1])
+    mean_y = np.append(np.add.reduceat(y[:n - 1], edges[:-1]) / lengths, y[-1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(buckets):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_x, next_y = mean_x[bucket + 1], mean_y[bucket + 1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+def downsample_series(x: pd.Series, y: pd.Series, max_points: int) -> Tuple[pd.Series, pd.Series]:
+    """Downsample a date-ordered series to at most ``max_points`` points.
+
+    Points with a missing ``y`` are dropped first when the series has to be
+    downsampled; shorter series are returned unchanged.
+    """
+    if max_points <= 0 or len(x) <= max_points:
+        return x, y
+
+    present = y.notna().to_numpy()
+    x, y = x[present], y[present]
+    indices = lttb_indices(_numeric(x.to_numpy()), y.to_numpy(), max_points)
+    return x.iloc[indices], y.iloc[indices]
+
+def downsample_mapping(values: Dict[Any, float], max_points: int) -> Dict[Any, float]:
+    """Downsample a ``{date: value}`` mapping in key order to at most ``max_points`` entries."""
+    if max_points <= 0 or len(values) <= max_points:
+        return values
+
+    keys = list(values)
+    y = np.array([values[key] for key in keys], dtype=np.float64)
+    present = ~np.isnan(y)
+    kept = np.flatnonzero(present)
+    x = _numeric(pd.to_datetime([keys[i] for i in kept]).to_numpy())
+    indices = kept[lttb_indices(x, y[present], max_points)]
+    return {keys[i]: values[keys[i]] for i in indices}
+
+def _numeric(values: np.ndarray) -> np.ndarray:
+    """Return dates as float seconds since the first one, and numbers as floats."""
+    if np.issubdtype(values.dtype, np.datetime64):
+        seconds = values.astype('datetime64[s]').astype(np.int64)
+        return (seconds - seconds[0]).astype(np.float64) if len(seconds) else seconds.astype(np.float64)
+    return values.astype(np.float64)
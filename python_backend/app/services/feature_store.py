@@ -0,0 +1,153 @@
+from sqlalchemy import and_, event, select
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, Optional, Tuple
+import math
+import numpy as np
+import pandas as pd
+import logging
+from app.models.student import StudentCourseAggregate, StudentCourseFeature
+from app.services.prediction_engine import FEATURE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+class FeatureStore:
+    """Persisted prediction features, one numeric row per student and course.
+
+    Rows are derived from the running course aggregates, so a flush that
+    folds new grade, attendance or study habit rows into an aggregate also
+    refreshes that course's feature row in O(1). The columns hold
+    ``FEATURE_COLUMNS`` as floats, null where the course has no rows in a
+    source, and match what ``build_features`` computes from the history
+    tables. ``load_frame`` and ``load_matrix`` read them back for online
+    inference and bulk scoring without touching the history tables.
+    """
+
+    def __init__(self):
+        self._registered = False
+
+    def register(self, session_class=Session):
+        """Refresh the features of changed aggregates on every flush.
+
+        Register after ``aggregate_store`` so the new rows are already folded
+        into the aggregates when this listener runs.
+        """
+        if self._registered:
+            return
+
+        event.listen(session_class, 'before_flush', self._before_flush)
+        self._registered = True
+
+    def _before_flush(self, session: Session, flush_context, instances) -> None:
+        """Refresh the feature rows of new and modified aggregates."""
+        cache = {}
+        for obj in list(session.new) + list(session.dirty):
+            if isinstance(obj, StudentCourseAggregate):
+                self.refresh(session, obj, cache)
+
+    def refresh(self, db: Session, aggregate: StudentCourseAggregate, cache: Optional[Dict[Tuple[int, str], StudentCourseFeature]] = None) -> None:
+        """Recompute one course's feature row from its aggregate."""
+        row = self._get_row(db, aggregate.student_id, aggregate.course_id, cache)
+        for column, value in self.compute_features(aggregate).items():
+            setattr(row, column, value)
+
+    def compute_features(self, aggregate: StudentCourseAggregate) -> Dict[str, Optional[float]]:
+        """Derive the model features from a course aggregate."""
+        features = dict.fromkeys(FEATURE_COLUMNS)
+
+        if aggregate.grade_rows:
+            n = aggregate.grade_count
+            features['grade_count'] = float(n)
+            if n:
+                features['grade_mean'] = aggregate.grade_mean
+                features['grade_last'] = aggregate.grade_last
+            if n > 1:
+                features['grade_std'] = math.sqrt(aggregate.grade_m2 / (n - 1))
+
+                # Scored rows sit at positions 0..n-1, so their position sums have closed forms
+                sum_x = n * (n - 1) / 2
+                sum_xx = (n - 1) * n * (2 * n - 1) / 6
+                features['grade_slope'] = (
+                    (aggregate.grade_scored_sum_xy - sum_x * aggregate.grade_sum_y / n)
+                    / (sum_xx - sum_x ** 2 / n)
+                )
+
+        if aggregate.attendance_count:
+            features['attendance_rate'] = aggregate.present_count / aggregate.attendance_count
+            features['attendance_count'] = float(aggregate.attendance_count)
+
+        if aggregate.study_sessions:
+            features['study_minutes'] = aggregate.study_minutes
+            features['study_session_mean'] = aggregate.study_minutes / aggregate.study_sessions
+            features['study_sessions'] = float(aggregate.study_sessions)
+
+        return features
+
+    def load_frame(self, db: Session, student_id: int) -> pd.DataFrame:
+        """Load a student's features indexed by course key, like ``build_features``."""
+        rows = db.execute(
+            select(StudentCourseFeature.course_id, *[getattr(StudentCourseFeature, column) for column in FEATURE_COLUMNS])
+            .where(StudentCourseFeature.student_id == student_id)
+            .order_by(StudentCourseFeature.id)
+        ).all()
+
+        frame = pd.DataFrame([tuple(row) for row in rows], columns=['key'] + FEATURE_COLUMNS)
+        return frame.set_index('key').astype(np.float64)
+
+    def load_matrix(self, db: Session, student_ids: Optional[Iterable[int]] = None) -> Tuple[pd.MultiIndex, np.ndarray]:
+        """Load stored features in bulk as a float matrix in ``FEATURE_COLUMNS`` order.
+
+        Returns the ``(student_id, key)`` of every row with the matrix, for
+        all students or only ``student_ids``. Missing values are NaN. Rows
+        whose course aggregate is stale are left out, so callers score those
+        courses from the history tables.
+        """
+        query = select(
+            StudentCourseFeature.student_id,
+            StudentCourseFeature.course_id,
+            *[getattr(StudentCourseFeature, column) for column in FEATURE_COLUMNS]
+        ).join(StudentCourseAggregate, and_(
+            StudentCourseAggregate.student_id == StudentCourseFeature.student_id,
+            StudentCourseAggregate.course_id == StudentCourseFeature.course_id
+        )).where(StudentCourseAggregate.stale.is_not(True)).order_by(StudentCourseFeature.student_id, StudentCourseFeature.id)
+        if student_ids is not None:
+            query = query.where(StudentCourseFeature.student_id.in_(list(student_ids)))
+
+        rows = db.execute(query).all()
+        index = pd.MultiIndex.from_tuples([(row[0], row[1]) for row in rows], names=['student_id', 'key'])
+        matrix = np.array([row[2:] for row in rows], dtype=np.float64).reshape(len(rows), len(FEATURE_COLUMNS))
+        return index, matrix
+
+    def rebuild_student(self, db: Session, student_id: int) -> None:
+        """Recompute a student's feature rows from their current aggregates."""
+        db.flush()
+        db.query(StudentCourseFeature).filter(
+            StudentCourseFeature.student_id == student_id
+        ).delete(synchronize_session=False)
+
+        cache = {}
+        for aggregate in db.query(StudentCourseAggregate).filter(StudentCourseAggregate.student_id == student_id).order_by(StudentCourseAggregate.id):
+            self.refresh(db, aggregate, cache)
+
+        logger.info(f"Rebuilt {len(cache)} feature rows for student {student_id}")
+
+    def _get_row(self, db: Session, student_id: int, course_id: str, cache: Optional[Dict[Tuple[int, str], StudentCourseFeature]]) -> StudentCourseFeature:
+        """Fetch or create the feature row for a student and course."""
+        key = (student_id, course_id)
+        if cache is not None and key in cache:
+            return cache[key]
+
+        row = db.query(StudentCourseFeature).filter(
+            StudentCourseFeature.student_id == student_id,
+            StudentCourseFeature.course_id == course_id
+        ).first()
+
+        if not row:
+            row = StudentCourseFeature(student_id=student_id, course_id=course_id)
+            db.add(row)
+
+        if cache is not None:
+            cache[key] = row
+
+        return row
+
+feature_store = FeatureStore()
@@ -0,0 +1,97 @@
+from typing import Dict, Any, Iterator, Mapping
+import numpy as np
+import pandas as pd
+from app.services.categorical import encode_tables
+
+# Student payload keys holding row tables rather than student fields
+TABLE_NAMES = ('grades', 'attendance', 'assignments', 'study_habits', 'performance_metrics')
+
+# Columns parsed to datetime64 once, when the payload carries them as strings or objects
+DATE_COLUMNS = ('date', 'due_date', 'submission_date', 'created_at')
+
+class FrameBundle(Mapping):
+    """Read-only DataFrames of one student's tables, built once per request.
+
+    Takes a student payload as the loader returns it (dicts of column
+    arrays), as JSON records, or as DataFrames. Categorical columns are
+    encoded with shared dictionaries, date columns parsed once, and every
+    NumPy column wrapped in a read-only view, so a stage that tries to
+    write into the shared arrays fails instead of corrupting later stages.
+    Frames are built with ``copy=False`` over those columns, so nothing is
+    duplicated after the fetch. Each lookup returns a shallow copy, so a
+    stage that adds or replaces a column only changes its own view.
+
+    The bundle is a mapping over the original payload: table keys return
+    the frames and other keys, such as ``name``, the student's fields.
+    Pickling sends the column arrays and rebuilds the frames on the other
+    side, so process pool workers get the same read-only bundle.
+    """
+
+    def __init__(self, fields: Mapping[str, Any], columns: Mapping[str, Mapping[str, Any]]):
+        self._fields = dict(fields)
+        self._columns = {
+            table: {column: _read_only(values) for column, values in table_columns.items()}
+            for table, table_columns in columns.items()
+        }
+        self._frames = {
+            table: pd.DataFrame(dict(table_columns), copy=False)
+            for table, table_columns in self._columns.items()
+        }
+
+    @classmethod
+    def of(cls, student_data: Mapping[str, Any]) -> 'FrameBundle':
+        """Return the payload itself if it is already a bundle, or build one."""
+        if isinstance(student_data, FrameBundle):
+            return student_data
+
+        fields = {key: value for key, value in student_data.items() if key not in TABLE_NAMES}
+        columns = encode_tables({
+            table: _parse_dates(_columns_of(student_data[table]))
+            for table in TABLE_NAMES
+            if table in student_data
+        })
+        return cls(fields, columns)
+
+    def frame(self, table: str) -> pd.DataFrame:
+        """Return a table's frame, or an empty frame if the payload had none."""
+        if table not in self._frames:
+            return pd.DataFrame()
+        return self._frames[table].copy(deep=False)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._frames:
+            return self._frames[key].copy(deep=False)
+        return self._fields[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._fields
+        yield from self._frames
+
+    def __len__(self) -> int:
+        return len(self._fields) + len(self._frames)
+
+    def __reduce__(self):
+        return (self.__class__, (self._fields, self._columns))
+
+def _columns_of(table: Any) -> Dict[str, Any]:
+    """Return a table's columns from a dict of arrays, a DataFrame or a list of records."""
+    if isinstance(table, Mapping):
+        return dict(table)
+    if not isinstance(table, pd.DataFrame):
+        table = pd.DataFrame(table)
+    return {column: table[column].array if isinstance(table[column].dtype, pd.CategoricalDtype) else table[column].to_numpy() for column in table.columns}
+
+def _parse_dates(columns: Dict[str, Any]) -> Dict[str, Any]:
+    """Parse date columns that are not already datetime64."""
+    for column in DATE_COLUMNS:
+        values = columns.get(column)
+        if values is not None and not np.issubdtype(np.asarray(values).dtype, np.datetime64):
+            columns[column] = pd.to_datetime(values).to_numpy()
+    return columns
+
+def _read_only(values: Any) -> Any:
+    """Return a read-only view of a NumPy column; other arrays pass through."""
+    if isinstance(values, np.ndarray):
+        values = values.view()
+        values.flags.writeable = False
+    return values
@@ -0,0 +1,68 @@
+from typing import Dict, Any, Iterable
+import bisect
+import threading
+
+# Bucket upper bounds in milliseconds for request and task latencies
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class Histogram:
+    """Fixed-bucket histogram with cumulative counts, Prometheus style."""
+
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record one value."""
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.total += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the count, sum, mean and cumulative bucket counts."""
+        with self._lock:
+            cumulative = {}
+            running = 0
+            for bound, count in zip(self.buckets + ('+Inf',), self._counts):
+                running += count
+                cumulative[str(bound)] = running
+            return {
+                'count': self.count,
+                'sum': self.total,
+                'mean': self.total / self.count if self.count else 0.0,
+                'buckets': cumulative
+            }
+
+class LatencyWindow:
+    """The most recent ``size`` values, for exact percentiles over recent traffic."""
+
+    def __init__(self, size: int = 1024):
+        self._values = [0.0] * size
+        self._next = 0
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record one value, replacing the oldest once the window is full."""
+        with self._lock:
+            self._values[self._next] = value
+            self._next = (self._next + 1) % len(self._values)
+            self.count += 1
+            self.total += value
+
+    def snapshot(self, percentiles: Iterable[float] = (50, 90, 99)) -> Dict[str, Any]:
+        """Return the lifetime count and mean and percentiles over the window."""
+        with self._lock:
+            recent = sorted(self._values[:min(self.count, len(self._values))])
+            count, total = self.count, self.total
+
+        result = {'count': count, 'mean': total / count if count else 0.0}
+        for percentile in percentiles:
+            rank = min(int(len(recent) * percentile / 100), len(recent) - 1)
+            result[f"p{percentile:g}"] = recent[rank] if recent else 0.0
+        return result
@@ -0,0 +1,309 @@
+"""Offline training pipeline for the performance prediction models.
+
+Run from the python_backend directory against the configured database:
+
+    python -m app.services.model_training --n-estimators 200 --epochs 60
+"""
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Dict, Any, Optional, Tuple, TYPE_CHECKING
+from datetime import datetime
+import multiprocessing
+import argparse
+import json
+import os
+import logging
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+from app.models.student import Attendance, Grade, StudyHabit
+from app.services.categorical import encode_tables
+from app.services.prediction_engine import (
+    FEATURE_COLUMNS,
+    LATEST_FILE,
+    MANIFEST_FILE,
+    TARGET_COLUMNS,
+    PredictionEngine,
+    build_features
+)
+
+if TYPE_CHECKING:
+    import torch.nn as nn
+    from sklearn.ensemble import RandomForestRegressor
+
+logger = logging.getLogger(__name__)
+
+def build_network() -> 'nn.Module':
+    """Create the PyTorch network for final grade prediction."""
+    import torch.nn as nn
+
+    class PerformancePredictor(nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.layers = nn.Sequential(
+                nn.Linear(len(FEATURE_COLUMNS), 64),
+                nn.ReLU(),
+                nn.Dropout(0.2),
+                nn.Linear(64, 32),
+                nn.ReLU(),
+                nn.Dropout(0.2),
+                nn.Linear(32, 1)
+            )
+
+        def forward(self, x):
+            return self.layers(x)
+
+    return PerformancePredictor()
+
+def flatten_forest(forest: 'RandomForestRegressor') -> Dict[str, np.ndarray]:
+    """Concatenate a fitted forest's trees into flat node arrays."""
+    trees = [estimator.tree_ for estimator in forest.estimators_]
+    offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+
+    return {
+        'forest_roots': offsets.astype(np.int64),
+        'forest_left': np.concatenate([
+            np.where(tree.children_left == -1, -1, tree.children_left + offset) for tree, offset in zip(trees, offsets)
+        ]).astype(np.int64),
+        'forest_right': np.concatenate([
+            np.where(tree.children_right == -1, -1, tree.children_right + offset) for tree, offset in zip(trees, offsets)
+        ]).astype(np.int64),
+        'forest_feature': np.concatenate([tree.feature for tree in trees]).astype(np.int64),
+        'forest_threshold': np.concatenate([tree.threshold for tree in trees]).astype(np.float64),
+        'forest_value': np.concatenate([tree.value[:, :, 0] for tree in trees]).astype(np.float64)
+    }
+
+def train_forest(X: np.ndarray, Y: np.ndarray, params: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Fit the multi-output random forest and return it as flat arrays."""
+    from sklearn.ensemble import RandomForestRegressor
+
+    forest = RandomForestRegressor(**params)
+    forest.fit(X, Y)
+    return flatten_forest(forest)
+
+def train_network(X: np.ndarray, y: np.ndarray, params: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Fit the grade network on scaled inputs and return its weights."""
+    import torch
+    import torch.nn as nn
+
+    torch.manual_seed(params['seed'])
+    network = build_network()
+    optimizer = torch.optim.Adam(network.parameters(), lr=params['learning_rate'])
+    loss_fn = nn.MSELoss()
+
+    inputs = torch.tensor(X, dtype=torch.float32)
+    targets = torch.tensor(y, dtype=torch.float32).reshape(-1, 1)
+
+    network.train()
+    for _ in range(params['epochs']):
+        order = torch.randperm(len(inputs))
+        for start in range(0, len(inputs), params['batch_size']):
+            batch = order[start:start + params['batch_size']]
+            optimizer.zero_grad()
+            loss = loss_fn(network(inputs[batch]), targets[batch])
+            loss.backward()
+            optimizer.step()
+
+    linear_layers = [layer for layer in network.layers if isinstance(layer, nn.Linear)]
+    weights = {}
+    for index, layer in enumerate(linear_layers):
+        weights[f"network_w{index}"] = layer.weight.detach().numpy().astype(np.float64)
+        weights[f"network_b{index}"] = layer.bias.detach().numpy().astype(np.float64)
+    return weights
+
+class ModelTrainer:
+    """Train the prediction models from the grades, attendance and study habit tables.
+
+    Each student's history is split at a point in time: features come from
+    the rows before it and targets from the rows after it, so the models
+    learn to predict how a course ends from how it is going. The random
+    forest predicts final grade, attendance rate and remaining study
+    minutes; the network predicts final grade. Both train at the same time
+    in separate processes, and the result is written as a new versioned
+    artifact directory that ``PredictionEngine`` serves.
+    """
+
+    def __init__(self, artifact_dir: str = settings.MODEL_ARTIFACT_DIR, history_fraction: float = 0.7, holdout_fraction: float = 0.2, seed: int = 42, n_estimators: int = 100, epochs: int = 50):
+        self.artifact_dir = artifact_dir
+        self.history_fraction = history_fraction
+        self.holdout_fraction = holdout_fraction
+        self.seed = seed
+        self.forest_params = {'n_estimators': n_estimators, 'min_samples_leaf': 2, 'n_jobs': -1, 'random_state': seed}
+        self.network_params = {'epochs': epochs, 'batch_size': 256, 'learning_rate': 1e-3, 'seed': seed}
+
+    def load_frames(self, db: Session) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """Read the training columns of every student's rows."""
+        def frame(*columns):
+            rows = db.execute(select(*columns).order_by(columns[0].class_.id)).all()
+            return pd.DataFrame(rows, columns=[column.key for column in columns])
+
+        frames = encode_tables({
+            'grades': frame(Grade.student_id, Grade.course_id, Grade.score, Grade.date),
+            'attendance': frame(Attendance.student_id, Attendance.course_id, Attendance.status, Attendance.date),
+            'study_habits': frame(StudyHabit.student_id, StudyHabit.subject, StudyHabit.duration, StudyHabit.date)
+        })
+        return frames['grades'], frames['attendance'], frames['study_habits']
+
+    def build_training_set(self, grades: pd.DataFrame, attendance: pd.DataFrame, study_habits: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Split each student's history in time and pair past features with future targets."""
+        frames = [grades, attendance, study_habits]
+        for frame in frames:
+            frame['date'] = pd.to_datetime(frame['date'])
+
+        # Each student's cutoff sits the same fraction of the way through their own history
+        dates = pd.concat([frame[['student_id', 'date']] for frame in frames], ignore_index=True)
+        bounds = dates.groupby('student_id')['date'].agg(['min', 'max'])
+        cutoffs = bounds['min'] + (bounds['max'] - bounds['min']) * self.history_fraction
+
+        past = []
+        future = []
+        for frame in frames:
+            before = frame['date'] <= frame['student_id'].map(cutoffs)
+            past.append(frame[before])
+            future.append(frame[~before])
+
+        features = build_features(*past, by=['student_id'])
+        future_grades, future_attendance, future_study = future
+
+        targets = pd.DataFrame(index=features.index)
+        targets['final_grade'] = future_grades.groupby(['student_id', 'course_id'], observed=True)['score'].mean().rename_axis(['student_id', 'key'])
+        targets['attendance_rate'] = (future_attendance['status'] == 'present').groupby(
+            [future_attendance['student_id'], future_attendance['course_id']],
+            observed=True
+        ).mean().rename_axis(['student_id', 'key'])
+        targets['study_minutes'] = future_study.groupby(['student_id', 'subject'], observed=True)['duration'].sum().rename_axis(['student_id', 'key'])
+
+        # Courses without later attendance keep their rate; subjects without later study did none
+        targets['attendance_rate'] = targets['attendance_rate'].fillna(features.get('attendance_rate', pd.Series(dtype=float))).fillna(1.0)
+        targets['study_minutes'] = targets['study_minutes'].fillna(0.0)
+
+        labelled = targets['final_grade'].notna()
+        features = features.reindex(columns=FEATURE_COLUMNS)[labelled].fillna(0)
+        return features, targets[labelled][TARGET_COLUMNS]
+
+    def train(self, features: pd.DataFrame, targets: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Fit the forest and the network in parallel and return their arrays."""
+        X = features.to_numpy(dtype=np.float64)
+        Y = targets.to_numpy(dtype=np.float64)
+
+        scaler_mean = X.mean(axis=0)
+        scaler_scale = X.std(axis=0)
+        scaler_scale[scaler_scale == 0] = 1.0
+        target_mean = Y[:, :1].mean(axis=0)
+        target_scale = Y[:, :1].std(axis=0)
+        target_scale[target_scale == 0] = 1.0
+
+        # Spawned workers keep torch and sklearn thread pools out of this process
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=2, mp_context=context) as pool:
+            forest = pool.submit(train_forest, X, Y, self.forest_params)
+            network = pool.submit(
+                train_network,
+                (X - scaler_mean) / scaler_scale,
+                (Y[:, 0] - target_mean[0]) / target_scale[0],
+                self.network_params
+            )
+            arrays = {**forest.result(), **network.result()}
+
+        arrays.update({
+            'scaler_mean': scaler_mean,
+            'scaler_scale': scaler_scale,
+            'target_mean': target_mean,
+            'target_scale': target_scale
+        })
+        return arrays
+
+    def save(self, arrays: Dict[str, np.ndarray], training_rows: int, version: Optional[str] = None) -> str:
+        """Write a new artifact version without publishing it."""
+        version = version or datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+        version_dir = os.path.join(self.artifact_dir, version)
+        os.makedirs(version_dir, exist_ok=False)
+
+        for name, array in arrays.items():
+            np.save(os.path.join(version_dir, f"{name}.npy"), np.ascontiguousarray(array))
+
+        manifest = {
+            'version': version,
+            'trained_at': datetime.utcnow().isoformat(),
+            'feature_columns': FEATURE_COLUMNS,
+            'target_columns': TARGET_COLUMNS,
+            'network_layers': sum(1 for name in arrays if name.startswith('network_w')),
+            'training_rows': training_rows,
+            'arrays': sorted(arrays),
+            'metrics': {}
+        }
+        self._write_manifest(version_dir, manifest)
+        return version
+
+    def evaluate(self, version: str, features: pd.DataFrame, targets: pd.DataFrame) -> Dict[str, float]:
+        """Score a saved version on held-out rows and record the result in its manifest."""
+        engine = PredictionEngine(self.artifact_dir, version)
+        predictions = engine.predict(features)
+        metrics = {
+            f"{column}_mae": float((predictions[column] - targets[column]).abs().mean())
+            for column in TARGET_COLUMNS
+        }
+        metrics['final_grade_baseline_mae'] = float((features['grade_mean'] - targets['final_grade']).abs().mean())
+        metrics['holdout_rows'] = len(features)
+
+        version_dir = os.path.join(self.artifact_dir, version)
+        with open(os.path.join(version_dir, MANIFEST_FILE)) as handle:
+            manifest = json.load(handle)
+        manifest['metrics'] = metrics
+        self._write_manifest(version_dir, manifest)
+        return metrics
+
+    def publish(self, version: str) -> None:
+        """Point LATEST at a version so workers load it on their next start."""
+        latest = os.path.join(self.artifact_dir, LATEST_FILE)
+        temporary = f"{latest}.tmp"
+        with open(temporary, 'w') as handle:
+            handle.write(version)
+        os.replace(temporary, latest)
+
+    def run(self, db: Session, publish: bool = True) -> str:
+        """Load, split, train, save, evaluate and publish a new model version."""
+        features, targets = self.build_training_set(*self.load_frames(db))
+        if len(features) < 10:
+            raise ValueError(f"Only {len(features)} labelled course histories, not enough to train on")
+
+        # Hold out whole students so the metrics reflect unseen ones
+        students = features.index.get_level_values('student_id').unique().to_numpy()
+        rng = np.random.default_rng(self.seed)
+        holdout = set(rng.choice(students, size=max(int(len(students) * self.holdout_fraction), 1), replace=False))
+        is_holdout = features.index.get_level_values('student_id').isin(holdout)
+
+        logger.info(f"Training on {int((~is_holdout).sum())} course histories, holding out {int(is_holdout.sum())}")
+        arrays = self.train(features[~is_holdout], targets[~is_holdout])
+        version = self.save(arrays, int((~is_holdout).sum()))
+        metrics = self.evaluate(version, features[is_holdout], targets[is_holdout])
+        logger.info(f"Model {version} holdout metrics: {metrics}")
+
+        if publish:
+            self.publish(version)
+        return version
+
+    def _write_manifest(self, version_dir: str, manifest: Dict[str, Any]) -> None:
+        """Write a version's manifest file."""
+        with open(os.path.join(version_dir, MANIFEST_FILE), 'w') as handle:
+            json.dump(manifest, handle, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the performance prediction models")
+    parser.add_argument('--artifact-dir', default=settings.MODEL_ARTIFACT_DIR)
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--no-publish', action='store_true', help="Save the version without pointing LATEST at it")
+    args = parser.parse_args()
+
+    from app.core.database import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    trainer = ModelTrainer(args.artifact_dir, n_estimators=args.n_estimators, epochs=args.epochs)
+    with SessionLocal() as db:
+        version = trainer.run(db, publish=not args.no_publish)
+    print(version)
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,8 @@ from telegram import Bot
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 from app.models.events import Event, EventRSVP, NotificationPreference
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
 import asyncio
 import logging
@@ -75,30 +77,30 @@ class NotificationService:
         
         return False
 
-    async def process_upcoming_events(self, db) -> None:
+    async def process_upcoming_events(self, db: AsyncSession) -> None:
         """Process upcoming events and send reminders."""
         try:
             # Get events in the next 24 hours
             now = datetime.utcnow()
             tomorrow = now + timedelta(days=1)
             
-            events = db.query(Event).filter(
+            events = (await db.execute(select(Event).where(
                 Event.start_time >= now,
                 Event.start_time <= tomorrow
-            ).all()
+            ))).scalars().all()
 
             for event in events:
                 # Get RSVPs for the event
-                rsvps = db.query(EventRSVP).filter(
+                rsvps = (await db.execute(select(EventRSVP).where(
                     EventRSVP.event_id == event.id,
                     EventRSVP.status == 'confirmed'
-                ).all()
+                ))).scalars().all()
 
                 for rsvp in rsvps:
                     # Get user's notification preferences
-                    user_preference = db.query(NotificationPreference).filter(
+                    user_preference = (await db.execute(select(NotificationPreference).where(
                         NotificationPreference.user_id == rsvp.user_id
-                    ).first()
+                    ))).scalars().first()
 
                     if user_preference:
                         # Send event reminder
@@ -111,30 +113,30 @@ class NotificationService:
         except Exception as e:
             logger.error(f"Error processing upcoming events: {str(e)}")
 
-    async def process_pending_rsvps(self, db) -> None:
+    async def process_pending_rsvps(self, db: AsyncSession) -> None:
         """Process pending RSVPs and send reminders."""
         try:
             # Get events in the next 48 hours with pending RSVPs
             now = datetime.utcnow()
             two_days_later = now + timedelta(days=2)
             
-            events = db.query(Event).filter(
+            events = (await db.execute(select(Event).where(
                 Event.start_time >= now,
                 Event.start_time <= two_days_later
-            ).all()
+            ))).scalars().all()
 
             for event in events:
                 # Get pending RSVPs
-                pending_rsvps = db.query(EventRSVP).filter(
+                pending_rsvps = (await db.execute(select(EventRSVP).where(
                     EventRSVP.event_id == event.id,
                     EventRSVP.status == 'pending'
-                ).all()
+                ))).scalars().all()
 
                 for rsvp in pending_rsvps:
                     # Get user's notification preferences
-                    user_preference = db.query(NotificationPreference).filter(
+                    user_preference = (await db.execute(select(NotificationPreference).where(
                         NotificationPreference.user_id == rsvp.user_id
-                    ).first()
+                    ))).scalars().first()
 
                     if user_preference:
                         await self.send_rsvp_reminder(event, rsvp, user_preference)
@@ -0,0 +1,200 @@
+from collections import OrderedDict
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, Iterable, Mapping, Optional, Set, Tuple
+from datetime import datetime
+import asyncio
+import glob
+import hashlib
+import logging
+import os
+import uuid
+from app.core.config import settings
+from app.services import analysis_tasks, stage_timing
+from app.services.analysis_service import AnalysisService, analysis_service
+from app.services.student_data_loader import student_data_loader
+from app.services.task_executor import AnalysisExecutor, ExecutorSaturatedError
+
+logger = logging.getLogger(__name__)
+
+class PdfJob:
+    """One request to render a student's full report as a PDF."""
+
+    def __init__(self, student: Dict[str, Any], version: Optional[str], path: str):
+        self.id = uuid.uuid4().hex
+        self.student = student
+        self.version = version
+        self.path = path
+        self.status = 'queued'  # queued, running, done or failed
+        self.error: Optional[str] = None
+        self.size: Optional[int] = None
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'student_id': self.student['student_id'],
+            'status': self.status,
+            'error': self.error,
+            'size_bytes': self.size,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class PdfRenderQueue:
+    """Render full reports to PDF files in the background.
+
+    Submitting returns a job immediately; the report is built (or taken
+    from the analysis cache) and rendered by wkhtmltopdf in a bounded
+    process pool of its own, so slow renders never hold an API worker or
+    the analysis pool. At most ``max_concurrency`` renders run at once and
+    ``max_queue_depth`` more may wait; further submissions are rejected
+    with ``ExecutorSaturatedError``.
+
+    Finished PDFs are written to ``directory`` under the student and data
+    version, and served from disk. Submitting again for a version that is
+    already rendered, queued or running returns that job instead of
+    rendering twice, and a file left from before a restart is reused as is.
+    When a newer version finishes, the student's older PDFs are removed.
+    """
+
+    def __init__(self, service: AnalysisService = analysis_service, directory: str = settings.PDF_REPORT_DIR, max_concurrency: int = settings.PDF_RENDER_WORKERS, max_queue_depth: int = settings.PDF_RENDER_MAX_QUEUE, timeout: float = settings.PDF_RENDER_TIMEOUT_SECONDS, history: int = settings.PDF_JOB_HISTORY):
+        self.service = service
+        self.directory = directory
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.history = history
+        self.executor = AnalysisExecutor(max_concurrency, max_queue_depth, timeout)
+        self._slots = asyncio.Semaphore(max(max_concurrency, 1))
+        self._jobs: 'OrderedDict[str, PdfJob]' = OrderedDict()
+        self._by_version: Dict[Tuple[int, Optional[str]], str] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.submitted = 0
+        self.reused = 0
+        self.rendered = 0
+        self.failed = 0
+
+    async def submit(self, db: AsyncSession, student: Dict[str, Any], fields: Mapping[str, Iterable[str]]) -> PdfJob:
+        """Queue a PDF of the student's current full report, or return the job that already covers it."""
+        version = await self.service.data_version(db, student['id'])
+        self.submitted += 1
+
+        job = self._jobs.get(self._by_version.get((student['id'], version)))
+        if job is not None and job.status != 'failed' and (not job.finished or os.path.exists(job.path)):
+            self.reused += 1
+            return job
+
+        job = PdfJob(student, version, self._path(student['id'], version))
+        if os.path.exists(job.path):
+            # Rendered before a restart
+            job.status = 'done'
+            job.size = os.path.getsize(job.path)
+            job.finished_at = datetime.utcnow()
+            self.reused += 1
+        else:
+            active = sum(1 for existing in self._jobs.values() if not existing.finished)
+            if active >= max(self.max_concurrency, 1) + self.max_queue_depth:
+                raise ExecutorSaturatedError("PDF renderers are busy, please retry shortly")
+            task = asyncio.create_task(self._render(job, fields))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        self._remember(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[PdfJob]:
+        """Return a job by id, if it is still remembered."""
+        return self._jobs.get(job_id)
+
+    async def _render(self, job: PdfJob, fields: Mapping[str, Iterable[str]]) -> None:
+        """Build the report and render it once a render slot is free.
+
+        Runs past the submitting request, so it opens a session of its own
+        and keeps its stages out of that request's timings.
+        """
+        from app.core.database import AsyncSessionLocal
+
+        with stage_timing.detach():
+            async with self._slots:
+                job.status = 'running'
+                try:
+                    async with AsyncSessionLocal() as db:
+                        student = job.student
+                        report = await self.service.full_report(
+                            db,
+                            student['id'],
+                            student_data_loader.loader(student, fields)
+                        )
+
+                    os.makedirs(self.directory, exist_ok=True)
+                    student_info = {
+                        'id': student['student_id'],
+                        'name': student['name'],
+                        'major': student.get('major'),
+                        'academic_year': student.get('academic_year')
+                    }
+                    job.size = await self.executor.run(analysis_tasks.render_pdf_report, student_info, report, job.path)
+                    job.status = 'done'
+                    self.rendered += 1
+                    self._remove_older(job)
+                except Exception as e:
+                    logger.error(f"Error rendering PDF report for student {job.student['student_id']}: {str(e)}")
+                    job.status = 'failed'
+                    job.error = str(e)
+                    self.failed += 1
+                finally:
+                    job.finished_at = datetime.utcnow()
+
+    def _path(self, student_pk: int, version: Optional[str]) -> str:
+        """File a student's PDF for one data version is written to."""
+        digest = hashlib.sha256(str(version).encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"{student_pk}-{digest}.pdf")
+
+    def _remember(self, job: PdfJob) -> None:
+        """Index a job, forgetting the oldest finished jobs beyond ``history``."""
+        self._jobs[job.id] = job
+        self._by_version[(job.student['id'], job.version)] = job.id
+
+        finished = [old for old in self._jobs.values() if old.finished]
+        for old in finished[:max(len(self._jobs) - self.history, 0)]:
+            del self._jobs[old.id]
+            if self._by_version.get((old.student['id'], old.version)) == old.id:
+                del self._by_version[(old.student['id'], old.version)]
+
+    def _remove_older(self, job: PdfJob) -> None:
+        """Delete the student's PDFs rendered for other data versions."""
+        for path in glob.glob(os.path.join(self.directory, f"{job.student['id']}-*.pdf")):
+            if path != job.path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Return job counts by status, reuse and render counters and the render pool's stats."""
+        statuses = {status: 0 for status in ('queued', 'running', 'done', 'failed')}
+        for job in self._jobs.values():
+            statuses[job.status] += 1
+        return {
+            'max_concurrency': self.max_concurrency,
+            'max_queue_depth': self.max_queue_depth,
+            'jobs': statuses,
+            'submitted': self.submitted,
+            'reused': self.reused,
+            'rendered': self.rendered,
+            'failed': self.failed,
+            'pool': self.executor.stats()
+        }
+
+    async def shutdown(self) -> None:
+        """Cancel unfinished jobs and stop the render workers."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.executor.shutdown()
+
+pdf_render_queue = PdfRenderQueue()
@@ -1,40 +1,62 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from datetime import datetime, timedelta
-import torch
-import torch.nn as nn
-from typing import List, Dict, Any, Tuple
-import json
-from sklearn.linear_model import LinearRegression
+from typing import List, Dict, Any, Tuple, Iterable, Optional, Set, Callable
+from app.services.frame_bundle import FrameBundle
+from app.services.prediction_engine import PredictionEngine, build_features, prediction_engine
+from app.services.stage_timing import stage
+from app.services.time_series_features import TimeSeriesFeatures
+from app.services.trend_engine import TrendEngine
 
-class PerformanceAnalyzer:
-    def __init__(self):
-        self.scaler = StandardScaler()
-        self.model = self._create_model()
-        self.rf_model = RandomForestRegressor(n_estimators=100, random_state=42)
-
-    def _create_model(self) -> nn.Module:
-        """Create a PyTorch neural network for performance prediction."""
-        class PerformancePredictor(nn.Module):
-            def __init__(self):
-                super().__init__()
-                self.layers = nn.Sequential(
-                    nn.Linear(10, 64),
-                    nn.ReLU(),
-                    nn.Dropout(0.2),
-                    nn.Linear(64, 32),
-                    nn.ReLU(),
-                    nn.Dropout(0.2),
-                    nn.Linear(32, 1)
-                )
+GRADE_STAGES = ('grade_stats', 'grade_trends', 'grade_patterns')
+ATTENDANCE_STAGES = ('attendance_stats', 'attendance_patterns', 'attendance_trends')
+STUDY_STAGES = ('study_stats', 'study_patterns', 'study_trends')
+
+# Output sections mapped to the computation stages they depend on
+ANALYSIS_SECTIONS = {
+    'grade_analysis': GRADE_STAGES,
+    'grade_analysis.stats': ('grade_stats',),
+    'grade_analysis.trends': ('grade_trends',),
+    'grade_analysis.patterns': ('grade_patterns',),
+    'grade_analysis.features': ('grade_features',),
+    'attendance_analysis': ATTENDANCE_STAGES,
+    'attendance_analysis.stats': ('attendance_stats',),
+    'attendance_analysis.patterns': ('attendance_patterns',),
+    'attendance_analysis.trends': ('attendance_trends',),
+    'attendance_analysis.features': ('attendance_features',),
+    'study_habits_analysis': STUDY_STAGES,
+    'study_habits_analysis.stats': ('study_stats',),
+    'study_habits_analysis.patterns': ('study_patterns',),
+    'study_habits_analysis.trends': ('study_trends',),
+    'study_habits_analysis.features': ('study_features',),
+    'predictions': ('predictions',),
+    'improvement_areas': ('grade_trends', 'attendance_patterns', 'study_patterns', 'improvement_areas'),
+    'summary': (
+        'grade_stats', 'grade_trends', 'attendance_stats', 'attendance_patterns',
+        'study_stats', 'study_patterns', 'predictions', 'improvement_areas', 'summary'
+    )
+}
+
+# Prediction outputs with the current-value feature and the model target behind each
+PREDICTION_OUTPUTS = (
+    ('final_grades', 'grade_mean', 'final_grade'),
+    ('attendance', 'attendance_rate', 'attendance_rate'),
+    ('study_habits', 'study_minutes', 'study_minutes')
+)
 
-            def forward(self, x):
-                return self.layers(x)
+DEFAULT_SECTIONS = (
+    'grade_analysis',
+    'attendance_analysis',
+    'study_habits_analysis',
+    'predictions',
+    'improvement_areas',
+    'summary'
+)
 
-        return PerformancePredictor()
+class PerformanceAnalyzer:
+    def __init__(self, prediction_engine: PredictionEngine = prediction_engine):
+        self.prediction_engine = prediction_engine
+        self.trend_engine = TrendEngine()
+        self.time_series = TimeSeriesFeatures()
 
     def prepare_data(self, student_data: Dict[str, Any]) -> pd.DataFrame:
         """Prepare student data for analysis."""
@@ -56,29 +78,246 @@ class PerformanceAnalyzer:
         
         return df
 
-    def analyze_performance(self, student_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Analyze student performance data comprehensively."""
-        # Convert data to DataFrames
-        grades = pd.DataFrame(student_data.get('grades', []))
-        attendance = pd.DataFrame(student_data.get('attendance', []))
-        study_habits = pd.DataFrame(student_data.get('study_habits', []))
+    def analyze_performance(self, student_data: Dict[str, Any], sections: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Analyze student performance data comprehensively.
+
+        ``sections`` names the output sections to return, either top-level keys
+        such as ``'predictions'`` or sub-sections such as
+        ``'grade_analysis.trends'``. Only the stages those sections depend on
+        are computed, and intermediate results are shared between them.
+        Defaults to every section.
+        """
+        sections = DEFAULT_SECTIONS if sections is None else tuple(sections)
+        stages = self.plan_analysis(sections)
+        shared = {}
+        
+        # Convert data to DataFrames with categorical keys and statuses
+        with stage('analysis.frames'):
+            grades, attendance, study_habits = self._frames(student_data)
         
         # Perform various analyses
-        grade_analysis = self._analyze_grades(grades)
-        attendance_analysis = self._analyze_attendance(attendance)
-        study_habits_analysis = self._analyze_study_habits(study_habits)
+        grade_analysis = {}
+        if stages.intersection(GRADE_STAGES + ('grade_features',)):
+            with stage('analysis.grades'):
+                grade_analysis = self._analyze_grades(grades, stages, shared)
+        attendance_analysis = {}
+        if stages.intersection(ATTENDANCE_STAGES + ('attendance_features',)):
+            with stage('analysis.attendance'):
+                attendance_analysis = self._analyze_attendance(attendance, stages, shared)
+        study_habits_analysis = {}
+        if stages.intersection(STUDY_STAGES + ('study_features',)):
+            with stage('analysis.study_habits'):
+                study_habits_analysis = self._analyze_study_habits(study_habits, stages, shared)
         
         # Generate predictions
-        predictions = self._generate_predictions(grades, attendance, study_habits)
+        predictions = {}
+        if 'predictions' in stages:
+            with stage('analysis.predictions'):
+                predictions = self._generate_predictions(grades, attendance, study_habits, shared)
         
         # Identify improvement areas
+        improvement_areas = []
+        if 'improvement_areas' in stages:
+            with stage('analysis.improvement_areas'):
+                improvement_areas = self._identify_improvement_areas(
+                    grade_analysis,
+                    attendance_analysis,
+                    study_habits_analysis
+                )
+        
+        # Generate summary
+        summary = {}
+        if 'summary' in stages:
+            with stage('analysis.summary'):
+                summary = self._generate_summary(
+                    grade_analysis,
+                    attendance_analysis,
+                    study_habits_analysis,
+                    predictions,
+                    improvement_areas
+                )
+        
+        results = {
+            'grade_analysis': grade_analysis,
+            'attendance_analysis': attendance_analysis,
+            'study_habits_analysis': study_habits_analysis,
+            'predictions': predictions,
+            'improvement_areas': improvement_areas,
+            'summary': summary
+        }
+        
+        requested = {section.split('.')[0] for section in sections}
+        return {name: value for name, value in results.items() if name in requested}
+
+    def _frames(self, student_data: Dict[str, Any]) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """Return the grades, attendance and study habits frames of a student's frame bundle."""
+        bundle = FrameBundle.of(student_data)
+        return bundle.frame('grades'), bundle.frame('attendance'), bundle.frame('study_habits')
+
+    def plan_analysis(self, sections: Iterable[str]) -> Set[str]:
+        """Resolve requested output sections into the stages they depend on."""
+        stages = set()
+        for section in sections:
+            if section not in ANALYSIS_SECTIONS:
+                raise ValueError(f"Unknown analysis section: {section}")
+            stages.update(ANALYSIS_SECTIONS[section])
+        return stages
+
+    def _shared(self, shared: Optional[Dict[str, Any]], key: str, compute: Callable[[], Any]) -> Any:
+        """Return an intermediate result, computing it once per analysis."""
+        if shared is None:
+            return compute()
+        if key not in shared:
+            shared[key] = compute()
+        return shared[key]
+
+    def _course_grade_stats(self, grades: pd.DataFrame, shared: Optional[Dict[str, Any]]) -> pd.DataFrame:
+        """Per-course score statistics shared by trends and predictions."""
+        return self._shared(
+            shared,
+            'course_grade_stats',
+            lambda: grades.groupby('course_id', sort=False, observed=True)['score'].agg(['size', 'mean', 'var', 'std', 'count'])
+        )
+
+    def _present_mask(self, attendance: pd.DataFrame, shared: Optional[Dict[str, Any]]) -> pd.Series:
+        """Boolean mask of present sessions shared by attendance stages."""
+        return self._shared(shared, 'present_mask', lambda: attendance['status'] == 'present')
+
+    def _course_attendance(self, attendance: pd.DataFrame, shared: Optional[Dict[str, Any]]) -> pd.DataFrame:
+        """Per-course attendance tallies shared by patterns and predictions."""
+        def compute():
+            present = self._present_mask(attendance, shared)
+            by_course = pd.DataFrame({
+                'present': present,
+                'absent': attendance['status'] == 'absent'
+            }).groupby(attendance['course_id'], sort=False, observed=True)
+            return pd.DataFrame({
+                'attendance_rate': by_course['present'].mean(),
+                'total_sessions': by_course.size(),
+                'missed_sessions': by_course['absent'].sum()
+            })
+
+        return self._shared(shared, 'course_attendance', compute)
+
+    def _subject_study(self, study_habits: pd.DataFrame, shared: Optional[Dict[str, Any]]) -> pd.DataFrame:
+        """Per-subject study tallies shared by patterns and predictions."""
+        return self._shared(
+            shared,
+            'subject_study',
+            lambda: study_habits.groupby('subject', sort=False, observed=True)['duration'].agg(['sum', 'mean', 'size', 'count'])
+        )
+
+    def _daily_study(self, study_habits: pd.DataFrame, shared: Optional[Dict[str, Any]]) -> pd.Series:
+        """Daily study minutes shared by stats and trends."""
+        return self._shared(
+            shared,
+            'daily_study',
+            lambda: study_habits.groupby(study_habits['date'].dt.normalize())['duration'].sum()
+        )
+
+    def analyze_cohort(self, grades: pd.DataFrame, attendance: pd.DataFrame, study_habits: pd.DataFrame) -> Dict[Any, Dict[str, Any]]:
+        """Analyze many students in one pass over long-format frames.
+
+        Each frame carries a ``student_id`` column next to the columns used by
+        ``analyze_performance``. Statistics, trends and patterns are computed
+        with grouped operations across the whole cohort, and the result maps
+        every student_id to the same structure ``analyze_performance`` returns
+        for that student on its own.
+        """
+        grades, attendance, study_habits = self._frames({
+            'grades': self._prepare_cohort_frame(grades),
+            'attendance': self._prepare_cohort_frame(attendance),
+            'study_habits': self._prepare_cohort_frame(study_habits)
+        })
+
+        # Perform grouped analyses
+        grade_analyses = self._analyze_cohort_grades(grades)
+        attendance_analyses = self._analyze_cohort_attendance(attendance)
+        study_habits_analyses = self._analyze_cohort_study_habits(study_habits)
+        predictions = self._generate_cohort_predictions(grades, attendance, study_habits)
+
+        student_ids = pd.unique(pd.concat([
+            grades['student_id'],
+            attendance['student_id'],
+            study_habits['student_id']
+        ], ignore_index=True))
+
+        results = {}
+        for student_id in student_ids:
+            grade_analysis = grade_analyses.get(student_id, {})
+            attendance_analysis = attendance_analyses.get(student_id, {})
+            study_habits_analysis = study_habits_analyses.get(student_id, {})
+            student_predictions = predictions.get(student_id, {})
+
+            improvement_areas = self._identify_improvement_areas(
+                grade_analysis,
+                attendance_analysis,
+                study_habits_analysis
+            )
+
+            summary = self._generate_summary(
+                grade_analysis,
+                attendance_analysis,
+                study_habits_analysis,
+                student_predictions,
+                improvement_areas
+            )
+
+            results[student_id] = {
+                'grade_analysis': grade_analysis,
+                'attendance_analysis': attendance_analysis,
+                'study_habits_analysis': study_habits_analysis,
+                'predictions': student_predictions,
+                'improvement_areas': improvement_areas,
+                'summary': summary
+            }
+
+        return results
+
+    def predict_batch(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Generate predictions for several students with one model pass.
+
+        Each entry is one student's data as passed to ``analyze_performance``,
+        and each result equals that student's ``predictions`` section.
+        """
+        # Stack the students into long-format frames keyed by batch position
+        frames = {}
+        for table in ('grades', 'attendance', 'study_habits'):
+            parts = [
+                pd.DataFrame(student_data.get(table, [])).assign(student_id=position)
+                for position, student_data in enumerate(batch)
+            ]
+            frames[table] = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame({'student_id': []})
+
+        predictions = self._generate_cohort_predictions(*self._frames(frames))
+        return [predictions.get(position, {}) for position in range(len(batch))]
+
+    def analyze_aggregates(self, aggregates: pd.DataFrame) -> Dict[str, Any]:
+        """Analyze a student from running per-course aggregates.
+
+        Takes the rows produced by ``AggregateStore.load_frame`` and answers
+        stats, course trends, per-course patterns and improvement areas without
+        the raw history. Day-level series such as daily rates and weekly
+        trends need the history and are left out.
+        """
+        grade_analysis = self._analyze_grade_aggregates(aggregates)
+        attendance_analysis = self._analyze_attendance_aggregates(aggregates)
+        study_habits_analysis = self._analyze_study_habit_aggregates(aggregates)
+
+        predictions = {}
+        if not aggregates.empty:
+            predictions = {
+                'final_grades': {course: trend['average'] for course, trend in grade_analysis.get('trends', {}).items()},
+                'attendance': {course: pattern['attendance_rate'] for course, pattern in attendance_analysis.get('patterns', {}).items()},
+                'study_habits': {subject: pattern['total_hours'] for subject, pattern in study_habits_analysis.get('patterns', {}).items()}
+            }
+
         improvement_areas = self._identify_improvement_areas(
             grade_analysis,
             attendance_analysis,
             study_habits_analysis
         )
-        
-        # Generate summary
+
         summary = self._generate_summary(
             grade_analysis,
             attendance_analysis,
@@ -86,7 +325,7 @@ class PerformanceAnalyzer:
             predictions,
             improvement_areas
         )
-        
+
         return {
             'grade_analysis': grade_analysis,
             'attendance_analysis': attendance_analysis,
@@ -96,136 +335,157 @@ class PerformanceAnalyzer:
             'summary': summary
         }
 
-    def _analyze_grades(self, grades: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_grades(self, grades: pd.DataFrame, stages: Iterable[str] = GRADE_STAGES, shared: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Analyze grade patterns and trends."""
         if grades.empty:
             return {}
         
-        # Convert date strings to datetime
-        grades['date'] = pd.to_datetime(grades['date'])
+        analysis = {}
         
         # Calculate basic statistics
-        stats = {
-            'average_score': grades['score'].mean(),
-            'highest_score': grades['score'].max(),
-            'lowest_score': grades['score'].min(),
-            'score_std': grades['score'].std(),
-            'total_assignments': len(grades),
-            'completed_assignments': len(grades[grades['score'].notna()])
-        }
+        if 'grade_stats' in stages:
+            analysis['stats'] = {
+                'average_score': grades['score'].mean(),
+                'highest_score': grades['score'].max(),
+                'lowest_score': grades['score'].min(),
+                'score_std': grades['score'].std(),
+                'total_assignments': len(grades),
+                'completed_assignments': len(grades[grades['score'].notna()])
+            }
         
         # Analyze trends by course
-        trends = {}
-        for course_id in grades['course_id'].unique():
-            course_grades = grades[grades['course_id'] == course_id]
-            if len(course_grades) > 1:
-                trend = self._calculate_trend(course_grades['score'])
-                trends[course_id] = {
-                    'trend': trend,
-                    'average': course_grades['score'].mean(),
-                    'variance': course_grades['score'].var()
+        if 'grade_trends' in stages:
+            trends = {}
+            course_stats = self._course_grade_stats(grades, shared)
+            course_trends = self.trend_engine.grouped_trends(grades, ['course_id'])
+            for row in course_stats[course_stats['size'] > 1].itertuples():
+                trends[row.Index] = {
+                    'trend': course_trends[row.Index],
+                    'average': row.mean,
+                    'variance': row.var
                 }
+            analysis['trends'] = trends
         
         # Identify grade patterns
-        patterns = self._identify_grade_patterns(grades)
+        if 'grade_patterns' in stages:
+            analysis['patterns'] = self._identify_grade_patterns(grades)
         
-        return {
-            'stats': stats,
-            'trends': trends,
-            'patterns': patterns
-        }
+        # Rolling, EWMA and momentum of scores by course
+        if 'grade_features' in stages:
+            analysis['features'] = self._latest_features(grades, 'course_id', 'score')
+        
+        return analysis
 
-    def _analyze_attendance(self, attendance: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_attendance(self, attendance: pd.DataFrame, stages: Iterable[str] = ATTENDANCE_STAGES, shared: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Analyze attendance patterns."""
         if attendance.empty:
             return {}
         
-        # Convert date strings to datetime
-        attendance['date'] = pd.to_datetime(attendance['date'])
+        analysis = {}
         
         # Calculate basic statistics
-        stats = {
-            'total_sessions': len(attendance),
-            'attended_sessions': len(attendance[attendance['status'] == 'present']),
-            'attendance_rate': len(attendance[attendance['status'] == 'present']) / len(attendance) if len(attendance) > 0 else 0
-        }
+        if 'attendance_stats' in stages:
+            attended = int(self._present_mask(attendance, shared).sum())
+            analysis['stats'] = {
+                'total_sessions': len(attendance),
+                'attended_sessions': attended,
+                'attendance_rate': attended / len(attendance) if len(attendance) > 0 else 0
+            }
         
         # Analyze patterns by course
-        patterns = {}
-        for course_id in attendance['course_id'].unique():
-            course_attendance = attendance[attendance['course_id'] == course_id]
-            patterns[course_id] = {
-                'attendance_rate': len(course_attendance[course_attendance['status'] == 'present']) / len(course_attendance),
-                'total_sessions': len(course_attendance),
-                'missed_sessions': len(course_attendance[course_attendance['status'] == 'absent'])
-            }
+        if 'attendance_patterns' in stages:
+            patterns = {}
+            for row in self._course_attendance(attendance, shared).itertuples():
+                patterns[row.Index] = {
+                    'attendance_rate': row.attendance_rate,
+                    'total_sessions': int(row.total_sessions),
+                    'missed_sessions': int(row.missed_sessions)
+                }
+            analysis['patterns'] = patterns
         
         # Identify attendance trends
-        trends = self._identify_attendance_trends(attendance)
-        
-        return {
-            'stats': stats,
-            'patterns': patterns,
-            'trends': trends
-        }
+        if 'attendance_trends' in stages:
+            analysis['trends'] = self._identify_attendance_trends(attendance)
+        
+        # Rolling, EWMA and momentum of attendance rates by course
+        if 'attendance_features' in stages:
+            analysis['features'] = self._latest_features(
+                pd.DataFrame({
+                    'course_id': attendance['course_id'],
+                    'date': attendance['date'],
+                    'present': self._present_mask(attendance, shared).astype(float)
+                }, copy=False),
+                'course_id',
+                'present'
+            )
+        
+        return analysis
 
-    def _analyze_study_habits(self, study_habits: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_study_habits(self, study_habits: pd.DataFrame, stages: Iterable[str] = STUDY_STAGES, shared: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Analyze study habits and patterns."""
         if study_habits.empty:
             return {}
         
-        # Convert date strings to datetime
-        study_habits['date'] = pd.to_datetime(study_habits['date'])
+        analysis = {}
         
         # Calculate basic statistics
-        stats = {
-            'total_study_hours': study_habits['duration'].sum(),
-            'average_daily_hours': study_habits.groupby(study_habits['date'].dt.date)['duration'].sum().mean(),
-            'total_sessions': len(study_habits),
-            'unique_subjects': study_habits['subject'].nunique()
-        }
+        if 'study_stats' in stages:
+            analysis['stats'] = {
+                'total_study_hours': study_habits['duration'].sum(),
+                'average_daily_hours': self._daily_study(study_habits, shared).mean(),
+                'total_sessions': len(study_habits),
+                'unique_subjects': study_habits['subject'].nunique()
+            }
         
         # Analyze patterns by subject
-        patterns = {}
-        for subject in study_habits['subject'].unique():
-            subject_habits = study_habits[study_habits['subject'] == subject]
-            patterns[subject] = {
-                'total_hours': subject_habits['duration'].sum(),
-                'average_session_duration': subject_habits['duration'].mean(),
-                'frequency': len(subject_habits)
-            }
+        if 'study_patterns' in stages:
+            patterns = {}
+            for row in self._subject_study(study_habits, shared).itertuples():
+                patterns[row.Index] = {
+                    'total_hours': row.sum,
+                    'average_session_duration': row.mean,
+                    'frequency': int(row.size)
+                }
+            analysis['patterns'] = patterns
         
         # Identify study habit trends
-        trends = self._identify_study_habits_trends(study_habits)
+        if 'study_trends' in stages:
+            analysis['trends'] = self._identify_study_habits_trends(study_habits, shared)
         
-        return {
-            'stats': stats,
-            'patterns': patterns,
-            'trends': trends
-        }
+        # Rolling, EWMA and momentum of daily study minutes by subject
+        if 'study_features' in stages:
+            analysis['features'] = self._latest_features(study_habits, 'subject', 'duration', per_day=True)
+        
+        return analysis
 
-    def _generate_predictions(self, grades: pd.DataFrame, attendance: pd.DataFrame, study_habits: pd.DataFrame) -> Dict[str, Any]:
+    def _generate_predictions(self, grades: pd.DataFrame, attendance: pd.DataFrame, study_habits: pd.DataFrame, shared: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Generate performance predictions."""
         predictions = {}
         
         # Prepare features for prediction
-        features = self._prepare_prediction_features(grades, attendance, study_habits)
+        features = self._prepare_prediction_features(grades, attendance, study_habits, shared)
         
         if not features.empty:
-            # Predict final grades
-            grade_predictions = self._predict_final_grades(features)
-            predictions['final_grades'] = grade_predictions
-            
-            # Predict attendance
-            attendance_predictions = self._predict_attendance(features)
-            predictions['attendance'] = attendance_predictions
-            
-            # Predict study habits
-            study_habits_predictions = self._predict_study_habits(features)
-            predictions['study_habits'] = study_habits_predictions
+            # Predict final grades, attendance and study habits
+            estimates = self._prediction_estimates(features, self.prediction_engine.predict(features))
+            for name, _, _ in PREDICTION_OUTPUTS:
+                predictions[name] = estimates[name].to_dict() if name in estimates else {}
         
         return predictions
 
+    def predict_from_features(self, features: pd.DataFrame) -> Dict[str, Any]:
+        """Generate performance predictions from stored feature rows indexed by course key."""
+        # Stored rows carry every column; drop the sources without any rows as build_features does
+        features = features.dropna(axis=1, how='all')
+        if features.empty:
+            return {}
+
+        predictions = {}
+        estimates = self._prediction_estimates(features, self.prediction_engine.predict(features))
+        for name, _, _ in PREDICTION_OUTPUTS:
+            predictions[name] = estimates[name].to_dict() if name in estimates else {}
+        return predictions
+
     def _identify_improvement_areas(self, grade_analysis: Dict[str, Any], attendance_analysis: Dict[str, Any], study_habits_analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Identify areas for improvement."""
         improvement_areas = []
@@ -285,23 +545,7 @@ class PerformanceAnalyzer:
 
     def _calculate_trend(self, values: pd.Series) -> str:
         """Calculate the trend of a series of values."""
-        if len(values) < 2:
-            return 'stable'
-        
-        x = np.arange(len(values)).reshape(-1, 1)
-        y = values.values.reshape(-1, 1)
-        
-        model = LinearRegression()
-        model.fit(x, y)
-        
-        slope = model.coef_[0][0]
-        
-        if slope > 0.1:
-            return 'improving'
-        elif slope < -0.1:
-            return 'declining'
-        else:
-            return 'stable'
+        return self.trend_engine.classify_slope(self.trend_engine.series_slope(values))
 
     def _identify_grade_patterns(self, grades: pd.DataFrame) -> List[Dict[str, Any]]:
         """Identify patterns in grade data."""
@@ -325,10 +569,8 @@ class PerformanceAnalyzer:
         """Identify trends in attendance data."""
         trends = {}
         
-        # Calculate daily attendance rates
-        daily_attendance = attendance.groupby(attendance['date'].dt.date)['status'].apply(
-            lambda x: (x == 'present').mean()
-        )
+        # Calculate daily attendance rates on a DatetimeIndex so they resample
+        daily_attendance = (attendance['status'] == 'present').groupby(attendance['date'].dt.normalize()).mean()
         
         # Calculate weekly trends
         weekly_trends = daily_attendance.resample('W').mean()
@@ -336,18 +578,18 @@ class PerformanceAnalyzer:
         # Identify patterns
         patterns = self._identify_attendance_patterns(attendance)
         
-        trends['daily_rates'] = daily_attendance.to_dict()
+        trends['daily_rates'] = {day.date(): rate for day, rate in daily_attendance.items()}
         trends['weekly_trends'] = weekly_trends.to_dict()
         trends['patterns'] = patterns
         
         return trends
 
-    def _identify_study_habits_trends(self, study_habits: pd.DataFrame) -> Dict[str, Any]:
+    def _identify_study_habits_trends(self, study_habits: pd.DataFrame, shared: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Identify trends in study habits data."""
         trends = {}
         
         # Calculate daily study hours
-        daily_study = study_habits.groupby(study_habits['date'].dt.date)['duration'].sum()
+        daily_study = self._daily_study(study_habits, shared)
         
         # Calculate weekly trends
         weekly_trends = daily_study.resample('W').mean()
@@ -355,72 +597,54 @@ class PerformanceAnalyzer:
         # Identify patterns
         patterns = self._identify_study_patterns(study_habits)
         
-        trends['daily_hours'] = daily_study.to_dict()
+        trends['daily_hours'] = {day.date(): minutes for day, minutes in daily_study.items()}
         trends['weekly_trends'] = weekly_trends.to_dict()
         trends['patterns'] = patterns
         
         return trends
 
-    def _prepare_prediction_features(self, grades: pd.DataFrame, attendance: pd.DataFrame, study_habits: pd.DataFrame) -> pd.DataFrame:
-        """Prepare features for prediction."""
-        features = pd.DataFrame()
-        
-        # Calculate grade features
-        if not grades.empty:
-            grade_features = grades.groupby('course_id').agg({
-                'score': ['mean', 'std', 'count']
-            })
-            grade_features.columns = ['grade_mean', 'grade_std', 'grade_count']
-            features = pd.concat([features, grade_features], axis=1)
-        
-        # Calculate attendance features
-        if not attendance.empty:
-            attendance_features = attendance.groupby('course_id').agg({
-                'status': lambda x: (x == 'present').mean()
-            })
-            attendance_features.columns = ['attendance_rate']
-            features = pd.concat([features, attendance_features], axis=1)
-        
-        # Calculate study habits features
-        if not study_habits.empty:
-            study_features = study_habits.groupby('subject').agg({
-                'duration': ['sum', 'mean', 'count']
-            })
-            study_features.columns = ['total_hours', 'avg_session_duration', 'session_count']
-            features = pd.concat([features, study_features], axis=1)
-        
-        return features
+    def _latest_features(self, frame: pd.DataFrame, key: str, value: str, per_day: bool = False) -> Dict[str, Any]:
+        """Latest rolling mean, EWMA and momentum of a value for every course or subject."""
+        if key not in frame or value not in frame:
+            return {}
 
-    def _predict_final_grades(self, features: pd.DataFrame) -> Dict[str, float]:
-        """Predict final grades for each course."""
-        predictions = {}
-        
-        if 'grade_mean' in features.columns:
-            # Simple prediction based on current performance
-            for course_id, row in features.iterrows():
-                predictions[course_id] = row['grade_mean']
-        
-        return predictions
+        # Momentum is undefined until there is a previous window; report it as null
+        features = self.time_series.latest(frame, [key], value, per_day)
+        features = features.astype({'rolling_mean': object, 'ewma': object, 'momentum': object})
+        features = features.where(features.notna(), None)
+        return {
+            row.Index: {
+                'rolling_mean': row.rolling_mean,
+                'ewma': row.ewma,
+                'momentum': row.momentum,
+                'observations': int(row.observations),
+                'as_of': row.as_of.date()
+            }
+            for row in features.itertuples()
+        }
 
-    def _predict_attendance(self, features: pd.DataFrame) -> Dict[str, float]:
-        """Predict future attendance rates."""
-        predictions = {}
-        
-        if 'attendance_rate' in features.columns:
-            for course_id, row in features.iterrows():
-                predictions[course_id] = row['attendance_rate']
-        
-        return predictions
+    def _prepare_prediction_features(self, grades: pd.DataFrame, attendance: pd.DataFrame, study_habits: pd.DataFrame, shared: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Prepare features for prediction."""
+        return self._shared(
+            shared,
+            'prediction_features',
+            lambda: build_features(grades, attendance, study_habits)
+        )
 
-    def _predict_study_habits(self, features: pd.DataFrame) -> Dict[str, float]:
-        """Predict future study habits."""
-        predictions = {}
-        
-        if 'total_hours' in features.columns:
-            for subject, row in features.iterrows():
-                predictions[subject] = row['total_hours']
-        
-        return predictions
+    def _prediction_estimates(self, features: pd.DataFrame, model_predictions: Optional[pd.DataFrame]) -> Dict[str, pd.Series]:
+        """Pick trained model predictions where a course has the data for them.
+
+        Without a trained model, or for courses missing the matching source,
+        the current value is carried forward.
+        """
+        estimates = {}
+        for name, feature, target in PREDICTION_OUTPUTS:
+            if feature in features.columns:
+                values = features[feature]
+                if model_predictions is not None:
+                    values = model_predictions[target].where(values.notna(), values)
+                estimates[name] = values
+        return estimates
 
     def _identify_grade_clusters(self, grade_distribution: pd.Series) -> List[Dict[str, Any]]:
         """Identify clusters in grade distribution."""
@@ -445,16 +669,20 @@ class PerformanceAnalyzer:
         """Analyze grade progression over time."""
         progression = []
         
-        for course_id in grades['course_id'].unique():
-            course_grades = grades[grades['course_id'] == course_id].sort_values('date')
-            if len(course_grades) > 1:
-                trend = self._calculate_trend(course_grades['score'])
+        ordered = grades.sort_values('date', kind='mergesort')
+        course_sizes = grades.groupby('course_id', sort=False, observed=True).size()
+        course_trends = self.trend_engine.grouped_trends(ordered, ['course_id'])
+        start_scores = ordered.drop_duplicates('course_id', keep='first').set_index('course_id')['score']
+        end_scores = ordered.drop_duplicates('course_id', keep='last').set_index('course_id')['score']
+        
+        for course_id, size in course_sizes.items():
+            if size > 1:
                 progression.append({
                     'type': 'progression',
                     'course_id': course_id,
-                    'trend': trend,
-                    'start_score': course_grades['score'].iloc[0],
-                    'end_score': course_grades['score'].iloc[-1]
+                    'trend': course_trends[course_id],
+                    'start_score': start_scores[course_id],
+                    'end_score': end_scores[course_id]
                 })
         
         return progression
@@ -464,10 +692,7 @@ class PerformanceAnalyzer:
         patterns = []
         
         # Analyze day-of-week patterns
-        attendance['day_of_week'] = attendance['date'].dt.dayofweek
-        day_patterns = attendance.groupby('day_of_week')['status'].apply(
-            lambda x: (x == 'present').mean()
-        )
+        day_patterns = (attendance['status'] == 'present').groupby(attendance['date'].dt.dayofweek).mean()
         
         for day, rate in day_patterns.items():
             if rate < 0.8:
@@ -484,8 +709,7 @@ class PerformanceAnalyzer:
         patterns = []
         
         # Analyze time-of-day patterns
-        study_habits['hour'] = study_habits['date'].dt.hour
-        time_patterns = study_habits.groupby('hour')['duration'].mean()
+        time_patterns = study_habits['duration'].groupby(study_habits['date'].dt.hour).mean()
         
         for hour, duration in time_patterns.items():
             if duration > 0:
@@ -495,4 +719,376 @@ class PerformanceAnalyzer:
                     'average_duration': duration
                 })
         
-        return patterns 
\ No newline at end of file
+        return patterns
+
+    def _prepare_cohort_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Copy a long-format cohort frame and parse its dates once."""
+        if frame is None or len(frame) == 0:
+            return pd.DataFrame({'student_id': pd.Series(dtype=object)})
+
+        frame = pd.DataFrame(frame).reset_index(drop=True)
+        frame['date'] = pd.to_datetime(frame['date'])
+        return frame
+
+    def _weekly_means(self, daily: pd.Series) -> pd.Series:
+        """Resample a (student_id, day)-indexed series to weekly means per student."""
+        days = daily.index.get_level_values(1)
+        weeks = days + pd.to_timedelta((6 - days.dayofweek) % 7, unit='D')
+        weekly = daily.groupby([daily.index.get_level_values(0), weeks]).mean()
+
+        # Fill the empty weeks between each student's first and last week like resample does
+        bounds = weekly.index.to_frame(index=False, name=['student_id', 'week']).groupby('student_id', sort=False)['week'].agg(['min', 'max'])
+        counts = ((bounds['max'] - bounds['min']).dt.days // 7 + 1).to_numpy()
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        full_index = pd.MultiIndex.from_arrays([
+            np.repeat(bounds.index.to_numpy(), counts),
+            np.repeat(bounds['min'].to_numpy(), counts) + pd.to_timedelta(offsets * 7, unit='D')
+        ])
+        return weekly.reindex(full_index)
+
+    def _split_by_student(self, series: pd.Series) -> Dict[Any, Dict[Any, Any]]:
+        """Split a (student_id, key)-indexed series into per-student dicts."""
+        result = {}
+        for (student_id, key), value in series.items():
+            result.setdefault(student_id, {})[key] = value
+        return result
+
+    def _analyze_cohort_grades(self, grades: pd.DataFrame) -> Dict[Any, Dict[str, Any]]:
+        """Analyze grade patterns and trends for every student in the cohort."""
+        if grades.empty:
+            return {}
+
+        keys = ['student_id', 'course_id']
+        by_student = grades.groupby('student_id', sort=False)['score']
+        stats = pd.DataFrame({
+            'average_score': by_student.mean(),
+            'highest_score': by_student.max(),
+            'lowest_score': by_student.min(),
+            'score_std': by_student.std(),
+            'total_assignments': by_student.size(),
+            'completed_assignments': by_student.count()
+        })
+
+        # Trend slopes in recorded order and in date order
+        by_course = grades.groupby(keys, sort=False, observed=True)
+        course_stats = by_course['score'].agg(['size', 'mean', 'var'])
+        course_trends = self.trend_engine.grouped_trends(grades, keys)
+
+        ordered = grades.sort_values('date', kind='mergesort')
+        ordered_trends = self.trend_engine.grouped_trends(ordered, keys)
+        start_scores = ordered.drop_duplicates(keys, keep='first').set_index(keys)['score']
+        end_scores = ordered.drop_duplicates(keys, keep='last').set_index(keys)['score']
+
+        # Grade range clusters
+        scores = grades['score']
+        ranges = [(0, 60), (60, 70), (70, 80), (80, 90), (90, 100)]
+        range_codes = pd.cut(scores, [start for start, _ in ranges] + [ranges[-1][1]], right=False, labels=False)
+        range_counts = range_codes.groupby([grades['student_id'], range_codes]).size()
+        scored_counts = by_student.count()
+
+        results = {
+            row.Index: {
+                'stats': {
+                    'average_score': row.average_score,
+                    'highest_score': row.highest_score,
+                    'lowest_score': row.lowest_score,
+                    'score_std': row.score_std,
+                    'total_assignments': int(row.total_assignments),
+                    'completed_assignments': int(row.completed_assignments)
+                },
+                'trends': {},
+                'patterns': []
+            }
+            for row in stats.itertuples()
+        }
+
+        for (student_id, code), count in range_counts.items():
+            start, end = ranges[int(code)]
+            results[student_id]['patterns'].append({
+                'type': 'grade_range',
+                'range': f"{start}-{end}",
+                'count': int(count),
+                'percentage': count / scored_counts[student_id]
+            })
+
+        multi_course = course_stats[course_stats['size'] > 1]
+        for row in multi_course.itertuples():
+            key = student_id, course_id = row.Index
+            results[student_id]['trends'][course_id] = {
+                'trend': course_trends[key],
+                'average': row.mean,
+                'variance': row.var
+            }
+            results[student_id]['patterns'].append({
+                'type': 'progression',
+                'course_id': course_id,
+                'trend': ordered_trends[key],
+                'start_score': start_scores[key],
+                'end_score': end_scores[key]
+            })
+
+        return results
+
+    def _analyze_cohort_attendance(self, attendance: pd.DataFrame) -> Dict[Any, Dict[str, Any]]:
+        """Analyze attendance patterns for every student in the cohort."""
+        if attendance.empty:
+            return {}
+
+        present = attendance['status'].eq('present')
+        absent = attendance['status'].eq('absent')
+        student_ids = attendance['student_id']
+
+        by_student = present.groupby(student_ids, sort=False)
+        stats = pd.DataFrame({
+            'total_sessions': by_student.size(),
+            'attended_sessions': by_student.sum()
+        })
+
+        by_course = pd.DataFrame({'present': present, 'absent': absent}).groupby(
+            [student_ids, attendance['course_id']], sort=False, observed=True
+        )
+        course_patterns = pd.DataFrame({
+            'attendance_rate': by_course['present'].mean(),
+            'total_sessions': by_course.size(),
+            'missed_sessions': by_course['absent'].sum()
+        })
+
+        # Daily, weekly and day-of-week rates
+        daily_rates = present.groupby([student_ids, attendance['date'].dt.normalize()]).mean()
+        weekly_trends = self._weekly_means(daily_rates)
+        day_rates = present.groupby([student_ids, attendance['date'].dt.dayofweek]).mean()
+        low_days = day_rates[day_rates < 0.8]
+
+        results = {
+            row.Index: {
+                'stats': {
+                    'total_sessions': int(row.total_sessions),
+                    'attended_sessions': int(row.attended_sessions),
+                    'attendance_rate': row.attended_sessions / row.total_sessions
+                },
+                'patterns': {},
+                'trends': {'daily_rates': {}, 'weekly_trends': {}, 'patterns': []}
+            }
+            for row in stats.itertuples()
+        }
+
+        for row in course_patterns.itertuples():
+            student_id, course_id = row.Index
+            results[student_id]['patterns'][course_id] = {
+                'attendance_rate': row.attendance_rate,
+                'total_sessions': int(row.total_sessions),
+                'missed_sessions': int(row.missed_sessions)
+            }
+
+        for (student_id, day), rate in daily_rates.items():
+            results[student_id]['trends']['daily_rates'][day.date()] = rate
+
+        for student_id, weeks in self._split_by_student(weekly_trends).items():
+            results[student_id]['trends']['weekly_trends'] = weeks
+
+        for (student_id, day), rate in low_days.items():
+            results[student_id]['trends']['patterns'].append({
+                'type': 'day_pattern',
+                'day': day,
+                'attendance_rate': rate
+            })
+
+        return results
+
+    def _analyze_cohort_study_habits(self, study_habits: pd.DataFrame) -> Dict[Any, Dict[str, Any]]:
+        """Analyze study habits for every student in the cohort."""
+        if study_habits.empty:
+            return {}
+
+        duration = study_habits['duration']
+        student_ids = study_habits['student_id']
+
+        daily_study = duration.groupby([student_ids, study_habits['date'].dt.normalize()]).sum()
+        by_student = duration.groupby(student_ids, sort=False)
+        stats = pd.DataFrame({
+            'total_study_hours': by_student.sum(),
+            'average_daily_hours': daily_study.groupby(level=0).mean(),
+            'total_sessions': by_student.size(),
+            'unique_subjects': study_habits['subject'].groupby(student_ids, sort=False).nunique()
+        })
+
+        by_subject = duration.groupby([student_ids, study_habits['subject']], sort=False, observed=True)
+        subject_patterns = pd.DataFrame({
+            'total_hours': by_subject.sum(),
+            'average_session_duration': by_subject.mean(),
+            'frequency': by_subject.size()
+        })
+
+        weekly_trends = self._weekly_means(daily_study)
+        hourly = duration.groupby([student_ids, study_habits['date'].dt.hour]).mean()
+        active_hours = hourly[hourly > 0]
+
+        results = {
+            row.Index: {
+                'stats': {
+                    'total_study_hours': row.total_study_hours,
+                    'average_daily_hours': row.average_daily_hours,
+                    'total_sessions': int(row.total_sessions),
+                    'unique_subjects': int(row.unique_subjects)
+                },
+                'patterns': {},
+                'trends': {'daily_hours': {}, 'weekly_trends': {}, 'patterns': []}
+            }
+            for row in stats.itertuples()
+        }
+
+        for row in subject_patterns.itertuples():
+            student_id, subject = row.Index
+            results[student_id]['patterns'][subject] = {
+                'total_hours': row.total_hours,
+                'average_session_duration': row.average_session_duration,
+                'frequency': int(row.frequency)
+            }
+
+        for (student_id, day), minutes in daily_study.items():
+            results[student_id]['trends']['daily_hours'][day.date()] = minutes
+
+        for student_id, weeks in self._split_by_student(weekly_trends).items():
+            results[student_id]['trends']['weekly_trends'] = weeks
+
+        for (student_id, hour), minutes in active_hours.items():
+            results[student_id]['trends']['patterns'].append({
+                'type': 'time_pattern',
+                'hour': hour,
+                'average_duration': minutes
+            })
+
+        return results
+
+    def _generate_cohort_predictions(self, grades: pd.DataFrame, attendance: pd.DataFrame, study_habits: pd.DataFrame) -> Dict[Any, Dict[str, Any]]:
+        """Generate performance predictions for every student in the cohort."""
+        features = build_features(grades, attendance, study_habits, by=['student_id'])
+        if features.empty:
+            return {}
+
+        estimates = self._prediction_estimates(features, self.prediction_engine.predict(features))
+        sources = {
+            'final_grades': set(grades['student_id']),
+            'attendance': set(attendance['student_id']),
+            'study_habits': set(study_habits['student_id'])
+        }
+
+        predictions = {}
+        for name, values in estimates.items():
+            for (student_id, key), value in values.items():
+                student_predictions = predictions.setdefault(
+                    student_id,
+                    {'final_grades': {}, 'attendance': {}, 'study_habits': {}}
+                )
+                # Keys only appear for students with rows in the matching source, as they do per student
+                if student_id in sources[name]:
+                    student_predictions[name][key] = value
+
+        return predictions
+
+    def _analyze_grade_aggregates(self, aggregates: pd.DataFrame) -> Dict[str, Any]:
+        """Combine per-course Welford states into grade stats and trends."""
+        courses = aggregates[aggregates['grade_rows'] > 0] if not aggregates.empty else aggregates
+        if courses.empty:
+            return {}
+
+        counts = courses['grade_count']
+        total = counts.sum()
+        mean = (counts * courses['grade_mean']).sum() / total if total > 0 else np.nan
+
+        # Chan et al. parallel combination of the per-course M2 terms
+        m2 = courses['grade_m2'].sum() + (counts * (courses['grade_mean'] - mean) ** 2).sum()
+
+        stats = {
+            'average_score': mean,
+            'highest_score': courses['grade_max'].max(),
+            'lowest_score': courses['grade_min'].min(),
+            'score_std': np.sqrt(m2 / (total - 1)) if total > 1 else np.nan,
+            'total_assignments': int(courses['grade_rows'].sum()),
+            'completed_assignments': int(total)
+        }
+
+        slopes = self.trend_engine.slopes_from_sums(
+            counts,
+            courses['grade_sum_x'],
+            courses['grade_sum_y'],
+            courses['grade_sum_xy'],
+            courses['grade_sum_xx']
+        )
+        labels = self.trend_engine.classify_slopes(slopes)
+        variances = courses['grade_m2'] / (counts - 1).where(counts > 1)
+
+        trends = {}
+        for index, row in courses[courses['grade_rows'] > 1].iterrows():
+            trends[row['course_id']] = {
+                'trend': labels[index],
+                'average': row['grade_mean'] if row['grade_count'] > 0 else np.nan,
+                'variance': variances[index]
+            }
+
+        return {
+            'stats': stats,
+            'trends': trends
+        }
+
+    def _analyze_attendance_aggregates(self, aggregates: pd.DataFrame) -> Dict[str, Any]:
+        """Build attendance stats and per-course patterns from tallies."""
+        courses = aggregates[aggregates['attendance_count'] > 0] if not aggregates.empty else aggregates
+        if courses.empty:
+            return {}
+
+        total_sessions = int(courses['attendance_count'].sum())
+        attended_sessions = int(courses['present_count'].sum())
+
+        patterns = {}
+        for _, row in courses.iterrows():
+            patterns[row['course_id']] = {
+                'attendance_rate': row['present_count'] / row['attendance_count'],
+                'total_sessions': int(row['attendance_count']),
+                'missed_sessions': int(row['absent_count'])
+            }
+
+        return {
+            'stats': {
+                'total_sessions': total_sessions,
+                'attended_sessions': attended_sessions,
+                'attendance_rate': attended_sessions / total_sessions
+            },
+            'patterns': patterns
+        }
+
+    def _analyze_study_habit_aggregates(self, aggregates: pd.DataFrame) -> Dict[str, Any]:
+        """Build study stats, subject patterns and hour-of-day patterns from tallies."""
+        subjects = aggregates[aggregates['study_sessions'] > 0] if not aggregates.empty else aggregates
+        if subjects.empty:
+            return {}
+
+        patterns = {}
+        for _, row in subjects.iterrows():
+            patterns[row['course_id']] = {
+                'total_hours': row['study_minutes'],
+                'average_session_duration': row['study_minutes'] / row['study_sessions'],
+                'frequency': int(row['study_sessions'])
+            }
+
+        hourly_minutes = np.array(subjects['hourly_minutes'].tolist(), dtype=float).sum(axis=0)
+        hourly_sessions = np.array(subjects['hourly_sessions'].tolist(), dtype=float).sum(axis=0)
+        time_patterns = []
+        for hour in np.flatnonzero(hourly_sessions):
+            if hourly_minutes[hour] > 0:
+                time_patterns.append({
+                    'type': 'time_pattern',
+                    'hour': int(hour),
+                    'average_duration': hourly_minutes[hour] / hourly_sessions[hour]
+                })
+
+        return {
+            'stats': {
+                'total_study_hours': subjects['study_minutes'].sum(),
+                'total_sessions': int(subjects['study_sessions'].sum()),
+                'unique_subjects': len(subjects)
+            },
+            'patterns': patterns,
+            'trends': {'patterns': time_patterns}
+        }
+
@@ -0,0 +1,104 @@
+from typing import Dict, Any, List, Optional, Set, Tuple
+import asyncio
+import time
+import logging
+from app.core.config import settings
+from app.services import analysis_tasks, stage_timing
+from app.services.metrics import Histogram, LATENCY_BUCKETS_MS
+from app.services.task_executor import AnalysisExecutor, analysis_executor
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+class PredictionBatcher:
+    """Micro-batch prediction requests from concurrent callers.
+
+    Requests are held for at most ``max_wait_ms`` or until ``max_batch_size``
+    have arrived, then sent to the analysis pool as one task. The task builds
+    every student's features and runs a single model pass over all of them,
+    so many small concurrent requests cost one task and one forward pass
+    instead of one each.
+    """
+
+    def __init__(self, executor: AnalysisExecutor = analysis_executor, max_batch_size: int = settings.PREDICTION_BATCH_MAX_SIZE, max_wait_ms: float = settings.PREDICTION_BATCH_MAX_WAIT_MS):
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The event loop only keeps weak references to tasks, so running batches are held here
+        self._running: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.failed_batches = 0
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+
+    async def predict(self, student_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue one student's data and await its predictions."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((student_data, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+
+        with stage_timing.stage('predictions.batched'):
+            return await future
+
+    def _flush(self) -> None:
+        """Send everything queued so far as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[Dict[str, Any], asyncio.Future, float]]) -> None:
+        """Run one batch in the pool and resolve each caller's future."""
+        self.batches += 1
+        self.batch_sizes.observe(len(batch))
+        started = time.perf_counter()
+        for _, _, queued_at in batch:
+            self.queue_wait_ms.observe((started - queued_at) * 1000)
+
+        try:
+            # The batch serves several requests, so its stages belong to none of them
+            with stage_timing.detach():
+                results = await self.executor.run(analysis_tasks.predict_batch, [student_data for student_data, _, _ in batch])
+        except Exception as e:
+            self.failed_batches += 1
+            logger.error(f"Prediction batch of {len(batch)} failed: {str(e)}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        finished = time.perf_counter()
+        for (_, future, queued_at), result in zip(batch, results):
+            self.latency_ms.observe((finished - queued_at) * 1000)
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return batch counts with batch size and latency histograms."""
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms,
+            'queued': len(self._pending),
+            'running': len(self._running),
+            'batches': self.batches,
+            'failed_batches': self.failed_batches,
+            'batch_size': self.batch_sizes.snapshot(),
+            'queue_wait_ms': self.queue_wait_ms.snapshot(),
+            'latency_ms': self.latency_ms.snapshot()
+        }
+
+prediction_batcher = PredictionBatcher()
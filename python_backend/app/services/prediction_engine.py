@@ -0,0 +1,222 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, Any, Iterable, Optional
+import json
+import os
+import logging
+from app.core.config import settings
+from app.services.trend_engine import TrendEngine
+
+logger = logging.getLogger(__name__)
+
+# Inputs of the trained models, one row per (student, course) key
+FEATURE_COLUMNS = [
+    'grade_mean',
+    'grade_std',
+    'grade_count',
+    'grade_slope',
+    'grade_last',
+    'attendance_rate',
+    'attendance_count',
+    'study_minutes',
+    'study_session_mean',
+    'study_sessions'
+]
+
+# Outputs of the random forest; the network predicts final_grade only
+TARGET_COLUMNS = ['final_grade', 'attendance_rate', 'study_minutes']
+
+LATEST_FILE = 'LATEST'
+MANIFEST_FILE = 'manifest.json'
+
+_trend_engine = TrendEngine()
+
+def build_features(grades: pd.DataFrame, attendance: pd.DataFrame, study_habits: pd.DataFrame, by: Iterable[str] = ()) -> pd.DataFrame:
+    """Build the model feature frame for every course key.
+
+    ``by`` names extra grouping columns such as ``student_id`` for cohort
+    frames. Study habits are keyed by subject, which lines up with course
+    ids the same way the rule-based predictions do. Columns are only
+    present for the sources that have rows, and the index is named
+    ``[*by, 'key']``.
+    """
+    by = list(by)
+    parts = []
+
+    if len(grades):
+        keys = by + ['course_id']
+        by_course = grades.groupby(keys, sort=False, observed=True)['score']
+        scored = grades[grades['score'].notna()]
+        parts.append(pd.DataFrame({
+            'grade_mean': by_course.mean(),
+            'grade_std': by_course.std(),
+            'grade_count': by_course.count(),
+            'grade_slope': _trend_engine.grouped_slopes(scored, keys),
+            'grade_last': by_course.last()
+        }))
+
+    if len(attendance):
+        present = (attendance['status'] == 'present').groupby(
+            [attendance[key] for key in by + ['course_id']],
+            sort=False,
+            observed=True
+        )
+        parts.append(pd.DataFrame({
+            'attendance_rate': present.mean(),
+            'attendance_count': present.size()
+        }))
+
+    if len(study_habits):
+        by_subject = study_habits.groupby(by + ['subject'], sort=False, observed=True)['duration']
+        parts.append(pd.DataFrame({
+            'study_minutes': by_subject.sum(),
+            'study_session_mean': by_subject.mean(),
+            'study_sessions': by_subject.count()
+        }))
+
+    if not parts:
+        return pd.DataFrame()
+
+    for part in parts:
+        part.index.names = by + ['key']
+    return pd.concat(parts, axis=1)
+
+class PredictionEngine:
+    """Serve predictions from versioned, memory-mapped model artifacts.
+
+    Artifacts written by ``ModelTrainer`` are plain ``.npy`` arrays: the
+    feature scaler, the network weights and the random forest flattened
+    into node arrays. Each process maps them read-only on first use, so
+    forked analysis workers share one copy in the page cache, and inference
+    runs in NumPy without importing sklearn or torch. Without artifacts,
+    ``predict`` returns None and callers keep their rule-based estimates.
+    """
+
+    def __init__(self, artifact_dir: str = settings.MODEL_ARTIFACT_DIR, version: str = settings.MODEL_VERSION):
+        self.artifact_dir = artifact_dir
+        self.version = version
+        self._arrays: Optional[Dict[str, np.ndarray]] = None
+        self._manifest: Optional[Dict[str, Any]] = None
+        self._loaded = False
+
+    def resolve_version(self) -> Optional[str]:
+        """Return the configured version, or the latest one trained."""
+        if self.version:
+            return self.version
+
+        latest = os.path.join(self.artifact_dir, LATEST_FILE)
+        if not os.path.exists(latest):
+            return None
+        with open(latest) as handle:
+            return handle.read().strip() or None
+
+    def load(self) -> bool:
+        """Map the artifacts once per process; returns whether a model is available."""
+        if self._loaded:
+            return self._arrays is not None
+        self._loaded = True
+
+        version = self.resolve_version()
+        if version is None:
+            logger.info("No trained prediction model found, using rule-based predictions")
+            return False
+
+        version_dir = os.path.join(self.artifact_dir, version)
+        try:
+            with open(os.path.join(version_dir, MANIFEST_FILE)) as handle:
+                manifest = json.load(handle)
+            arrays = {
+                name: np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode='r')
+                for name in manifest['arrays']
+            }
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Failed to load prediction model {version}: {str(e)}")
+            return False
+
+        if manifest['feature_columns'] != FEATURE_COLUMNS:
+            logger.error(f"Prediction model {version} was trained on different features, ignoring it")
+            return False
+
+        self._manifest = manifest
+        self._arrays = arrays
+        logger.info(f"Loaded prediction model {version}")
+        return True
+
+    def reload(self) -> bool:
+        """Drop the mapped artifacts and load the current version again."""
+        self._arrays = None
+        self._manifest = None
+        self._loaded = False
+        return self.load()
+
+    def info(self) -> Dict[str, Any]:
+        """Return the loaded model's version and training metrics."""
+        if not self.load():
+            return {'version': None}
+        return {
+            'version': self._manifest['version'],
+            'trained_at': self._manifest['trained_at'],
+            'training_rows': self._manifest['training_rows'],
+            'metrics': self._manifest['metrics']
+        }
+
+    def predict(self, features: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """Predict final grade, attendance rate and study minutes per feature row."""
+        if features.empty or not self.load():
+            return None
+
+        X = features.reindex(columns=FEATURE_COLUMNS).to_numpy(dtype=np.float64)
+        return pd.DataFrame(self.predict_matrix(X), index=features.index, columns=TARGET_COLUMNS)
+
+    def predict_matrix(self, X: np.ndarray) -> Optional[np.ndarray]:
+        """Predict the target columns for a matrix of rows in ``FEATURE_COLUMNS`` order.
+
+        Missing values are read as zero, as they were in training.
+        """
+        if not self.load():
+            return None
+
+        X = np.nan_to_num(np.asarray(X, dtype=np.float64), nan=0.0)
+        predictions = self._predict_forest(X)
+        # Average the two grade models
+        predictions[:, 0] = (predictions[:, 0] + self._predict_network(X)) / 2
+        predictions[:, 1] = predictions[:, 1].clip(0, 1)
+        predictions[:, 2] = predictions[:, 2].clip(0)
+        return predictions
+
+    def _predict_forest(self, X: np.ndarray) -> np.ndarray:
+        """Walk every flattened tree for every row at once and average the leaves."""
+        arrays = self._arrays
+        left = arrays['forest_left']
+        right = arrays['forest_right']
+        feature = arrays['forest_feature']
+        threshold = arrays['forest_threshold']
+
+        # Trees compare float32 inputs against their thresholds
+        X = X.astype(np.float32)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(arrays['forest_roots'], (len(X), len(arrays['forest_roots']))).copy()
+
+        while True:
+            children = left[nodes]
+            internal = children != -1
+            if not internal.any():
+                break
+            goes_left = X[rows, np.where(internal, feature[nodes], 0)] <= threshold[nodes]
+            nodes = np.where(internal, np.where(goes_left, children, right[nodes]), nodes)
+
+        return arrays['forest_value'][nodes].mean(axis=1)
+
+    def _predict_network(self, X: np.ndarray) -> np.ndarray:
+        """Run the network's forward pass with the trained weights."""
+        arrays = self._arrays
+        hidden = (X - arrays['scaler_mean']) / arrays['scaler_scale']
+        layers = self._manifest['network_layers']
+        for index in range(layers):
+            hidden = hidden @ arrays[f"network_w{index}"].T + arrays[f"network_b{index}"]
+            if index < layers - 1:
+                hidden = np.maximum(hidden, 0)
+
+        return hidden[:, 0] * arrays['target_scale'][0] + arrays['target_mean'][0]
+
+prediction_engine = PredictionEngine()
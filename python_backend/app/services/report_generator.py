@@ -1,29 +1,52 @@
-import matplotlib.pyplot as plt
-import seaborn as sns
 import pandas as pd
-import numpy as np
-from typing import Dict, Any, List
-import json
-from datetime import datetime, timedelta
+from typing import Dict, Any, List, TYPE_CHECKING
+from datetime import datetime
 import os
-from jinja2 import Environment, FileSystemLoader
-import pdfkit
-from io import BytesIO
-import base64
-import plotly.graph_objects as go
-import plotly.express as px
-from app.services.performance_analyzer import PerformanceAnalyzer
+from app.core.config import settings
+from app.services.chart_payload import chart, render_chart
+from app.services.downsampling import downsample_mapping, downsample_series
+from app.services.frame_bundle import FrameBundle
+from app.services.stage_timing import stage
+
+if TYPE_CHECKING:
+    from jinja2 import Environment
+
+# wkhtmltopdf options for rendered reports
+PDF_OPTIONS = {
+    'page-size': 'A4',
+    'margin-top': '0.75in',
+    'margin-right': '0.75in',
+    'margin-bottom': '0.75in',
+    'margin-left': '0.75in',
+    'encoding': 'UTF-8',
+    'no-outline': None,
+    'enable-local-file-access': None
+}
 
 class ReportGenerator:
     def __init__(self):
-        self.env = Environment(
-            loader=FileSystemLoader('templates')
-        )
-        self.setup_styles()
-        self.analyzer = PerformanceAnalyzer()
+        # jinja2, matplotlib and plotly are loaded on first use to keep startup cheap
+        self._env = None
+        self._styles_ready = False
+
+    @property
+    def env(self) -> 'Environment':
+        """Jinja2 template environment, created on first access."""
+        if self._env is None:
+            from jinja2 import Environment, FileSystemLoader
+            self._env = Environment(
+                loader=FileSystemLoader('templates')
+            )
+        return self._env
 
     def setup_styles(self):
-        """Set up matplotlib and seaborn styles."""
+        """Set up matplotlib and seaborn styles before rendering static figures."""
+        if self._styles_ready:
+            return
+
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
         plt.style.use('seaborn')
         sns.set_palette("husl")
         
@@ -31,17 +54,32 @@ class ReportGenerator:
         plt.rcParams['figure.figsize'] = [10, 6]
         plt.rcParams['figure.dpi'] = 100
         plt.rcParams['savefig.dpi'] = 300
+        self._styles_ready = True
+
+    def generate_report(self, student_data: Dict[str, Any], analysis_results: Dict[str, Any], chart_format: str = 'plotly', max_points: int = settings.CHART_MAX_POINTS) -> Dict[str, Any]:
+        """Generate a comprehensive performance report.
+
+        ``chart_format`` is ``'plotly'`` for full plotly figure dicts or
+        ``'compact'`` for each chart's kind and data series alone. Time
+        series in the charts and the daily attendance and study trends are
+        downsampled to at most ``max_points`` points each; 0 keeps them all.
+        """
+        student_data = FrameBundle.of(student_data)
 
-    def generate_report(self, student_data: Dict[str, Any], analysis_results: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate a comprehensive performance report."""
         # Calculate overall statistics
-        overall_stats = self._calculate_overall_stats(student_data)
+        with stage('report.stats'):
+            overall_stats = self._calculate_overall_stats(student_data)
         
         # Generate visualizations
-        visualizations = self._generate_visualizations(student_data, analysis_results)
+        visualizations = self._generate_visualizations(student_data, chart_format, max_points)
         
         # Generate recommendations
-        recommendations = self._generate_recommendations(analysis_results)
+        with stage('report.recommendations'):
+            recommendations = self._generate_recommendations(analysis_results)
+        
+        # Downsample the daily trend series carried in the analysis results
+        with stage('report.downsample'):
+            analysis_results = self._downsample_trends(analysis_results, max_points)
         
         return {
             'overall_stats': overall_stats,
@@ -52,9 +90,7 @@ class ReportGenerator:
 
     def _calculate_overall_stats(self, student_data: Dict[str, Any]) -> Dict[str, Any]:
         """Calculate overall performance statistics."""
-        grades = pd.DataFrame(student_data['grades'])
-        attendance = pd.DataFrame(student_data['attendance'])
-        study_habits = pd.DataFrame(student_data['study_habits'])
+        grades, attendance, study_habits = self._frames(student_data, 'grades', 'attendance', 'study_habits')
         
         # Calculate grade statistics
         grade_stats = {
@@ -85,23 +121,30 @@ class ReportGenerator:
             'study_stats': study_stats
         }
 
-    def _generate_visualizations(self, student_data: Dict[str, Any], analysis_results: Dict[str, Any]) -> Dict[str, Any]:
+    def generate_visualizations(self, student_data: Dict[str, Any], chart_format: str = 'plotly', max_points: int = settings.CHART_MAX_POINTS) -> Dict[str, Any]:
+        """Generate the full report's visualizations alone, which need only the student's rows."""
+        return self._generate_visualizations(FrameBundle.of(student_data), chart_format, max_points)
+
+    def _generate_visualizations(self, student_data: Dict[str, Any], chart_format: str = 'plotly', max_points: int = settings.CHART_MAX_POINTS) -> Dict[str, Any]:
         """Generate comprehensive visualizations."""
-        grades = pd.DataFrame(student_data['grades'])
-        attendance = pd.DataFrame(student_data['attendance'])
-        study_habits = pd.DataFrame(student_data['study_habits'])
+        with stage('report.frames'):
+            grades, attendance, study_habits = self._frames(student_data, 'grades', 'attendance', 'study_habits')
         
         # Grade trend visualization
-        grade_trend = self._create_grade_trend_plot(grades)
+        with stage('report.grade_trend'):
+            grade_trend = self._create_grade_trend_plot(grades, chart_format, max_points)
         
         # Attendance pattern visualization
-        attendance_pattern = self._create_attendance_pattern_plot(attendance)
+        with stage('report.attendance_pattern'):
+            attendance_pattern = self._create_attendance_pattern_plot(attendance, chart_format)
         
         # Study habits visualization
-        study_habits_plot = self._create_study_habits_plot(study_habits)
+        with stage('report.study_habits'):
+            study_habits_plot = self._create_study_habits_plot(study_habits, chart_format)
         
         # Performance distribution visualization
-        performance_dist = self._create_performance_distribution_plot(grades)
+        with stage('report.performance_distribution'):
+            performance_dist = self._create_performance_distribution_plot(grades, chart_format)
         
         return {
             'grade_trend': grade_trend,
@@ -110,6 +153,22 @@ class ReportGenerator:
             'performance_distribution': performance_dist
         }
 
+    def _downsample_trends(self, analysis_results: Dict[str, Any], max_points: int) -> Dict[str, Any]:
+        """Copy the analysis results with daily attendance rates and study minutes downsampled.
+
+        The results may be shared through the analysis cache, so only the
+        dicts on the path to each replaced series are copied.
+        """
+        results = dict(analysis_results)
+        for section, key in (('attendance_analysis', 'daily_rates'), ('study_habits_analysis', 'daily_hours')):
+            trends = results.get(section, {}).get('trends', {})
+            if key in trends:
+                results[section] = {
+                    **results[section],
+                    'trends': {**trends, key: downsample_mapping(trends[key], max_points)}
+                }
+        return results
+
     def _generate_recommendations(self, analysis_results: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Generate recommendations based on analysis results."""
         recommendations = []
@@ -146,93 +205,77 @@ class ReportGenerator:
         
         return recommendations
 
-    def _create_grade_trend_plot(self, grades: pd.DataFrame) -> Dict[str, Any]:
-        """Create a grade trend visualization."""
+    def _create_grade_trend_plot(self, grades: pd.DataFrame, chart_format: str = 'plotly', max_points: int = settings.CHART_MAX_POINTS) -> Dict[str, Any]:
+        """Create a grade trend visualization, downsampling each course to ``max_points``."""
         if grades.empty:
             return None
         
-        fig = go.Figure()
-        
+        series = []
         for course_id in grades['course_id'].unique():
             course_grades = grades[grades['course_id'] == course_id]
-            fig.add_trace(go.Scatter(
-                x=course_grades['date'],
-                y=course_grades['score'],
-                name=course_id,
-                mode='lines+markers'
-            ))
-        
-        fig.update_layout(
-            title='Grade Trends by Course',
-            xaxis_title='Date',
-            yaxis_title='Score',
-            showlegend=True
-        )
-        
-        return fig.to_dict()
-
-    def _create_attendance_pattern_plot(self, attendance: pd.DataFrame) -> Dict[str, Any]:
+            # Rows arrive in insertion order, and downsampling needs them in date order
+            if not course_grades['date'].is_monotonic_increasing:
+                course_grades = course_grades.sort_values('date', kind='stable')
+            dates, scores = downsample_series(course_grades['date'], course_grades['score'], max_points)
+            series.append({
+                'x': dates,
+                'y': scores,
+                'name': course_id
+            })
+        
+        return render_chart(chart('grade_trend', series), chart_format)
+
+    def _create_attendance_pattern_plot(self, attendance: pd.DataFrame, chart_format: str = 'plotly') -> Dict[str, Any]:
         """Create an attendance pattern visualization."""
         if attendance.empty:
             return None
         
-        attendance_by_course = attendance.groupby('course_id')['status'].value_counts(normalize=True).unstack()
-        
-        fig = go.Figure(data=[
-            go.Bar(name=status, x=attendance_by_course.index, y=attendance_by_course[status])
+        attendance_by_course = self._attendance_shares(attendance)
+        return render_chart(chart('attendance_pattern', self._status_series(attendance_by_course)), chart_format)
+
+    def _frames(self, student_data: Dict[str, Any], *tables: str) -> List[pd.DataFrame]:
+        """Return the named tables' frames from a student's frame bundle."""
+        bundle = FrameBundle.of(student_data)
+        return [bundle[table] for table in tables]
+
+    def _attendance_shares(self, attendance: pd.DataFrame) -> pd.DataFrame:
+        """Share of sessions with each status per course, one row per course."""
+        counts = attendance.groupby(['course_id', 'status'], observed=True).size()
+        return (counts / counts.groupby(level=0, observed=True).transform('sum')).unstack()
+
+    def _status_series(self, attendance_by_course: pd.DataFrame) -> List[Dict[str, Any]]:
+        """One stacked bar series per attendance status."""
+        return [
+            {'name': status, 'x': attendance_by_course.index, 'y': attendance_by_course[status]}
             for status in attendance_by_course.columns
-        ])
-        
-        fig.update_layout(
-            title='Attendance Patterns by Course',
-            xaxis_title='Course',
-            yaxis_title='Percentage',
-            barmode='stack'
-        )
-        
-        return fig.to_dict()
+        ]
 
-    def _create_study_habits_plot(self, study_habits: pd.DataFrame) -> Dict[str, Any]:
+    def _create_study_habits_plot(self, study_habits: pd.DataFrame, chart_format: str = 'plotly') -> Dict[str, Any]:
         """Create a study habits visualization."""
         if study_habits.empty:
             return None
         
-        study_by_subject = study_habits.groupby('subject')['duration'].sum()
-        
-        fig = go.Figure(data=[
-            go.Pie(labels=study_by_subject.index, values=study_by_subject.values)
-        ])
-        
-        fig.update_layout(
-            title='Study Time Distribution by Subject'
-        )
-        
-        return fig.to_dict()
+        study_by_subject = study_habits.groupby('subject', observed=True)['duration'].sum()
+        series = [{'labels': study_by_subject.index, 'values': study_by_subject.values}]
+        return render_chart(chart('study_habits', series), chart_format)
 
-    def _create_performance_distribution_plot(self, grades: pd.DataFrame) -> Dict[str, Any]:
+    def _create_performance_distribution_plot(self, grades: pd.DataFrame, chart_format: str = 'plotly') -> Dict[str, Any]:
         """Create a performance distribution visualization."""
         if grades.empty:
             return None
         
-        fig = go.Figure(data=[
-            go.Histogram(x=grades['score'], nbinsx=10)
-        ])
-        
-        fig.update_layout(
-            title='Grade Distribution',
-            xaxis_title='Score',
-            yaxis_title='Frequency'
-        )
-        
-        return fig.to_dict()
+        return render_chart(chart('performance_distribution', [{'x': grades['score']}]), chart_format)
+
+    def generate_summary_report(self, student_data: Dict[str, Any], analysis_results: Dict[str, Any], chart_format: str = 'plotly') -> Dict[str, Any]:
+        """Generate a concise summary report, with charts in ``chart_format``."""
+        student_data = FrameBundle.of(student_data)
 
-    def generate_summary_report(self, student_data: Dict[str, Any], analysis_results: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate a concise summary report."""
         # Calculate key metrics
-        key_metrics = self._calculate_key_metrics(student_data)
+        with stage('report.key_metrics'):
+            key_metrics = self._calculate_key_metrics(student_data)
         
         # Generate summary visualizations
-        summary_visualizations = self._generate_summary_visualizations(student_data)
+        summary_visualizations = self._generate_summary_visualizations(student_data, chart_format)
         
         return {
             'key_metrics': key_metrics,
@@ -242,8 +285,7 @@ class ReportGenerator:
 
     def _calculate_key_metrics(self, student_data: Dict[str, Any]) -> Dict[str, Any]:
         """Calculate key performance metrics."""
-        grades = pd.DataFrame(student_data['grades'])
-        attendance = pd.DataFrame(student_data['attendance'])
+        grades, attendance = self._frames(student_data, 'grades', 'attendance')
         
         # Calculate GPA
         gpa = grades['score'].mean() if not grades.empty else 0
@@ -260,72 +302,50 @@ class ReportGenerator:
             'completion_rate': completion_rate
         }
 
-    def _generate_summary_visualizations(self, student_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_summary_visualizations(self, student_data: Dict[str, Any], chart_format: str = 'plotly') -> Dict[str, Any]:
         """Generate summary visualizations."""
-        grades = pd.DataFrame(student_data['grades'])
-        attendance = pd.DataFrame(student_data['attendance'])
+        with stage('report.frames'):
+            grades, attendance = self._frames(student_data, 'grades', 'attendance')
         
         # Grade summary visualization
-        grade_summary = self._create_grade_summary_plot(grades)
+        with stage('report.grade_summary'):
+            grade_summary = self._create_grade_summary_plot(grades, chart_format)
         
         # Attendance summary visualization
-        attendance_summary = self._create_attendance_summary_plot(attendance)
+        with stage('report.attendance_summary'):
+            attendance_summary = self._create_attendance_summary_plot(attendance, chart_format)
         
         return {
             'grade_summary': grade_summary,
             'attendance_summary': attendance_summary
         }
 
-    def _create_grade_summary_plot(self, grades: pd.DataFrame) -> Dict[str, Any]:
+    def _create_grade_summary_plot(self, grades: pd.DataFrame, chart_format: str = 'plotly') -> Dict[str, Any]:
         """Create a grade summary visualization."""
         if grades.empty:
             return None
         
-        course_averages = grades.groupby('course_id')['score'].mean()
-        
-        fig = go.Figure(data=[
-            go.Bar(x=course_averages.index, y=course_averages.values)
-        ])
-        
-        fig.update_layout(
-            title='Average Grades by Course',
-            xaxis_title='Course',
-            yaxis_title='Average Score'
-        )
-        
-        return fig.to_dict()
+        course_averages = grades.groupby('course_id', observed=True)['score'].mean()
+        series = [{'x': course_averages.index, 'y': course_averages.values}]
+        return render_chart(chart('grade_summary', series), chart_format)
 
-    def _create_attendance_summary_plot(self, attendance: pd.DataFrame) -> Dict[str, Any]:
+    def _create_attendance_summary_plot(self, attendance: pd.DataFrame, chart_format: str = 'plotly') -> Dict[str, Any]:
         """Create an attendance summary visualization."""
         if attendance.empty:
             return None
         
-        attendance_by_course = attendance.groupby('course_id')['status'].value_counts(normalize=True).unstack()
-        
-        fig = go.Figure(data=[
-            go.Bar(name=status, x=attendance_by_course.index, y=attendance_by_course[status])
-            for status in attendance_by_course.columns
-        ])
-        
-        fig.update_layout(
-            title='Attendance Summary by Course',
-            xaxis_title='Course',
-            yaxis_title='Percentage',
-            barmode='stack'
-        )
-        
-        return fig.to_dict()
+        attendance_by_course = self._attendance_shares(attendance)
+        return render_chart(chart('attendance_summary', self._status_series(attendance_by_course)), chart_format)
 
     def generate_recommendations_report(self, analysis_results: Dict[str, Any]) -> Dict[str, Any]:
         """Generate a focused report on recommendations."""
         # Extract improvement areas
         improvement_areas = analysis_results.get('improvement_areas', [])
         
-        # Generate specific recommendations
-        recommendations = self._generate_specific_recommendations(improvement_areas)
-        
-        # Generate action plans
-        action_plans = self._generate_action_plans(recommendations)
+        # Generate specific recommendations and action plans
+        with stage('report.recommendations'):
+            recommendations = self._generate_specific_recommendations(improvement_areas)
+            action_plans = self._generate_action_plans(recommendations)
         
         return {
             'improvement_areas': improvement_areas,
@@ -366,59 +386,60 @@ class ReportGenerator:
         action_plans = []
         
         for recommendation in recommendations:
+            long_term_actions = [
+                "Develop a consistent study schedule",
+                "Build a support network of peers",
+                "Regularly review and adjust your strategies"
+            ]
             action_plans.append({
                 'area': recommendation['area'],
                 'short_term_actions': recommendation['specific_actions'],
-                'long_term_actions': [
-                    "Develop a consistent study schedule",
-                    "Build a support network of peers",
-                    "Regularly review and adjust your strategies"
-                ],
+                'long_term_actions': long_term_actions,
                 'timeline': {
                     'immediate': recommendation['specific_actions'][:2],
                     'one_week': recommendation['specific_actions'][2:],
-                    'one_month': recommendation['long_term_actions']
+                    'one_month': long_term_actions
                 }
             })
         
         return action_plans
 
-    def _convert_to_pdf(self, html_content: str) -> str:
-        """Convert HTML report to PDF."""
-        # Configure PDF options
-        options = {
-            'page-size': 'A4',
-            'margin-top': '0.75in',
-            'margin-right': '0.75in',
-            'margin-bottom': '0.75in',
-            'margin-left': '0.75in',
-            'encoding': 'UTF-8',
-            'no-outline': None,
-            'enable-local-file-access': None
-        }
-        
-        # Convert to PDF
-        pdf = pdfkit.from_string(html_content, False, options=options)
+    def render_pdf(self, student_info: Dict[str, Any], report: Dict[str, Any], path: str) -> int:
+        """Render a full report to a PDF file at ``path`` and return its size in bytes.
+
+        The PDF is written next to ``path`` and moved into place once
+        complete, so a reader never sees a partial file.
+        """
+        with stage('report.html'):
+            html_content = self._generate_html_report(student_info, report)
         
-        # Convert to base64 for storage/transmission
-        return base64.b64encode(pdf).decode()
+        import pdfkit
+
+        partial_path = f"{path}.partial"
+        with stage('report.pdf'):
+            pdfkit.from_string(html_content, partial_path, options=PDF_OPTIONS)
+        os.replace(partial_path, path)
+        return os.path.getsize(path)
 
-    def _generate_html_report(self, student_data: Dict[str, Any], analysis_results: Dict[str, Any], visualizations: Dict[str, str]) -> str:
+    def _generate_html_report(self, student_info: Dict[str, Any], report: Dict[str, Any]) -> str:
         """Generate HTML report using Jinja2 template."""
         template = self.env.get_template('report_template.html')
+        analysis_results = report.get('analysis_results', {})
         
         # Prepare data for template
         report_data = {
-            'student_name': student_data['name'],
-            'student_id': student_data['student_id'],
+            'student_name': student_info['name'],
+            'student_id': student_info['id'],
+            'major': student_info.get('major'),
+            'academic_year': student_info.get('academic_year'),
             'generation_date': datetime.now().strftime('%Y-%m-%d'),
-            'overall_performance': analysis_results['overall_performance'],
-            'subject_performance': analysis_results['subject_performance'],
-            'attendance_analysis': analysis_results['attendance_analysis'],
-            'study_habits_analysis': analysis_results['study_habits_analysis'],
-            'improvement_areas': analysis_results['improvement_areas'],
-            'predictions': analysis_results['predictions'],
-            'visualizations': visualizations
+            'overall_performance': report.get('overall_stats', {}),
+            'subject_performance': analysis_results.get('grade_analysis', {}).get('trends', {}),
+            'attendance_analysis': analysis_results.get('attendance_analysis', {}).get('patterns', {}),
+            'summary': analysis_results.get('summary', {}),
+            'improvement_areas': analysis_results.get('improvement_areas', []),
+            'predictions': analysis_results.get('predictions', {}),
+            'recommendations': report.get('recommendations', [])
         }
         
-        return template.render(**report_data) 
\ No newline at end of file
+        return template.render(**report_data)
@@ -2,7 +2,10 @@ from fastapi import BackgroundTasks
 from datetime import datetime, timedelta
 from typing import Dict, Any
 from app.services.notification_service import NotificationService
-from app.db.session import SessionLocal
+from app.models.events import Event, EventRSVP, NotificationPreference
+from app.core.database import AsyncSessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import asyncio
 import logging
 
@@ -49,9 +52,8 @@ class SchedulerService:
         """Check for upcoming events every hour."""
         while self.is_running:
             try:
-                db = SessionLocal()
-                await self.notification_service.process_upcoming_events(db)
-                db.close()
+                async with AsyncSessionLocal() as db:
+                    await self.notification_service.process_upcoming_events(db)
             except Exception as e:
                 logger.error(f"Error checking upcoming events: {str(e)}")
             
@@ -62,9 +64,8 @@ class SchedulerService:
         """Check for pending RSVPs every 6 hours."""
         while self.is_running:
             try:
-                db = SessionLocal()
-                await self.notification_service.process_pending_rsvps(db)
-                db.close()
+                async with AsyncSessionLocal() as db:
+                    await self.notification_service.process_pending_rsvps(db)
             except Exception as e:
                 logger.error(f"Error checking pending RSVPs: {str(e)}")
             
@@ -75,34 +76,8 @@ class SchedulerService:
         """Check for upcoming deadlines every 30 minutes."""
         while self.is_running:
             try:
-                db = SessionLocal()
-                now = datetime.utcnow()
-                tomorrow = now + timedelta(days=1)
-
-                # Get upcoming deadlines
-                events = db.query(Event).filter(
-                    Event.event_type.in_(['ASSIGNMENT', 'EXAM']),
-                    Event.start_time >= now,
-                    Event.start_time <= tomorrow
-                ).all()
-
-                for event in events:
-                    # Get RSVPs for the event
-                    rsvps = db.query(EventRSVP).filter(
-                        EventRSVP.event_id == event.id,
-                        EventRSVP.status == 'confirmed'
-                    ).all()
-
-                    for rsvp in rsvps:
-                        # Get user's notification preferences
-                        user_preference = db.query(NotificationPreference).filter(
-                            NotificationPreference.user_id == rsvp.user_id
-                        ).first()
-
-                        if user_preference:
-                            await self.notification_service.send_deadline_reminder(event, user_preference)
-
-                db.close()
+                async with AsyncSessionLocal() as db:
+                    await self._process_deadlines(db)
             except Exception as e:
                 logger.error(f"Error checking deadlines: {str(e)}")
             
@@ -116,39 +91,44 @@ class SchedulerService:
     async def _run_immediate_check(self):
         """Run an immediate check of all notifications."""
         try:
-            db = SessionLocal()
-            
-            # Check upcoming events
-            await self.notification_service.process_upcoming_events(db)
-            
-            # Check pending RSVPs
-            await self.notification_service.process_pending_rsvps(db)
-            
-            # Check deadlines
-            now = datetime.utcnow()
-            tomorrow = now + timedelta(days=1)
-            
-            events = db.query(Event).filter(
-                Event.event_type.in_(['ASSIGNMENT', 'EXAM']),
-                Event.start_time >= now,
-                Event.start_time <= tomorrow
-            ).all()
-
-            for event in events:
-                rsvps = db.query(EventRSVP).filter(
-                    EventRSVP.event_id == event.id,
-                    EventRSVP.status == 'confirmed'
-                ).all()
-
-                for rsvp in rsvps:
-                    user_preference = db.query(NotificationPreference).filter(
-                        NotificationPreference.user_id == rsvp.user_id
-                    ).first()
-
-                    if user_preference:
-                        await self.notification_service.send_deadline_reminder(event, user_preference)
-
-            db.close()
+            async with AsyncSessionLocal() as db:
+                # Check upcoming events
+                await self.notification_service.process_upcoming_events(db)
+
+                # Check pending RSVPs
+                await self.notification_service.process_pending_rsvps(db)
+
+                # Check deadlines
+                await self._process_deadlines(db)
+
             logger.info("Completed immediate notification check")
         except Exception as e:
-            logger.error(f"Error during immediate check: {str(e)}") 
\ No newline at end of file
+            logger.error(f"Error during immediate check: {str(e)}") 
+
+    async def _process_deadlines(self, db: AsyncSession) -> None:
+        """Send reminders for assignments and exams due in the next day."""
+        now = datetime.utcnow()
+        tomorrow = now + timedelta(days=1)
+
+        # Get upcoming deadlines
+        events = (await db.execute(select(Event).where(
+            Event.event_type.in_(['ASSIGNMENT', 'EXAM']),
+            Event.start_time >= now,
+            Event.start_time <= tomorrow
+        ))).scalars().all()
+
+        for event in events:
+            # Get RSVPs for the event
+            rsvps = (await db.execute(select(EventRSVP).where(
+                EventRSVP.event_id == event.id,
+                EventRSVP.status == 'confirmed'
+            ))).scalars().all()
+
+            for rsvp in rsvps:
+                # Get user's notification preferences
+                user_preference = (await db.execute(select(NotificationPreference).where(
+                    NotificationPreference.user_id == rsvp.user_id
+                ))).scalars().first()
+
+                if user_preference:
+                    await self.notification_service.send_deadline_reminder(event, user_preference)
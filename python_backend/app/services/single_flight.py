@@ -0,0 +1,56 @@
+from typing import Dict, Any, Awaitable, Callable, Hashable
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one computation.
+
+    The first caller for a key starts the work as a task; callers arriving
+    while it runs await the same task instead of starting their own. The
+    task is shielded, so a caller that disconnects does not cancel the work
+    for the others. Keys are released as soon as the work finishes, so
+    later calls start fresh.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Await the in-flight call for ``key`` or start ``func`` as that call."""
+        task = self._in_flight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        """Release the key and record the outcome."""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self.failed += 1
+            logger.debug(f"Coalesced call for {key!r} failed: {task.exception()}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return how many calls ran and how many joined a running one."""
+        calls = self.leaders + self.coalesced
+        return {
+            'in_flight': len(self._in_flight),
+            'leaders': self.leaders,
+            'coalesced': self.coalesced,
+            'failed': self.failed,
+            'coalesced_rate': self.coalesced / calls if calls else 0.0
+        }
@@ -0,0 +1,122 @@
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import threading
+import time
+from app.core.config import settings
+from app.services.metrics import LatencyWindow
+
+Timings = List[Tuple[str, float]]
+
+# Stage durations of the request (or pool task) running in this context
+_timings: ContextVar[Optional[Timings]] = ContextVar('stage_timings', default=None)
+
+_DISABLED = nullcontext()
+
+class _Stage:
+    """Context manager that appends one stage's duration to a timing list."""
+
+    __slots__ = ('name', 'timings', 'start')
+
+    def __init__(self, name: str, timings: Timings):
+        self.name = name
+        self.timings = timings
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timings.append((self.name, time.perf_counter() - self.start))
+        return False
+
+def stage(name: str):
+    """Time a block as a named stage of the current request.
+
+    Outside a request being timed, or with ``STAGE_TIMING_ENABLED`` off,
+    this returns a shared no-op context manager, so instrumented hot paths
+    pay one context variable lookup.
+    """
+    timings = _timings.get()
+    if timings is None:
+        return _DISABLED
+    return _Stage(name, timings)
+
+def record(name: str, seconds: float) -> None:
+    """Add a duration measured elsewhere, such as pool queue wait, to the current request."""
+    timings = _timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+def merge(timings: Timings) -> None:
+    """Add stage durations collected in another process to the current request."""
+    current = _timings.get()
+    if current is not None:
+        current.extend(timings)
+
+@contextmanager
+def collect(enabled: bool = settings.STAGE_TIMING_ENABLED) -> Iterator[Optional[Timings]]:
+    """Time the stages run inside the block, yielding the list they fill.
+
+    Yields None when timing is disabled. Used by the request middleware and
+    around pool tasks, whose timings travel back with their result.
+    """
+    if not enabled:
+        yield None
+        return
+
+    timings: Timings = []
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+@contextmanager
+def detach() -> Iterator[None]:
+    """Run the block outside any request's timing, for work shared by several requests."""
+    token = _timings.set(None)
+    try:
+        yield
+    finally:
+        _timings.reset(token)
+
+def totals(timings: Timings) -> Dict[str, float]:
+    """Sum the durations of repeated stages, in order of first appearance."""
+    result: Dict[str, float] = {}
+    for name, seconds in timings:
+        result[name] = result.get(name, 0.0) + seconds
+    return result
+
+def server_timing_header(timings: Timings) -> str:
+    """Format stage durations as a ``Server-Timing`` header value in milliseconds."""
+    return ', '.join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals(timings).items())
+
+class StageMetrics:
+    """Per-stage duration percentiles across timed requests."""
+
+    def __init__(self, window: int = settings.STAGE_TIMING_WINDOW):
+        self.window = window
+        self._stages: Dict[str, LatencyWindow] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, timings: Timings, total_seconds: float) -> None:
+        """Record one request's stage totals and its overall duration."""
+        for name, seconds in list(totals(timings).items()) + [('total', total_seconds)]:
+            window = self._stages.get(name)
+            if window is None:
+                with self._lock:
+                    window = self._stages.setdefault(name, LatencyWindow(self.window))
+            window.observe(seconds * 1000)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return count, mean and p50/p90/p99 milliseconds of every stage."""
+        with self._lock:
+            stages = dict(self._stages)
+        return {
+            'enabled': settings.STAGE_TIMING_ENABLED,
+            'window': self.window,
+            'stages_ms': {name: window.snapshot() for name, window in sorted(stages.items())}
+        }
+
+stage_metrics = StageMetrics()
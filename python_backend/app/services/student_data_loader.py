@@ -0,0 +1,181 @@
+from sqlalchemy import select, union, DateTime, Float, Integer
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Dict, Any, Awaitable, Callable, Iterable, List, Mapping, Optional
+from datetime import datetime
+import numpy as np
+from app.models.student import Assignment, Attendance, Grade, PerformanceMetric, Student, StudyHabit
+from app.services.categorical import encode_tables
+from app.services.stage_timing import stage
+
+STUDENT_COLUMNS = ('id', 'student_id', 'name', 'major', 'academic_year', 'created_at')
+
+# Tables that can be loaded for a student, keyed by their student_data name
+TABLES = {
+    'grades': Grade,
+    'attendance': Attendance,
+    'assignments': Assignment,
+    'study_habits': StudyHabit,
+    'performance_metrics': PerformanceMetric
+}
+
+# Columns read by analyze_performance and the report generator
+ANALYSIS_FIELDS = {
+    'grades': ('course_id', 'score', 'date'),
+    'attendance': ('course_id', 'status', 'date'),
+    'study_habits': ('subject', 'duration', 'date')
+}
+
+class StudentDataLoader:
+    """Fetch a student's rows as typed columnar arrays in a fixed number of queries.
+
+    Callers name the columns they need per table. The student row costs one
+    query and each requested table one more, no matter how many rows the
+    student has. Each table comes back as a dict of NumPy arrays: datetimes as
+    ``datetime64[ns]``, numbers as ``float64`` with NaN for NULL, low-cardinality
+    strings such as ``status`` and ``course_id`` as ``pd.Categorical`` sharing
+    dictionaries across tables, and other strings as object arrays.
+    ``pd.DataFrame`` builds frames from these without re-parsing anything.
+    """
+
+    def load(self, db: Session, student_id: str, fields: Mapping[str, Iterable[str]], start: Optional[datetime] = None, end: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Load the student row and the requested columns of each table."""
+        student = self.load_student(db, student_id)
+        if student is None:
+            return None
+
+        student.update(self.load_tables(db, student['id'], fields, start, end))
+        return student
+
+    async def load_for_student(self, db: AsyncSession, student: Dict[str, Any], fields: Mapping[str, Iterable[str]], start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, Any]:
+        """Load the requested tables for an already loaded student row."""
+        with stage('db.tables'):
+            tables = await db.run_sync(self.load_tables, student['id'], fields, start, end)
+        return {**student, **tables}
+
+    def loader(self, student: Dict[str, Any], fields: Mapping[str, Iterable[str]], start: Optional[datetime] = None, end: Optional[datetime] = None) -> Callable[[], Awaitable[Dict[str, Any]]]:
+        """Return a data loader for ``AnalysisService`` that reads through a session of its own.
+
+        Coalesced analyses run as tasks that can outlive the request that
+        started them, so they must not read through that request's session.
+        """
+        async def load():
+            from app.core.database import AsyncSessionLocal
+
+            async with AsyncSessionLocal() as db:
+                return await self.load_for_student(db, student, fields, start, end)
+
+        return load
+
+    def load_student(self, db: Session, student_id: str) -> Optional[Dict[str, Any]]:
+        """Load the student's identifying columns by external student_id."""
+        with stage('db.student'):
+            row = db.execute(
+                select(*[getattr(Student, column) for column in STUDENT_COLUMNS]).where(Student.student_id == student_id)
+            ).first()
+
+        if row is None:
+            return None
+        return dict(zip(STUDENT_COLUMNS, row))
+
+    def load_students(self, db: Session, student_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Load the identifying columns of several students by external student_id in one query.
+
+        Students are returned in the order given; unknown ids are skipped.
+        """
+        student_ids = list(student_ids)
+        with stage('db.student'):
+            rows = db.execute(
+                select(*[getattr(Student, column) for column in STUDENT_COLUMNS]).where(Student.student_id.in_(student_ids))
+            ).all()
+
+        students = {row.student_id: dict(zip(STUDENT_COLUMNS, row)) for row in rows}
+        return [students[student_id] for student_id in dict.fromkeys(student_ids) if student_id in students]
+
+    def load_course_students(self, db: Session, course_id: str) -> List[Dict[str, Any]]:
+        """Load every student with grades or attendance in a course, in one query."""
+        enrolled = union(
+            select(Grade.student_id).where(Grade.course_id == course_id),
+            select(Attendance.student_id).where(Attendance.course_id == course_id)
+        ).subquery()
+        with stage('db.student'):
+            rows = db.execute(
+                select(*[getattr(Student, column) for column in STUDENT_COLUMNS])
+                .where(Student.id.in_(select(enrolled.c.student_id)))
+                .order_by(Student.student_id)
+            ).all()
+        return [dict(zip(STUDENT_COLUMNS, row)) for row in rows]
+
+    def load_tables(self, db: Session, student_pk: int, fields: Mapping[str, Iterable[str]], start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+        """Load the requested columns of each table for a student primary key.
+
+        ``start`` and ``end`` bound the ``date`` column of tables that have one.
+        """
+        return encode_tables({
+            table: self._load_table(db, TABLES[table], student_pk, tuple(columns), start, end)
+            for table, columns in fields.items()
+        })
+
+    def load_tables_many(self, db: Session, student_pks: List[int], fields: Mapping[str, Iterable[str]]) -> Dict[int, Dict[str, Dict[str, Any]]]:
+        """Load the requested columns of each table for several students, one query per table.
+
+        Returns each student's tables keyed by primary key, in the shape
+        ``load_tables`` returns. Categorical columns share one dictionary
+        across all the students, and each student's arrays are slices of
+        the combined arrays rather than copies.
+        """
+        with stage('db.tables'):
+            tables = encode_tables({
+                table: self._load_table(db, TABLES[table], student_pks, ('student_id',) + tuple(columns), None, None)
+                for table, columns in fields.items()
+            })
+
+        students = {student_pk: {} for student_pk in student_pks}
+        for table, table_columns in tables.items():
+            # Rows are ordered by student, so each student's rows are one run
+            owners = table_columns.pop('student_id')
+            starts = np.searchsorted(owners, student_pks, side='left')
+            ends = np.searchsorted(owners, student_pks, side='right')
+            for student_pk, start, end in zip(student_pks, starts, ends):
+                students[student_pk][table] = {column: values[start:end] for column, values in table_columns.items()}
+        return students
+
+    def _load_table(self, db: Session, model: Any, student_pk: Any, columns: tuple, start: Optional[datetime], end: Optional[datetime]) -> Dict[str, np.ndarray]:
+        """Run one projected query and transpose its rows into arrays.
+
+        Rows come in date order, ties broken by id, for tables with a
+        ``date`` column, and in id order otherwise. ``student_pk`` is one
+        primary key, or a list of them, in which case rows are ordered by
+        student first.
+        """
+        attributes = [getattr(model, column) for column in columns]
+        order = [model.date, model.id] if hasattr(model, 'date') else [model.id]
+        if isinstance(student_pk, list):
+            query = select(*attributes).where(model.student_id.in_(student_pk))
+            order = [model.student_id] + order
+        else:
+            query = select(*attributes).where(model.student_id == student_pk)
+
+        if start is not None and hasattr(model, 'date'):
+            query = query.where(model.date >= start)
+        if end is not None and hasattr(model, 'date'):
+            query = query.where(model.date <= end)
+
+        # The trend calculations read rows in this order
+        rows = db.execute(query.order_by(*order)).all()
+        values = list(zip(*rows)) if rows else [()] * len(columns)
+
+        return {
+            column: self._to_array(column_values, attribute.type)
+            for column, attribute, column_values in zip(columns, attributes, values)
+        }
+
+    def _to_array(self, values: tuple, column_type: Any) -> np.ndarray:
+        """Convert one column of values into a typed array."""
+        if isinstance(column_type, DateTime):
+            return np.array(values, dtype='datetime64[ns]')
+        if isinstance(column_type, (Float, Integer)):
+            return np.array(values, dtype=np.float64)
+        return np.array(values, dtype=object)
+
+student_data_loader = StudentDataLoader()
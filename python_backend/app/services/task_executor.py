@@ -0,0 +1,177 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Callable, Optional, Tuple
+import asyncio
+import threading
+import time
+import logging
+from app.core.config import settings
+from app.services import stage_timing
+
+logger = logging.getLogger(__name__)
+
+class ExecutorError(Exception):
+    """Base error for tasks the analysis executor could not complete."""
+    status_code = 500
+
+class ExecutorSaturatedError(ExecutorError):
+    """Raised when the pool and its wait queue are full."""
+    status_code = 503
+
+class ExecutorTimeoutError(ExecutorError):
+    """Raised when a task does not finish within its timeout."""
+    status_code = 504
+
+class ExecutorBrokenError(ExecutorError):
+    """Raised when a worker process died while running or holding a task."""
+    status_code = 503
+
+def _timed_call(func: Callable, args: Tuple[Any, ...]) -> Tuple[Any, float, Optional[stage_timing.Timings]]:
+    """Run a task in the worker and report how long it ran and its stage timings."""
+    start = time.perf_counter()
+    with stage_timing.collect() as timings:
+        result = func(*args)
+    return result, time.perf_counter() - start, timings
+
+class AnalysisExecutor:
+    """Bounded process pool for CPU-bound analysis and report building.
+
+    Tasks run in worker processes so pandas, sklearn and plotly work never
+    blocks the event loop. At most ``max_workers + max_queue_depth`` tasks
+    may be pending; further submissions are rejected with
+    ``ExecutorSaturatedError``. A task that exceeds ``task_timeout`` fails
+    with ``ExecutorTimeoutError``; the worker finishes it in the background
+    but its result is discarded, and it keeps its slot until it does. If a
+    worker dies, its tasks fail with ``ExecutorBrokenError`` and the pool is
+    replaced. With ``max_workers=0`` tasks run inline, which is convenient
+    for development and debugging.
+    """
+
+    def __init__(self, max_workers: int = settings.ANALYSIS_POOL_WORKERS, max_queue_depth: int = settings.ANALYSIS_POOL_MAX_QUEUE, task_timeout: float = settings.ANALYSIS_TASK_TIMEOUT_SECONDS):
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.task_timeout = task_timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._started_at = time.monotonic()
+        self._lock = threading.Lock()  # pool tasks release their slot from the pool's thread
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.busy_seconds = 0.0
+        self.queue_wait_seconds = 0.0
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        """Worker pool, started on first use."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            logger.info(f"Started analysis pool with {self.max_workers} workers")
+        return self._pool
+
+    async def run(self, func: Callable, *args: Any, timeout: Optional[float] = None) -> Any:
+        """Run a picklable function in the pool and await its result."""
+        if self.pending >= self.max_workers + self.max_queue_depth:
+            self.rejected += 1
+            raise ExecutorSaturatedError("Analysis workers are busy, please retry shortly")
+
+        self.submitted += 1
+        submitted_at = time.perf_counter()
+        if self.max_workers == 0:
+            self._acquire()
+            try:
+                result, duration, timings = _timed_call(func, args)
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self._release()
+        else:
+            result, duration, timings = await self._run_in_pool(func, args, timeout or self.task_timeout)
+
+        queue_wait = max(time.perf_counter() - submitted_at - duration, 0.0)
+        self.completed += 1
+        self.busy_seconds += duration
+        self.queue_wait_seconds += queue_wait
+
+        stage_timing.record('pool.queue', queue_wait)
+        if timings:
+            stage_timing.merge(timings)
+        return result
+
+    async def _run_in_pool(self, func: Callable, args: Tuple[Any, ...], timeout: float) -> Tuple[Any, float, Optional[stage_timing.Timings]]:
+        """Submit a task to the pool and await it, holding its slot until the worker is done with it."""
+        pool = self.pool
+        try:
+            future = pool.submit(_timed_call, func, args)
+        except BrokenProcessPool:
+            # An earlier task's worker died; this task is not to blame, so retry it once on a new pool
+            self._replace(pool)
+            pool = self.pool
+            future = pool.submit(_timed_call, func, args)
+
+        self._acquire()
+        future.add_done_callback(self._release)
+        try:
+            # A timeout cancels the task if it is still queued; a running one keeps its slot until it ends
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise ExecutorTimeoutError(f"Analysis did not finish within {timeout:.0f} seconds")
+        except BrokenProcessPool:
+            self.failed += 1
+            self._replace(pool)
+            raise ExecutorBrokenError("An analysis worker stopped unexpectedly, please retry")
+        except Exception:
+            self.failed += 1
+            raise
+
+    def _acquire(self) -> None:
+        with self._lock:
+            self.pending += 1
+
+    def _release(self, future: Optional[Future] = None) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    def _replace(self, pool: ProcessPoolExecutor) -> None:
+        """Drop a broken pool so the next task starts a new one."""
+        if self._pool is not pool:
+            return
+
+        self._pool = None
+        self.restarts += 1
+        pool.shutdown(wait=False, cancel_futures=True)
+        logger.warning(f"Analysis pool broke, replacing it (restart {self.restarts})")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool occupancy, outcome counters and utilization."""
+        elapsed = time.monotonic() - self._started_at
+        capacity = elapsed * max(self.max_workers, 1)
+        return {
+            'max_workers': self.max_workers,
+            'max_queue_depth': self.max_queue_depth,
+            'task_timeout_seconds': self.task_timeout,
+            'running': min(self.pending, max(self.max_workers, 1)),
+            'queued': max(self.pending - max(self.max_workers, 1), 0),
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'timed_out': self.timed_out,
+            'rejected': self.rejected,
+            'pool_restarts': self.restarts,
+            'utilization': self.busy_seconds / capacity if capacity else 0.0,
+            'average_run_seconds': self.busy_seconds / self.completed if self.completed else 0.0,
+            'average_queue_wait_seconds': self.queue_wait_seconds / self.completed if self.completed else 0.0
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+analysis_executor = AnalysisExecutor()
@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+from typing import List, Tuple
+
+WINDOW_DAYS = 28
+HALFLIFE_DAYS = 14
+
+FEATURE_COLUMNS = ('rolling_mean', 'ewma', 'momentum', 'observations')
+
+class TimeSeriesFeatures:
+    """Rolling mean, EWMA and momentum of every group's daily series at once.
+
+    Rows are first collapsed to one bin per group and day, so memory follows
+    the number of active days rather than raw rows, and no calendar grid is
+    ever filled in. Windows are then solved for all groups together with
+    cumulative sums and binary search over a (group, day) key instead of a
+    per-group loop.
+
+    ``rolling_mean`` covers the last ``window_days`` days and ``momentum``
+    is its change against the window before. ``ewma`` halves each day's
+    weight every ``halflife_days`` days. Values are averaged per row, or
+    per calendar day with ``per_day=True``, which counts days without rows
+    as zero (for example study minutes per day).
+    """
+
+    def __init__(self, window_days: int = WINDOW_DAYS, halflife_days: float = HALFLIFE_DAYS):
+        self.window_days = window_days
+        self.halflife_days = halflife_days
+
+    @property
+    def lookback_days(self) -> int:
+        """Days of history that still move the latest features noticeably.
+
+        Covers the momentum's two windows and ten EWMA half-lives, beyond
+        which a day's weight is below 0.1%. Loaders that only need the
+        latest features can bound their query to this many days.
+        """
+        return int(max(2 * self.window_days, np.ceil(10 * self.halflife_days)))
+
+    def daily(self, frame: pd.DataFrame, keys: List[str], value: str) -> pd.DataFrame:
+        """Collapse rows into per-group daily sums and counts, sorted by group and day."""
+        values = frame[value].astype(float)
+        daily = pd.DataFrame({
+            **{key: frame[key] for key in keys},
+            'day': frame['date'].dt.normalize(),
+            'sum': values,
+            'count': values.notna().astype(float)
+        }).groupby(keys + ['day'], sort=True, observed=True).sum()
+        return daily[daily['count'] > 0]
+
+    def features(self, frame: pd.DataFrame, keys: List[str], value: str, per_day: bool = False) -> pd.DataFrame:
+        """Compute the features as of every active day of every group.
+
+        Returns a frame indexed by ``keys`` and ``day``. EWMA weights are
+        taken relative to each group's first day, which stays finite for
+        histories up to about a thousand half-lives.
+        """
+        daily = self.daily(frame, keys, value)
+        if daily.empty:
+            return pd.DataFrame(columns=FEATURE_COLUMNS, index=daily.index)
+
+        groups, days = self._codes(daily, keys)
+        sums = daily['sum'].to_numpy()
+        counts = daily['count'].to_numpy()
+
+        rolling_mean, observations = self._window_means(groups, days, sums, counts, 0, per_day)
+        previous_mean, _ = self._window_means(groups, days, sums, counts, self.window_days, per_day)
+
+        # Weight each day by 2^((day - first day) / halflife); the ratio of
+        # running sums is the EWMA as of every day
+        first_day = days[np.searchsorted(groups, groups, side='left')]
+        exponent = (days - first_day) * np.log(2) / self.halflife_days
+        weights = np.exp(exponent)
+        weighted_sums = pd.Series(weights * sums).groupby(groups).cumsum().to_numpy()
+        if per_day:
+            ewma = weighted_sums / weights / self._geometric(days - first_day + 1)
+        else:
+            ewma = weighted_sums / pd.Series(weights * counts).groupby(groups).cumsum().to_numpy()
+
+        return pd.DataFrame({
+            'rolling_mean': rolling_mean,
+            'ewma': ewma,
+            'momentum': rolling_mean - previous_mean,
+            'observations': observations
+        }, index=daily.index)
+
+    def latest(self, frame: pd.DataFrame, keys: List[str], value: str, per_day: bool = False) -> pd.DataFrame:
+        """Compute only each group's features as of its last active day.
+
+        Returns a frame indexed by ``keys`` with an ``as_of`` column. Only
+        sums over each group's rows are kept, never a per-day series.
+        """
+        daily = self.daily(frame, keys, value).reset_index('day')
+        if daily.empty:
+            return pd.DataFrame(columns=FEATURE_COLUMNS + ('as_of',))
+
+        by_group = daily.groupby(level=list(range(len(keys))), sort=False, observed=True)
+        last_day = by_group['day'].transform('max')
+        age = (last_day - daily['day']).dt.days.to_numpy()
+        sums = daily['sum'].to_numpy()
+        counts = daily['count'].to_numpy()
+
+        # Weights relative to the last day never exceed one
+        weights = np.exp(-age * np.log(2) / self.halflife_days)
+        in_window = age < self.window_days
+        in_previous = (age >= self.window_days) & (age < 2 * self.window_days)
+        parts = pd.DataFrame({
+            'window_sum': np.where(in_window, sums, 0.0),
+            'window_count': np.where(in_window, counts, 0.0),
+            'previous_sum': np.where(in_previous, sums, 0.0),
+            'previous_count': np.where(in_previous, counts, 0.0),
+            'weighted_sum': weights * sums,
+            'weighted_count': weights * counts,
+            'span': age
+        }, index=daily.index).groupby(level=list(range(len(keys))), sort=False, observed=True)
+        totals = parts.sum()
+        span = parts['span'].max()
+
+        if per_day:
+            rolling_mean = totals['window_sum'] / np.minimum(span + 1, self.window_days)
+            previous_days = np.clip(span + 1 - self.window_days, 0, self.window_days)
+            previous_mean = totals['previous_sum'] / previous_days.where(previous_days > 0)
+            ewma = totals['weighted_sum'] / self._geometric(span.to_numpy() + 1)
+        else:
+            rolling_mean = totals['window_sum'] / totals['window_count']
+            previous_mean = totals['previous_sum'] / totals['previous_count'].where(totals['previous_count'] > 0)
+            ewma = totals['weighted_sum'] / totals['weighted_count']
+
+        return pd.DataFrame({
+            'rolling_mean': rolling_mean,
+            'ewma': ewma,
+            'momentum': rolling_mean - previous_mean,
+            'observations': totals['window_count'],
+            'as_of': by_group['day'].max()
+        })
+
+    def _codes(self, daily: pd.DataFrame, keys: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ascending group numbers and day numbers of a sorted daily frame."""
+        groups = daily.groupby(level=list(range(len(keys))), sort=True, observed=True).ngroup().to_numpy()
+        days = daily.index.get_level_values('day').to_numpy().astype('datetime64[D]').astype(np.int64)
+        return groups, days
+
+    def _window_means(self, groups: np.ndarray, days: np.ndarray, sums: np.ndarray, counts: np.ndarray, lag: int, per_day: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """Mean over each row's window ``(day - lag - window, day - lag]`` within its group.
+
+        A combined (group, day) key keeps every window inside its group, so
+        one pair of binary searches serves all groups.
+        """
+        offset = days - days.min() + 2 * self.window_days
+        stride = offset.max() + 1
+        key = groups * stride + offset
+
+        upper = np.searchsorted(key, key - lag, side='right')
+        lower = np.searchsorted(key, key - lag - self.window_days, side='right')
+        cumulative_sums = np.r_[0.0, np.cumsum(sums)]
+        cumulative_counts = np.r_[0.0, np.cumsum(counts)]
+        window_sums = cumulative_sums[upper] - cumulative_sums[lower]
+        window_counts = cumulative_counts[upper] - cumulative_counts[lower]
+
+        if per_day:
+            # Days covered by the window since the group's first day
+            first_day = days[np.searchsorted(groups, groups, side='left')]
+            covered = np.clip(days - lag - first_day + 1, 0, self.window_days)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(covered > 0, window_sums / covered, np.nan), window_counts
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(window_counts > 0, window_sums / window_counts, np.nan), window_counts
+
+    def _geometric(self, days: np.ndarray) -> np.ndarray:
+        """Total EWMA weight of ``days`` consecutive days ending today."""
+        decay = 2 ** (-1 / self.halflife_days)
+        return (1 - decay ** days) / (1 - decay)
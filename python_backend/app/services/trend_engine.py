@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+IMPROVING_SLOPE = 0.1
+DECLINING_SLOPE = -0.1
+
+class TrendEngine:
+    """Closed-form least-squares trends computed from grouped sums.
+
+    Each value is regressed against its position within its group
+    (0, 1, 2, ...), so a group's slope only needs n, Σx, Σy, Σxy and Σx².
+    All groups are solved at once from a single grouped sum instead of
+    fitting one regression model per series.
+    """
+
+    def grouped_slopes(self, frame: pd.DataFrame, keys: List[str], value: str = 'score', position: Optional[pd.Series] = None) -> pd.Series:
+        """Compute the OLS slope of value against position for every group."""
+        if position is None:
+            position = frame.groupby(keys, sort=False, observed=True).cumcount()
+
+        # Rows without a value keep their position but stay out of every sum
+        y = frame[value]
+        scored = y.notna()
+        x = position.astype(float).where(scored, 0.0)
+        sums = pd.DataFrame({
+            **{key: frame[key] for key in keys},
+            'n': scored.astype(int),
+            'x': x,
+            'y': y,
+            'xy': x * y,
+            'xx': x * x
+        }).groupby(keys, sort=False, observed=True).sum(min_count=1)
+
+        return self.slopes_from_sums(sums['n'], sums['x'], sums['y'], sums['xy'], sums['xx'])
+
+    def slopes_from_sums(self, n: pd.Series, sum_x: pd.Series, sum_y: pd.Series, sum_xy: pd.Series, sum_xx: pd.Series) -> pd.Series:
+        """Solve OLS slopes from precomputed regression sums."""
+        # Centered form keeps the sums well conditioned for long series
+        denominator = sum_xx - sum_x ** 2 / n
+        numerator = sum_xy - sum_x * sum_y / n
+        return numerator / denominator.where(denominator != 0)
+
+    def series_slope(self, values: pd.Series) -> float:
+        """Compute the OLS slope of a single series against its position, skipping missing values."""
+        y = np.asarray(values, dtype=float)
+        scored = ~np.isnan(y)
+        x = np.arange(len(y), dtype=float)[scored]
+        y = y[scored]
+        n = len(y)
+        if n < 2:
+            return np.nan
+
+        denominator = (x * x).sum() - x.sum() ** 2 / n
+        return ((x * y).sum() - x.sum() * y.sum() / n) / denominator
+
+    def classify_slope(self, slope: float) -> str:
+        """Map a slope onto the improving/declining/stable labels."""
+        if slope > IMPROVING_SLOPE:
+            return 'improving'
+        elif slope < DECLINING_SLOPE:
+            return 'declining'
+        else:
+            return 'stable'
+
+    def classify_slopes(self, slopes: pd.Series) -> pd.Series:
+        """Map a series of slopes onto the improving/declining/stable labels."""
+        labels = np.where(
+            slopes > IMPROVING_SLOPE,
+            'improving',
+            np.where(slopes < DECLINING_SLOPE, 'declining', 'stable')
+        )
+        return pd.Series(labels, index=slopes.index)
+
+    def grouped_trends(self, frame: pd.DataFrame, keys: List[str], value: str = 'score', position: Optional[pd.Series] = None) -> pd.Series:
+        """Classify the trend of every group in one pass."""
+        return self.classify_slopes(self.grouped_slopes(frame, keys, value, position))
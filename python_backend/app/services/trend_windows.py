@@ -0,0 +1,91 @@
+from typing import Hashable, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from app.core.config import settings
+
+# Rolling windows named by the trends endpoint, in days before now
+ROLLING_PERIODS = {
+    'semester': 90,
+    'year': 365
+}
+
+PERIODS = tuple(ROLLING_PERIODS) + ('rolling', 'current_semester', 'previous_semester', 'custom', 'all')
+
+class TrendWindowError(ValueError):
+    """Raised when a trends window is unknown or its parameters are invalid."""
+
+class TrendWindow:
+    """A resolved ``[start, end]`` range over the ``date`` column.
+
+    ``start`` is None for unbounded windows. ``variant`` identifies the
+    window for the analysis cache: rolling windows are named by their length
+    rather than their bounds, so repeated requests share an entry until the
+    cache TTL expires.
+    """
+
+    def __init__(self, period: str, start: Optional[datetime], end: datetime, variant: Hashable):
+        self.period = period
+        self.start = start
+        self.end = end
+        self.variant = variant
+
+def semester_starts(year: int, starts: str = settings.SEMESTER_STARTS) -> List[datetime]:
+    """Return the configured semester start dates of a year, in order."""
+    days = []
+    for month_day in starts.split(','):
+        month, day = month_day.strip().split('-')
+        days.append(datetime(year, int(month), int(day)))
+    return sorted(days)
+
+def semester_bounds(at: datetime, offset: int = 0, starts: str = settings.SEMESTER_STARTS) -> Tuple[datetime, datetime]:
+    """Return the start and end of the semester containing ``at``, shifted by ``offset`` semesters.
+
+    A semester runs from its start date up to the next one's.
+    """
+    boundaries = [
+        start
+        for year in range(at.year - 1 - abs(offset), at.year + 2 + abs(offset))
+        for start in semester_starts(year, starts)
+    ]
+    current = max(index for index, start in enumerate(boundaries) if start <= at)
+    index = current + offset
+    return boundaries[index], boundaries[index + 1] - timedelta(microseconds=1)
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Return a datetime as naive UTC, leaving naive ones untouched."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def resolve_window(period: str, now: datetime, days: Optional[int] = None, start: Optional[datetime] = None, end: Optional[datetime] = None) -> TrendWindow:
+    """Resolve a trends period and its parameters into a date range.
+
+    ``rolling`` takes ``days``, ``custom`` takes ``start`` and an optional
+    ``end``, and ``all`` has no lower bound, so rows dated before the
+    student record was created still count. Timezone-aware bounds are
+    converted to naive UTC, which is how dates are stored.
+    """
+    if period in ROLLING_PERIODS:
+        return TrendWindow(period, now - timedelta(days=ROLLING_PERIODS[period]), now, (period,))
+
+    if period == 'rolling':
+        if days is None or days < 1:
+            raise TrendWindowError("Rolling windows need days >= 1")
+        return TrendWindow(period, now - timedelta(days=days), now, (period, days))
+
+    if period in ('current_semester', 'previous_semester'):
+        semester_start, semester_end = semester_bounds(now, 0 if period == 'current_semester' else -1)
+        return TrendWindow(period, semester_start, min(semester_end, now), (period, semester_start))
+
+    if period == 'custom':
+        if start is None:
+            raise TrendWindowError("Custom windows need a start_date")
+        start = to_naive_utc(start)
+        end = to_naive_utc(end or now)
+        if start > end:
+            raise TrendWindowError("start_date must not be after end_date")
+        return TrendWindow(period, start, end, (period, start, end))
+
+    if period == 'all':
+        return TrendWindow(period, None, now, (period,))
+
+    raise TrendWindowError(f"Unknown period '{period}', expected one of: {', '.join(PERIODS)}")
@@ -0,0 +1,172 @@
+"""Time every analysis stage and report visualization against stored baselines.
+
+Single-student scenarios analyze one synthetic student per history length,
+one requested section at a time, so each stage's cost shows up on its own.
+Report visualizations are timed on the same data. Cohort scenarios time
+``analyze_cohort`` and its grouped stages per cohort size. Each measurement
+records the best wall time over ``--repeat`` runs and, from one extra traced
+run, the peak memory allocated.
+
+Results are compared against ``benchmarks/baselines/analytics.json``. A
+measurement that is slower or allocates more than ``--tolerance`` over its
+baseline is flagged and the run exits non-zero. Record baselines on the
+reference machine with ``--save-baseline``.
+
+Run from the python_backend directory:
+
+    python -m benchmarks.bench_analytics
+    python -m benchmarks.bench_analytics --rows-per-student 10 1000 100000 1000000 --cohort-students 10 1000 100000
+    python -m benchmarks.bench_analytics --save-baseline
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+from app.services.performance_analyzer import PerformanceAnalyzer, ANALYSIS_SECTIONS
+from app.services.report_generator import ReportGenerator
+from benchmarks.synthetic import generate_cohort, generate_student
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baselines', 'analytics.json')
+
+# Changes below these are timer and allocator noise, never regressions
+NOISE_FLOOR = {'seconds': 0.002, 'peak_mb': 0.5}
+
+# One section per stage; whole-table sections only repeat their sub-sections
+STAGE_SECTIONS = [section for section in ANALYSIS_SECTIONS if '.' in section] + ['predictions', 'improvement_areas', 'summary']
+
+# Report visualizations and the table each one draws
+VISUALIZATIONS = {
+    'grade_trend_plot': 'grades',
+    'attendance_pattern_plot': 'attendance',
+    'study_habits_plot': 'study_habits',
+    'performance_distribution_plot': 'grades',
+    'grade_summary_plot': 'grades',
+    'attendance_summary_plot': 'attendance'
+}
+
+
+def measure(func, repeat: int) -> dict:
+    """Return the best wall time of several runs and the peak memory of one traced run."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': min(timings), 'peak_mb': peak / 2 ** 20}
+
+
+def student_benchmarks(rows: int, repeat: int, reports: bool) -> dict:
+    """Time each analysis stage, and each report visualization, for one student."""
+    analyzer = PerformanceAnalyzer()
+    data = generate_student(rows)
+    results = {}
+
+    results['frames'] = measure(lambda: analyzer._frames(data), repeat)
+    for section in STAGE_SECTIONS:
+        results[section] = measure(lambda: analyzer.analyze_performance(data, [section]), repeat)
+
+    if reports:
+        generator = ReportGenerator()
+        for name, table in VISUALIZATIONS.items():
+            plot = getattr(generator, f"_create_{name}")
+            results[f"report.{name}"] = measure(lambda: plot(generator._frames(data, table)[0]), repeat)
+
+    return results
+
+
+def cohort_benchmarks(students: int, rows: int, repeat: int) -> dict:
+    """Time the grouped cohort stages and the whole cohort analysis."""
+    analyzer = PerformanceAnalyzer()
+    tables = generate_cohort(students, rows)
+    grades, attendance, study_habits = analyzer._frames({
+        table: analyzer._prepare_cohort_frame(frame) for table, frame in tables.items()
+    })
+
+    return {
+        'grades': measure(lambda: analyzer._analyze_cohort_grades(grades), repeat),
+        'attendance': measure(lambda: analyzer._analyze_cohort_attendance(attendance), repeat),
+        'study_habits': measure(lambda: analyzer._analyze_cohort_study_habits(study_habits), repeat),
+        'predictions': measure(lambda: analyzer._generate_cohort_predictions(grades, attendance, study_habits), repeat),
+        'analyze_cohort': measure(lambda: analyzer.analyze_cohort(tables['grades'], tables['attendance'], tables['study_habits']), repeat)
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Return the measurements that regressed past the tolerance."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in ('seconds', 'peak_mb'):
+            if result[metric] > previous[metric] * (1 + tolerance) + NOISE_FLOOR[metric]:
+                regressions.append((name, metric, previous[metric], result[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows-per-student', type=int, nargs='+', default=[10, 1000, 100000])
+    parser.add_argument('--cohort-students', type=int, nargs='+', default=[10, 1000])
+    parser.add_argument('--cohort-rows', type=int, default=100, help="Rows per table per student in cohort scenarios")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-reports', action='store_true', help="Skip the report visualizations")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown or memory growth, as a fraction")
+    parser.add_argument('--save-baseline', action='store_true', help="Overwrite the baseline with this run")
+    args = parser.parse_args()
+
+    results = {}
+    for rows in args.rows_per_student:
+        for stage, result in student_benchmarks(rows, args.repeat, not args.no_reports).items():
+            results[f"student/{rows}/{stage}"] = result
+    for students in args.cohort_students:
+        for stage, result in cohort_benchmarks(students, args.cohort_rows, args.repeat).items():
+            results[f"cohort/{students}x{args.cohort_rows}/{stage}"] = result
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+
+    print(f"{'benchmark':60s} {'time':>10s} {'peak':>10s} {'vs baseline':>12s}")
+    for name, result in results.items():
+        previous = baseline.get(name)
+        change = f"{result['seconds'] / previous['seconds'] - 1:+11.0%}" if previous else f"{'new':>11s}"
+        print(f"{name:60s} {result['seconds'] * 1000:8.1f}ms {result['peak_mb']:8.1f}MB {change}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump({
+                'timestamp': datetime.utcnow().isoformat(),
+                'pandas': pd.__version__,
+                'python': sys.version.split()[0],
+                'results': results
+            }, baseline_file, indent=2, sort_keys=True)
+        print(f"baseline written to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    for name, metric, previous, current in regressions:
+        print(f"REGRESSION {name} {metric}: {previous:.4g} -> {current:.4g}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
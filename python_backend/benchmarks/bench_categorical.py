@@ -0,0 +1,79 @@
+"""Benchmark categorical encoding of attendance against plain object strings.
+
+Run from the python_backend directory:
+
+    python -m benchmarks.bench_categorical --students 20000 --rows-per-student 150
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.categorical import encode_tables
+from app.services.performance_analyzer import PerformanceAnalyzer
+
+
+def make_attendance(students: int, rows_per_student: int, courses: int, seed: int = 42) -> pd.DataFrame:
+    """Build a long-format attendance frame with object string columns."""
+    rng = np.random.default_rng(seed)
+    rows = students * rows_per_student
+    course_names = np.array([f"COURSE{i:03d}" for i in range(courses)], dtype=object)
+    statuses = np.array(['present', 'absent', 'late'], dtype=object)
+    return pd.DataFrame({
+        'student_id': np.repeat(np.arange(students), rows_per_student),
+        'course_id': course_names[rng.integers(0, courses, rows)],
+        'status': statuses[rng.choice(3, rows, p=[0.85, 0.1, 0.05])],
+        'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 180 * 24, rows), unit='h')
+    })
+
+
+def attendance_rates(attendance: pd.DataFrame) -> pd.Series:
+    """Per (student, course) attendance rate, the core of the analyzer's attendance stats."""
+    present = attendance['status'].eq('present')
+    return present.groupby([attendance['student_id'], attendance['course_id']], sort=False, observed=True).mean()
+
+
+def best_of(func, frame: pd.DataFrame, repeat: int) -> float:
+    """Return the fastest of several timed runs in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(frame)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--rows-per-student', type=int, default=150)
+    parser.add_argument('--courses', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    plain = make_attendance(args.students, args.rows_per_student, args.courses)
+    encoded = encode_tables({'attendance': plain})['attendance']
+
+    if not attendance_rates(plain).sort_index().equals(attendance_rates(encoded).sort_index()):
+        raise SystemExit("Attendance rates differ between object and categorical columns")
+
+    analyzer = PerformanceAnalyzer()
+    benchmarks = [
+        ('present mask', lambda frame: frame['status'].eq('present')),
+        ('rate per student/course', attendance_rates),
+        ('cohort attendance analysis', analyzer._analyze_cohort_attendance)
+    ]
+
+    plain_mb = plain.memory_usage(deep=True).sum() / 2 ** 20
+    encoded_mb = encoded.memory_usage(deep=True).sum() / 2 ** 20
+    print(f"rows: {len(plain):,}  students: {args.students:,}  courses: {args.courses}")
+    print(f"{'memory':28s} {plain_mb:10.1f} MB {encoded_mb:10.1f} MB {plain_mb / encoded_mb:8.1f}x")
+    for name, func in benchmarks:
+        plain_time = best_of(func, plain, args.repeat)
+        encoded_time = best_of(func, encoded, args.repeat)
+        print(f"{name:28s} {plain_time * 1000:10.1f} ms {encoded_time * 1000:10.1f} ms {plain_time / encoded_time:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Compare compact chart payloads against full plotly figure dicts.
+
+Builds the full report's and the summary report's visualizations for one
+synthetic student per history length in each format, then serializes them
+to JSON: plotly dicts with plotly's encoder, which they need for NumPy
+arrays and timestamps, compact payloads with the standard encoder. Reports
+build and serialization time and raw and gzipped response size.
+
+Run from the python_backend directory:
+
+    python -m benchmarks.bench_chart_payload
+    python -m benchmarks.bench_chart_payload --rows-per-student 100 10000 100000 --repeat 5
+"""
+import argparse
+import gzip
+import json
+import time
+
+from plotly.utils import PlotlyJSONEncoder
+
+from app.services.chart_payload import CHART_FORMATS, chart_templates
+from app.services.frame_bundle import FrameBundle
+from app.services.report_generator import ReportGenerator
+from benchmarks.synthetic import generate_student
+
+
+def build(generator: ReportGenerator, bundle: FrameBundle, chart_format: str) -> dict:
+    """Build every report visualization in one format."""
+    return {
+        'full': generator.generate_visualizations(bundle, chart_format),
+        'summary': generator._generate_summary_visualizations(bundle, chart_format)
+    }
+
+
+def serialize(visualizations: dict, chart_format: str) -> bytes:
+    """Encode visualizations the way a response body would be."""
+    if chart_format == 'plotly':
+        return json.dumps(visualizations, cls=PlotlyJSONEncoder).encode()
+    return json.dumps(visualizations).encode()
+
+
+def best_of(func, repeat: int):
+    """Return the fastest of several timed runs in seconds, and the last result."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows-per-student', type=int, nargs='+', default=[100, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    generator = ReportGenerator()
+    templates = json.dumps(chart_templates()).encode()
+    print(f"chart templates: {len(templates) / 1024:.1f}KB, {len(gzip.compress(templates)) / 1024:.1f}KB gzipped, served once")
+
+    print(f"{'rows':>8s} {'format':>8s} {'build':>10s} {'serialize':>10s} {'size':>10s} {'gzipped':>10s}")
+    for rows in args.rows_per_student:
+        bundle = FrameBundle.of(generate_student(rows))
+        for chart_format in CHART_FORMATS:
+            build_seconds, visualizations = best_of(lambda: build(generator, bundle, chart_format), args.repeat)
+            serialize_seconds, body = best_of(lambda: serialize(visualizations, chart_format), args.repeat)
+            print(
+                f"{rows:8d} {chart_format:>8s} {build_seconds * 1000:8.1f}ms {serialize_seconds * 1000:8.1f}ms "
+                f"{len(body) / 1024:8.1f}KB {len(gzip.compress(body)) / 1024:8.1f}KB"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Track import time and resident memory of app.main across commits.
+
+Each run imports app.main in fresh interpreters, records the median import
+time, peak RSS and which heavy modules were loaded, and appends the result to
+a JSON-lines history file so cold-start regressions show up over time.
+
+Run from the python_backend directory:
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+HEAVY_MODULES = ['torch', 'sklearn', 'matplotlib', 'seaborn', 'plotly', 'jinja2', 'pdfkit']
+
+DEFAULT_HISTORY = os.path.join(os.path.dirname(__file__), 'results', 'startup_history.jsonl')
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss_kb //= 1024
+print(json.dumps({
+    'import_seconds': elapsed,
+    'max_rss_mb': rss_kb / 1024,
+    'loaded': [name for name in %r if name in sys.modules]
+}))
+"""
+
+
+def measure_once() -> dict:
+    """Import app.main in a fresh interpreter and report the probe output."""
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE % HEAVY_MODULES],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def current_commit() -> str:
+    """Return the short hash of the checked-out commit, if available."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            check=True,
+            capture_output=True,
+            text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def load_previous(history_path: str) -> dict:
+    """Return the last recorded run, or an empty dict."""
+    if not os.path.exists(history_path):
+        return {}
+    with open(history_path) as history:
+        lines = [line for line in history if line.strip()]
+    return json.loads(lines[-1]) if lines else {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--history', default=DEFAULT_HISTORY)
+    parser.add_argument('--no-record', action='store_true', help="Print results without appending to the history")
+    args = parser.parse_args()
+
+    samples = [measure_once() for _ in range(args.runs)]
+    result = {
+        'timestamp': datetime.utcnow().isoformat(),
+        'commit': current_commit(),
+        'python': sys.version.split()[0],
+        'runs': args.runs,
+        'import_seconds': statistics.median(sample['import_seconds'] for sample in samples),
+        'max_rss_mb': statistics.median(sample['max_rss_mb'] for sample in samples),
+        'heavy_modules_loaded': samples[-1]['loaded']
+    }
+
+    previous = load_previous(args.history)
+
+    print(f"import app.main: {result['import_seconds'] * 1000:8.1f} ms (median of {args.runs})")
+    print(f"max RSS:         {result['max_rss_mb']:8.1f} MB")
+    print(f"heavy modules:   {', '.join(result['heavy_modules_loaded']) or 'none'}")
+    if previous:
+        print(
+            f"vs {previous['commit']}: "
+            f"{(result['import_seconds'] - previous['import_seconds']) * 1000:+.1f} ms, "
+            f"{result['max_rss_mb'] - previous['max_rss_mb']:+.1f} MB"
+        )
+
+    if not args.no_record:
+        os.makedirs(os.path.dirname(args.history), exist_ok=True)
+        with open(args.history, 'a') as history:
+            history.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main()
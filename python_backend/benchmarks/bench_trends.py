@@ -0,0 +1,86 @@
+"""Benchmark the closed-form trend engine against per-course LinearRegression fits.
+
+Run from the python_backend directory:
+
+    python -m benchmarks.bench_trends --courses 50 --rows-per-course 20000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from app.services.trend_engine import TrendEngine
+
+
+def make_grades(courses: int, rows_per_course: int, seed: int = 42, missing: float = 0.0) -> pd.DataFrame:
+    """Build a long-format grades frame with a mild drift per course and a ``missing`` share of NULL scores."""
+    rng = np.random.default_rng(seed)
+    course_ids = np.repeat([f"COURSE{i:03d}" for i in range(courses)], rows_per_course)
+    drift = np.tile(np.arange(rows_per_course), courses) * rng.normal(0, 0.001, len(course_ids))
+    scores = np.clip(rng.normal(75, 10, len(course_ids)) + drift, 0, 100)
+    scores[rng.random(len(scores)) < missing] = np.nan
+
+    # Shuffle so courses are interleaved like real submissions
+    order = rng.permutation(len(course_ids))
+    return pd.DataFrame({'course_id': course_ids[order], 'score': scores[order]})
+
+
+def regression_trends(grades: pd.DataFrame) -> dict:
+    """Reference implementation: one LinearRegression fit per course over its scored rows."""
+    engine = TrendEngine()
+    trends = {}
+    for course_id in grades['course_id'].unique():
+        values = grades[grades['course_id'] == course_id]['score'].values
+        scored = ~np.isnan(values)
+        x = np.arange(len(values))[scored].reshape(-1, 1)
+        model = LinearRegression()
+        model.fit(x, values[scored].reshape(-1, 1))
+        trends[course_id] = engine.classify_slope(model.coef_[0][0])
+    return trends
+
+
+def engine_trends(grades: pd.DataFrame) -> dict:
+    """Closed-form trends for every course from one grouped sum."""
+    return TrendEngine().grouped_trends(grades, ['course_id']).to_dict()
+
+
+def best_of(func, grades: pd.DataFrame, repeat: int) -> float:
+    """Return the fastest of several timed runs in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(grades)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--courses', type=int, default=50)
+    parser.add_argument('--rows-per-course', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    grades = make_grades(args.courses, args.rows_per_course)
+
+    if regression_trends(grades) != engine_trends(grades):
+        raise SystemExit("Trend labels differ between LinearRegression and the trend engine")
+
+    # NULL scores must be skipped, not counted as zero; short series make a miscount change the labels
+    with_missing = make_grades(args.courses, 50, seed=7, missing=0.02)
+    if regression_trends(with_missing) != engine_trends(with_missing):
+        raise SystemExit("Trend labels differ between LinearRegression and the trend engine with missing scores")
+
+    regression_time = best_of(regression_trends, grades, args.repeat)
+    engine_time = best_of(engine_trends, grades, args.repeat)
+
+    print(f"rows: {len(grades):,}  courses: {args.courses}")
+    print(f"LinearRegression per course: {regression_time * 1000:10.2f} ms")
+    print(f"Grouped closed form:         {engine_time * 1000:10.2f} ms")
+    print(f"Speedup:                     {regression_time / engine_time:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
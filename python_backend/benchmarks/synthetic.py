@@ -0,0 +1,124 @@
+"""Synthetic grades, attendance and study habits for the analytics benchmarks.
+
+Students draw a handful of courses from a shared catalog and keep them for
+the whole history. Each student has an ability, a score drift over time, an
+attendance propensity and a study pace, so per-course trends, attendance
+patterns and study patterns all vary the way real cohorts do. Everything is
+generated as columnar NumPy arrays from one seed, so runs are reproducible
+and 100M-row cohorts take seconds rather than minutes.
+
+    from benchmarks.synthetic import generate_cohort, student_data
+    tables = generate_cohort(students=1000, rows_per_student=500)
+    data = student_data(tables, student_id=0)
+"""
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+CATALOG_SIZE = 40
+COURSES_PER_STUDENT = (3, 6)
+GRADE_TYPES = np.array(['quiz', 'homework', 'project', 'exam'], dtype=object)
+GRADE_TYPE_WEIGHTS = [0.4, 0.35, 0.15, 0.1]
+ACTIVITY_TYPES = np.array(['reading', 'practice', 'review', 'lecture'], dtype=object)
+STATUSES = np.array(['present', 'late', 'absent'], dtype=object)
+START = np.datetime64('2021-08-25T00:00')
+
+
+def catalog(size: int = CATALOG_SIZE) -> np.ndarray:
+    """Return the course ids students draw from."""
+    return np.array([f"COURSE{i:03d}" for i in range(size)], dtype=object)
+
+
+def history_days(rows_per_student: int) -> int:
+    """Days a student's history spans, from a month for short ones to five years."""
+    return int(np.clip(rows_per_student // 2, 30, 5 * 365))
+
+
+def generate_cohort(students: int, rows_per_student: int, seed: int = 42, days: int = None) -> Dict[str, pd.DataFrame]:
+    """Generate long-format grades, attendance and study_habits frames.
+
+    Each table holds ``rows_per_student`` rows per student with a
+    ``student_id`` column from 0 to ``students - 1``, in date order within
+    each student as the loader returns them.
+    """
+    rng = np.random.default_rng(seed)
+    days = days or history_days(rows_per_student)
+    courses = catalog()
+
+    # Per-student traits
+    ability = rng.normal(72, 9, students)
+    drift = rng.normal(0, 8, students) / days  # points over the whole history
+    engagement = rng.beta(8, 1.5, students)
+    study_pace = rng.lognormal(np.log(45), 0.35, students)
+    course_count = rng.integers(COURSES_PER_STUDENT[0], COURSES_PER_STUDENT[1] + 1, students)
+    course_sets = np.argsort(rng.random((students, CATALOG_SIZE)), axis=1)[:, :COURSES_PER_STUDENT[1]]
+    course_offset = rng.normal(0, 5, CATALOG_SIZE)
+
+    def rows(table_seed: int):
+        """Student index, course index and date of every row of one table."""
+        table_rng = np.random.default_rng([seed, table_seed])
+        student = np.repeat(np.arange(students), rows_per_student)
+        slot = (table_rng.random(len(student)) * course_count[student]).astype(np.int64)
+        course = course_sets[student, slot]
+        minutes = np.sort(
+            table_rng.integers(0, days * 24 * 60, (students, rows_per_student)),
+            axis=1
+        ).ravel()
+        return table_rng, student, course, START + minutes.astype('timedelta64[m]')
+
+    # Grades drift over time around each student's ability and course difficulty
+    grade_rng, student, course, dates = rows(1)
+    elapsed = (dates - START).astype('timedelta64[D]').astype(np.float64)
+    scores = ability[student] + course_offset[course] + drift[student] * elapsed + grade_rng.normal(0, 8, len(student))
+    scores = np.clip(np.round(scores, 1), 0, 100)
+    scores[grade_rng.random(len(scores)) < 0.02] = np.nan  # ungraded submissions
+    grades = pd.DataFrame({
+        'student_id': student,
+        'course_id': courses[course],
+        'score': scores,
+        'max_score': 100.0,
+        'grade_type': GRADE_TYPES[grade_rng.choice(len(GRADE_TYPES), len(student), p=GRADE_TYPE_WEIGHTS)],
+        'date': dates
+    })
+
+    # Attendance follows each student's engagement, with more absences late in the week
+    attendance_rng, student, course, dates = rows(2)
+    weekday = (dates.astype('datetime64[D]').astype(np.int64) + 3) % 7
+    present = np.clip(engagement[student] - 0.03 * (weekday >= 4), 0, 1)
+    draw = attendance_rng.random(len(student))
+    status = np.where(draw < present, 0, np.where(draw < present + (1 - present) / 3, 1, 2))
+    attendance = pd.DataFrame({
+        'student_id': student,
+        'course_id': courses[course],
+        'status': STATUSES[status],
+        'date': dates
+    })
+
+    # Study sessions cluster in the evening around each student's pace
+    study_rng, student, course, dates = rows(3)
+    hours = np.clip(study_rng.normal(19, 3, len(student)), 6, 23.99)
+    dates = dates.astype('datetime64[D]') + (hours * 60).astype('timedelta64[m]')
+    study_habits = pd.DataFrame({
+        'student_id': student,
+        'subject': courses[course],
+        'duration': np.clip(np.round(study_rng.lognormal(np.log(study_pace[student]), 0.5)), 5, 240),
+        'activity_type': ACTIVITY_TYPES[study_rng.integers(0, len(ACTIVITY_TYPES), len(student))],
+        'date': dates
+    })
+
+    return {'grades': grades, 'attendance': attendance, 'study_habits': study_habits}
+
+
+def generate_student(rows: int, seed: int = 42, days: int = None) -> Dict[str, Any]:
+    """Generate one student's tables in the shape ``StudentDataLoader`` returns."""
+    return student_data(generate_cohort(1, rows, seed, days), 0)
+
+
+def student_data(tables: Dict[str, pd.DataFrame], student_id: int) -> Dict[str, Any]:
+    """Slice one student out of cohort frames as dicts of column arrays."""
+    data = {'id': student_id, 'student_id': f"SYN{student_id:06d}"}
+    for table, frame in tables.items():
+        rows = frame[frame['student_id'].to_numpy() == student_id]
+        data[table] = {column: rows[column].to_numpy() for column in rows.columns if column != 'student_id'}
+    return data
@@ -0,0 +1,179 @@
+"""Course aggregates are created race-free and only answer requests once they cover a student's history exactly."""
+from datetime import datetime
+import pandas as pd
+import pytest
+from sqlalchemy import delete, event, select
+from app.models.student import Grade, StudentCourseAggregate
+from app.services.aggregate_store import aggregate_store
+from app.services.analysis_cache import analysis_cache
+from tests.conftest import seed_students
+
+@pytest.fixture
+def folding(session_factory):
+    """Sessions whose flushes fold new rows into the aggregates, as in the API."""
+    sessions = []
+
+    def open_session():
+        session = session_factory()
+        event.listen(session, 'before_flush', aggregate_store._before_flush)
+        sessions.append(session)
+        return session
+
+    yield open_session
+    for session in sessions:
+        session.close()
+
+def add_grade(session, student_pk, score, course_id='MATH101', date=datetime(2024, 3, 1)):
+    grade = Grade(student_id=student_pk, course_id=course_id, score=score, max_score=100.0, grade_type='quiz', date=date, created_at=date)
+    session.add(grade)
+    session.commit()
+    return grade
+
+def stale_courses(db, student_pk):
+    db.expire_all()
+    return sorted(db.execute(select(StudentCourseAggregate.course_id).where(
+        StudentCourseAggregate.student_id == student_pk, StudentCourseAggregate.stale.is_(True)
+    )).scalars())
+
+def test_first_insert_tolerates_a_concurrently_created_aggregate(db, folding, monkeypatch):
+    [pk] = seed_students(db, 1, 0)
+    first, second = folding(), folding()
+    add_grade(first, pk, 80.0)
+
+    # The second session looked before the first one's record was visible
+    lock = aggregate_store._lock_aggregate
+    missed = []
+
+    def lock_after_missing_once(session, student_id, course_id):
+        if not missed:
+            missed.append(course_id)
+            return None
+        return lock(session, student_id, course_id)
+
+    monkeypatch.setattr(aggregate_store, '_lock_aggregate', lock_after_missing_once)
+    add_grade(second, pk, 90.0)
+
+    aggregates = db.execute(select(StudentCourseAggregate).where(StudentCourseAggregate.student_id == pk)).scalars().all()
+    assert len(aggregates) == 1
+    assert aggregates[0].grade_rows == 2
+    assert aggregates[0].grade_mean == pytest.approx(85.0)
+
+def test_aggregates_are_incomplete_until_backfilled(db, folding):
+    [pk] = seed_students(db, 1, 10)
+    add_grade(folding(), pk, 75.0)
+
+    assert not aggregate_store.is_complete(db, pk)
+
+    aggregate_store.backfill(db)
+
+    assert aggregate_store.is_complete(db, pk)
+
+def test_backfill_matches_incremental_folding(db, folding):
+    [pk] = seed_students(db, 1, 0)
+    session = folding()
+    for score in (70.0, None, 82.0, 91.0):
+        add_grade(session, pk, score, 'PHYS201')
+        add_grade(session, pk, score, 'MATH101')
+    incremental = aggregate_store.load_frame(db, pk).sort_values('course_id', ignore_index=True)
+
+    aggregate_store.backfill(db)
+    db.expire_all()
+
+    rebuilt = aggregate_store.load_frame(db, pk).sort_values('course_id', ignore_index=True)
+    pd.testing.assert_frame_equal(rebuilt, incremental)
+
+def test_improvement_areas_fall_back_to_full_analysis_until_backfilled(client, db, folding, queries):
+    [pk] = seed_students(db, 1, 30)
+    add_grade(folding(), pk, 40.0)
+
+    # Aggregates hold only the grade added after the history was written
+    partial = client.get('/api/performance/student/S0000/improvement-areas').json()
+
+    db.execute(delete(StudentCourseAggregate))
+    db.commit()
+    analysis_cache.clear()
+    full = client.get('/api/performance/student/S0000/improvement-areas').json()
+    assert partial == full
+
+    aggregate_store.backfill(db)
+    queries.reset()
+
+    response = client.get('/api/performance/student/S0000/improvement-areas')
+
+    assert response.status_code == 200
+    # Student, aggregates and the completeness check; no history table is read
+    assert queries.count == 3, queries.statements
+
+@pytest.mark.parametrize('change', ['score', 'course', 'delete'])
+def test_edits_and_deletions_mark_courses_stale_until_rebuilt(db, folding, change):
+    [pk] = seed_students(db, 1, 0)
+    session = folding()
+    grade = add_grade(session, pk, 70.0)
+    add_grade(session, pk, 80.0, 'PHYS201')
+    assert aggregate_store.is_complete(db, pk)
+
+    if change == 'score':
+        grade.score = 95.0
+    elif change == 'course':
+        grade.course_id = 'PHYS201'
+    else:
+        session.delete(grade)
+    session.commit()
+
+    assert stale_courses(db, pk) == (['MATH101'] if change != 'course' else ['MATH101', 'PHYS201'])
+    assert not aggregate_store.is_complete(db, pk)
+
+    aggregate_store.backfill(db, stale_only=True)
+
+    assert stale_courses(db, pk) == []
+    assert aggregate_store.is_complete(db, pk)
+
+def test_unfolded_edits_leave_aggregates_current(db, folding):
+    [pk] = seed_students(db, 1, 0)
+    session = folding()
+    grade = add_grade(session, pk, 70.0)
+
+    grade.grade_type = 'exam'
+    session.commit()
+
+    assert stale_courses(db, pk) == []
+
+def test_grades_dated_before_folded_ones_mark_the_course_stale(db, folding):
+    [pk] = seed_students(db, 1, 0)
+    session = folding()
+    add_grade(session, pk, 70.0, date=datetime(2024, 3, 1))
+    add_grade(session, pk, 75.0, date=datetime(2024, 3, 1))
+    add_grade(session, pk, 80.0, date=datetime(2024, 3, 8))
+    assert stale_courses(db, pk) == []
+
+    add_grade(session, pk, 60.0, date=datetime(2024, 3, 4))
+
+    assert stale_courses(db, pk) == ['MATH101']
+
+def test_stale_only_backfill_skips_current_students(db, folding):
+    first, second = seed_students(db, 2, 0)
+    session = folding()
+    add_grade(session, first, 70.0)
+    session.delete(add_grade(session, second, 80.0))
+    session.commit()
+
+    assert aggregate_store.backfill(db, stale_only=True)['students'] == 1
+
+def test_improvement_areas_fall_back_to_full_analysis_after_an_edit(client, db, folding, queries):
+    [pk] = seed_students(db, 1, 30)
+    aggregate_store.backfill(db)
+    session = folding()
+    grade = session.execute(select(Grade).where(Grade.student_id == pk).order_by(Grade.id)).scalars().first()
+    grade.score = 10.0
+    session.commit()
+    queries.reset()
+
+    edited = client.get('/api/performance/student/S0000/improvement-areas')
+
+    assert edited.status_code == 200
+    # The stale course sends the request through the history tables
+    assert queries.count > 3, queries.statements
+
+    aggregate_store.backfill(db)
+    analysis_cache.clear()
+    assert client.get('/api/performance/student/S0000/improvement-areas').json() == edited.json()
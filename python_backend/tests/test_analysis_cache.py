@@ -0,0 +1,39 @@
+"""The data version changes whenever another worker adds or deletes a student's rows."""
+from sqlalchemy import delete, insert, select
+from app.models.student import Attendance, Grade
+from app.services.analysis_cache import analysis_cache
+from tests.conftest import seed_students
+
+def test_version_changes_when_a_row_is_deleted(db):
+    [pk] = seed_students(db, 1, 10)
+    before = analysis_cache.data_version(db, pk)
+
+    # Core statements, as another worker's writes look to this one: no flush listener runs
+    oldest = db.execute(select(Grade.id).where(Grade.student_id == pk).order_by(Grade.created_at).limit(1)).scalar()
+    db.execute(delete(Grade).where(Grade.id == oldest))
+    db.commit()
+
+    assert analysis_cache.data_version(db, pk) != before
+
+def test_version_changes_when_a_backdated_row_is_added(db):
+    [pk] = seed_students(db, 1, 10)
+    before = analysis_cache.data_version(db, pk)
+    first = db.execute(select(Attendance).where(Attendance.student_id == pk).order_by(Attendance.created_at).limit(1)).scalar()
+
+    db.execute(insert(Attendance).values(student_id=pk, course_id=first.course_id, status='present', date=first.date, created_at=first.created_at))
+    db.commit()
+
+    assert analysis_cache.data_version(db, pk) != before
+
+def test_student_without_rows_has_no_version(db):
+    [pk] = seed_students(db, 1, 0)
+
+    assert analysis_cache.data_version(db, pk) is None
+
+def test_version_is_one_query(db, queries):
+    [pk] = seed_students(db, 1, 10)
+    queries.reset()
+
+    analysis_cache.data_version(db, pk)
+
+    assert queries.count == 1
@@ -0,0 +1,81 @@
+"""Coalesced analyses survive the request that started them, and charts are drawn without an analysis."""
+import asyncio
+from app.core import database
+from app.services.analysis_service import AnalysisService
+from app.services.student_data_loader import student_data_loader
+from app.api.routes.performance import PREDICTION_FIELDS
+from app.api.routes.reports import FULL_REPORT_FIELDS
+from tests.conftest import AsyncSessionAdapter, seed_students
+
+class ClosingSessionAdapter(AsyncSessionAdapter):
+    """Session that refuses work once closed, as a request's session does after it ends."""
+
+    closed = False
+
+    async def run_sync(self, func, *args, **kwargs):
+        assert not self.closed, 'session used after its request ended'
+        return await super().run_sync(func, *args, **kwargs)
+
+    async def close(self):
+        self.closed = True
+        await super().close()
+
+def test_follower_gets_result_after_leader_request_ends(db, session_factory, monkeypatch):
+    seed_students(db, 1, 20)
+    student = student_data_loader.load_student(db, 'S0000')
+    monkeypatch.setattr(database, 'AsyncSessionLocal', lambda: ClosingSessionAdapter(session_factory))
+    service = AnalysisService()
+    monkeypatch.setattr(service.executor, 'max_workers', 0)
+
+    load_for_student = student_data_loader.load_for_student
+
+    async def slow_load(*args):
+        await asyncio.sleep(0.05)
+        return await load_for_student(*args)
+
+    monkeypatch.setattr(student_data_loader, 'load_for_student', slow_load)
+
+    async def request():
+        async with database.AsyncSessionLocal() as request_db:
+            return await service.analyze(request_db, student['id'], student_data_loader.loader(student, PREDICTION_FIELDS), sections=['predictions'])
+
+    async def scenario():
+        leader = asyncio.ensure_future(request())
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(request())
+        await asyncio.sleep(0.01)
+
+        # The leader's client disconnects and its session closes mid-load
+        leader.cancel()
+        return await follower
+
+    results = asyncio.run(scenario())
+
+    assert service.single_flight.coalesced == 1
+    assert 'predictions' in results
+
+def test_visualizations_are_drawn_from_the_rows_alone(db, session_factory, monkeypatch):
+    seed_students(db, 1, 20)
+    student = student_data_loader.load_student(db, 'S0000')
+    monkeypatch.setattr(database, 'AsyncSessionLocal', lambda: AsyncSessionAdapter(session_factory))
+    service = AnalysisService()
+    monkeypatch.setattr(service.executor, 'max_workers', 0)
+    service.cache.clear()
+
+    async def visualizations():
+        async with database.AsyncSessionLocal() as request_db:
+            return await service.visualizations(request_db, student['id'], student_data_loader.loader(student, FULL_REPORT_FIELDS), 'compact')
+
+    async def full_report():
+        async with database.AsyncSessionLocal() as request_db:
+            return await service.full_report(request_db, student['id'], student_data_loader.loader(student, FULL_REPORT_FIELDS), 'compact')
+
+    async def no_analysis(*args, **kwargs):
+        raise AssertionError('visualizations ran an analysis')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(service, 'analyze', no_analysis)
+        charts = asyncio.run(visualizations())
+    service.cache.clear()
+
+    assert charts == asyncio.run(full_report())['visualizations']
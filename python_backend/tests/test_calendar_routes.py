@@ -0,0 +1,74 @@
+from datetime import datetime
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core import database
+from tests.conftest import AsyncSessionAdapter
+
+# The calendar router needs the Google client libraries and the auth module.
+pytest.importorskip('googleapiclient.discovery')
+auth = pytest.importorskip('app.core.auth')
+
+from app.api.routes import calendar
+from app.models.events import Base, CalendarSync, Event, EventType
+
+class FakeRequest:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+class FakeEvents:
+    """Stand-in for the Google Calendar ``events()`` resource."""
+
+    def __init__(self):
+        self.inserted = []
+
+    def insert(self, calendarId, body):
+        self.inserted.append((calendarId, body))
+        return FakeRequest({'id': f"google-{len(self.inserted)}"})
+
+class FakeUser:
+    id = 1
+
+@pytest.fixture
+def calendar_client(monkeypatch):
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    with session_factory() as session:
+        session.add(CalendarSync(user_id=FakeUser.id, google_calendar_id='primary', sync_status='active'))
+        session.commit()
+
+    async def get_async_db():
+        async with AsyncSessionAdapter(session_factory) as db:
+            yield db
+
+    events = FakeEvents()
+    monkeypatch.setattr(calendar.calendar_service, 'create_calendar_service', lambda credentials: None)
+    monkeypatch.setattr(calendar.calendar_service, 'service', type('Service', (), {'events': lambda self: events})(), raising=False)
+
+    app = FastAPI()
+    app.include_router(calendar.router, prefix='/api/calendar')
+    app.dependency_overrides[database.get_async_db] = get_async_db
+    app.dependency_overrides[auth.get_current_user] = lambda: FakeUser()
+    yield TestClient(app), session_factory, events
+    engine.dispose()
+
+def test_create_event_writes_through_run_sync(calendar_client):
+    client, session_factory, events = calendar_client
+    response = client.post('/api/calendar/events', json={
+        'title': 'Midterm', 'event_type': EventType.EXAM.value,
+        'start_time': datetime(2024, 3, 4, 9).isoformat(), 'end_time': datetime(2024, 3, 4, 11).isoformat(),
+    })
+
+    assert response.status_code == 200, response.text
+    assert response.json()['google_calendar_id'] == 'google-1'
+    assert events.inserted[0][0] == 'primary'
+    with session_factory() as session:
+        stored = session.query(Event).one()
+    assert (stored.title, stored.organizer_id) == ('Midterm', FakeUser.id)
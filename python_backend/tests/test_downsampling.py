@@ -0,0 +1,26 @@
+"""Downsampling honours every positive point cap, down to a single point."""
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.downsampling import downsample_mapping, downsample_series, lttb_indices
+
+@pytest.mark.parametrize('max_points, expected', [(1, [0]), (2, [0, 49])])
+def test_tiny_caps_keep_the_series_ends(max_points, expected):
+    x = np.arange(50, dtype=np.float64)
+    y = np.sin(x)
+
+    assert lttb_indices(x, y, max_points).tolist() == expected
+
+    dates = pd.Series(pd.date_range('2024-01-01', periods=50, freq='D'))
+    kept_x, kept_y = downsample_series(dates, pd.Series(y), max_points)
+    assert kept_x.index.tolist() == expected and len(kept_y) == max_points
+
+    mapping = downsample_mapping({date.strftime('%Y-%m-%d'): value for date, value in zip(dates, y)}, max_points)
+    assert len(mapping) == max_points
+
+def test_caps_of_three_or_more_return_exactly_that_many_points():
+    x = np.arange(50, dtype=np.float64)
+    indices = lttb_indices(x, np.cos(x), 3)
+
+    assert len(indices) == 3
+    assert indices[0] == 0 and indices[-1] == 49
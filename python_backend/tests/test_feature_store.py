@@ -0,0 +1,56 @@
+"""Stored prediction features are only served while their course aggregates are current."""
+import numpy as np
+import pytest
+from sqlalchemy import event, select
+from app.models.student import Grade
+from app.services.aggregate_store import aggregate_store
+from app.services.feature_store import feature_store
+from tests.conftest import seed_students
+
+@pytest.fixture
+def editing(session_factory):
+    """A session that folds changes into the aggregates and features, as in the API."""
+    session = session_factory()
+    event.listen(session, 'before_flush', aggregate_store._before_flush)
+    event.listen(session, 'before_flush', feature_store._before_flush)
+    yield session
+    session.close()
+
+def edit_first_grade(session, student_pk, score):
+    grade = session.execute(select(Grade).where(Grade.student_id == student_pk).order_by(Grade.id)).scalars().first()
+    grade.score = score
+    session.commit()
+    return grade.course_id
+
+def test_predictions_fall_back_to_full_analysis_after_an_edit(client, db, editing, queries):
+    [pk] = seed_students(db, 1, 30)
+    aggregate_store.backfill(db, after_rebuild=feature_store.rebuild_student)
+    queries.reset()
+
+    stored = client.get('/api/performance/student/S0000/predictions')
+
+    assert stored.status_code == 200
+    # Student, stored features and the completeness check
+    assert queries.count == 3, queries.statements
+
+    edit_first_grade(editing, pk, 10.0)
+    queries.reset()
+
+    edited = client.get('/api/performance/student/S0000/predictions')
+
+    assert edited.status_code == 200
+    assert queries.count > 3, queries.statements
+
+def test_load_matrix_leaves_out_stale_courses(db, editing):
+    _, second = seed_students(db, 2, 12)
+    aggregate_store.backfill(db, after_rebuild=feature_store.rebuild_student)
+    index, matrix = feature_store.load_matrix(db)
+    assert len(index) == 6
+
+    course_id = edit_first_grade(editing, second, 10.0)
+
+    stale_index, stale_matrix = feature_store.load_matrix(db)
+    assert (second, course_id) not in stale_index
+    kept = index.get_indexer(stale_index)
+    np.testing.assert_array_equal(stale_matrix, matrix[kept])
+    assert len(stale_index) == 5
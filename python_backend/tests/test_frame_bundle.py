@@ -0,0 +1,110 @@
+"""The frame bundle shares the loader's arrays, and no stage copies or mutates them."""
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from app.api.routes.reports import FULL_REPORT_FIELDS
+from app.services import analysis_tasks
+from app.services.frame_bundle import FrameBundle
+from app.services.performance_analyzer import DEFAULT_SECTIONS
+from app.services.student_data_loader import student_data_loader
+from tests.conftest import seed_students
+
+@pytest.fixture
+def loaded(db):
+    """A seeded student's payload as the loader returns it."""
+    seed_students(db, 1, 40)
+    student = student_data_loader.load_student(db, 'S0000')
+    return {**student, **student_data_loader.load_tables(db, student['id'], FULL_REPORT_FIELDS)}
+
+def column_buffer(values):
+    """The array holding a column's data: codes for categoricals, values otherwise."""
+    if isinstance(values, pd.Series):
+        values = values.array
+    if isinstance(values, pd.Categorical):
+        return values.codes
+    return np.asarray(values)
+
+def snapshot(loaded):
+    """Deep copies of every loaded column, to compare against after the stages run."""
+    return {
+        table: {column: column_buffer(values).copy() for column, values in loaded[table].items()}
+        for table in FULL_REPORT_FIELDS
+    }
+
+def assert_shares_loader_memory(bundle, loaded):
+    for table in FULL_REPORT_FIELDS:
+        frame = bundle.frame(table)
+        for column, values in loaded[table].items():
+            assert np.shares_memory(column_buffer(frame[column].array), column_buffer(values)), (table, column)
+
+def test_bundle_columns_share_loader_memory(loaded):
+    bundle = FrameBundle.of(loaded)
+
+    assert_shares_loader_memory(bundle, loaded)
+
+def test_lookups_share_memory_with_each_other(loaded):
+    bundle = FrameBundle.of(loaded)
+
+    first, second = bundle['grades'], bundle['grades']
+
+    assert first is not second
+    assert np.shares_memory(first['score'].to_numpy(), second['score'].to_numpy())
+    assert np.shares_memory(first['date'].to_numpy(), second['date'].to_numpy())
+
+def test_columns_are_read_only(loaded):
+    bundle = FrameBundle.of(loaded)
+
+    with pytest.raises(ValueError):
+        bundle.frame('grades')['score'].to_numpy()[0] = 0.0
+
+def test_frames_stay_read_only_after_pickling(loaded):
+    bundle = pickle.loads(pickle.dumps(FrameBundle.of(loaded)))
+
+    for table in FULL_REPORT_FIELDS:
+        for column, values in bundle.frame(table).items():
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                continue
+            assert not values.to_numpy().flags.writeable, (table, column)
+    with pytest.raises(ValueError):
+        bundle.frame('attendance')['date'].to_numpy()[0] = np.datetime64('2000-01-01')
+
+def test_adding_a_column_does_not_touch_the_bundle(loaded):
+    bundle = FrameBundle.of(loaded)
+
+    grades = bundle['grades']
+    grades['percentage'] = grades['score'] / grades['max_score']
+
+    assert 'percentage' not in bundle['grades']
+
+def test_bundle_is_built_once(loaded):
+    bundle = FrameBundle.of(loaded)
+
+    assert FrameBundle.of(bundle) is bundle
+
+def test_analysis_and_report_neither_copy_nor_mutate_the_shared_frames(loaded, monkeypatch):
+    before = snapshot(loaded)
+    bundle = FrameBundle.of(loaded)
+
+    built = []
+    original_init = FrameBundle.__init__
+
+    def counting_init(self, *args, **kwargs):
+        built.append(self)
+        original_init(self, *args, **kwargs)
+
+    monkeypatch.setattr(FrameBundle, '__init__', counting_init)
+
+    analysis_results = analysis_tasks.analyze_performance(bundle, DEFAULT_SECTIONS)
+    analysis_tasks.generate_report(bundle, analysis_results, 'compact')
+    analysis_tasks.generate_summary_report(bundle, analysis_results, 'compact')
+    analysis_tasks.generate_visualizations(bundle, 'compact')
+
+    # No stage rebuilt the bundle or swapped its arrays for copies
+    assert built == []
+    assert_shares_loader_memory(bundle, loaded)
+
+    # And none wrote into them
+    for table, columns in before.items():
+        for column, values in columns.items():
+            assert np.array_equal(column_buffer(loaded[table][column]), values, equal_nan=values.dtype.kind in 'fM'), (table, column)
@@ -0,0 +1,89 @@
+"""Prediction batches keep running until every caller has its result, and match per-student predictions."""
+import asyncio
+import gc
+import json
+import numpy as np
+import pytest
+from app.api.routes.performance import PREDICTION_FIELDS
+from app.services.frame_bundle import FrameBundle
+from app.services.performance_analyzer import PerformanceAnalyzer
+from app.services.prediction_batcher import PredictionBatcher
+from app.services.prediction_engine import FEATURE_COLUMNS, LATEST_FILE, MANIFEST_FILE, PredictionEngine
+from app.services.student_data_loader import student_data_loader
+from tests.conftest import seed_students
+
+class SlowExecutor:
+    """Executor that answers each student after a pause, long enough for a collection to run."""
+
+    async def run(self, func, students):
+        await asyncio.sleep(0.02)
+        return [{'student_id': student['student_id']} for student in students]
+
+def test_batches_are_held_until_they_finish():
+    batcher = PredictionBatcher(SlowExecutor(), max_batch_size=2, max_wait_ms=1)
+
+    async def scenario():
+        waiting = [asyncio.ensure_future(batcher.predict({'student_id': f"S{number}"})) for number in range(3)]
+        await asyncio.sleep(0.01)
+
+        # Both batches are in flight and referenced by the batcher alone
+        assert len(batcher._running) == 2
+        gc.collect()
+
+        results = await asyncio.gather(*waiting)
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert [result['student_id'] for result in results] == ['S0', 'S1', 'S2']
+    assert batcher._running == set()
+    assert batcher.stats()['batches'] == 2
+
+def write_model(directory):
+    """Write a one-tree forest and a linear network as version ``v1`` artifacts."""
+    features = len(FEATURE_COLUMNS)
+    arrays = {
+        'forest_roots': np.array([0]),
+        'forest_left': np.array([1, -1, -1]),
+        'forest_right': np.array([2, -1, -1]),
+        'forest_feature': np.array([FEATURE_COLUMNS.index('grade_mean'), 0, 0]),
+        'forest_threshold': np.array([75.0, 0.0, 0.0], dtype=np.float32),
+        'forest_value': np.array([[0.0, 0.0, 0.0], [62.0, 0.7, 40.0], [88.0, 0.95, 90.0]]),
+        'scaler_mean': np.zeros(features),
+        'scaler_scale': np.ones(features),
+        'network_w0': np.linspace(-0.05, 0.05, features)[None, :],
+        'network_b0': np.array([0.1]),
+        'target_mean': np.array([70.0, 0.8, 60.0]),
+        'target_scale': np.array([10.0, 0.1, 20.0])
+    }
+    version_dir = directory / 'v1'
+    version_dir.mkdir()
+    for name, values in arrays.items():
+        np.save(version_dir / f"{name}.npy", values)
+    (version_dir / MANIFEST_FILE).write_text(json.dumps({
+        'version': 'v1', 'trained_at': '2024-01-01T00:00:00', 'training_rows': 0, 'metrics': {},
+        'arrays': list(arrays), 'feature_columns': FEATURE_COLUMNS, 'network_layers': 1
+    }))
+    (directory / LATEST_FILE).write_text('v1')
+
+@pytest.mark.parametrize('model', [False, True], ids=['rule_based', 'trained'])
+def test_batched_predictions_equal_per_student_predictions(db, tmp_path, model):
+    if model:
+        write_model(tmp_path)
+    engine = PredictionEngine(artifact_dir=str(tmp_path))
+    assert engine.load() == model
+    analyzer = PerformanceAnalyzer(engine)
+
+    # Students with different row counts, including one with no rows at all
+    pks = seed_students(db, 3, 12) + seed_students(db, 1, 5, first=3) + seed_students(db, 1, 0, first=4)
+    batch = [FrameBundle.of(student_data_loader.load_tables(db, pk, PREDICTION_FIELDS)) for pk in pks]
+
+    batched = analyzer.predict_batch(batch)
+    single = [analyzer.analyze_performance(student_data, ['predictions'])['predictions'] for student_data in batch]
+
+    assert any(prediction for prediction in batched)
+    for batched_prediction, single_prediction in zip(batched, single, strict=True):
+        assert batched_prediction.keys() == single_prediction.keys()
+        # The stacked matrix product may round the last bit differently
+        for name, values in single_prediction.items():
+            assert batched_prediction[name] == pytest.approx(values, rel=1e-12)
@@ -0,0 +1,99 @@
+"""Loading a student's data and every student-data endpoint cost a fixed number of queries, however many rows the student has."""
+from datetime import datetime
+import pytest
+from app.services.cohort_ranks import cohort_rank_service
+from app.services.student_data_loader import ANALYSIS_FIELDS, TABLES, student_data_loader
+from tests.conftest import seed_students
+
+FIELDS = {
+    'analysis': ANALYSIS_FIELDS,
+    'every_table': {table: ('date' if table != 'assignments' else 'due_date',) for table in TABLES}
+}
+
+@pytest.mark.parametrize('rows', [5, 60])
+@pytest.mark.parametrize('fields', list(FIELDS))
+def test_load_query_count(db, queries, fields, rows):
+    seed_students(db, 1, rows)
+    queries.reset()
+
+    student = student_data_loader.load(db, 'S0000', FIELDS[fields])
+
+    for table, columns in FIELDS[fields].items():
+        assert all(len(student[table][column]) == rows for column in columns), table
+    # The student row, then one query per table
+    assert queries.count == 1 + len(FIELDS[fields]), queries.statements
+
+def test_unknown_student_costs_one_query(db, queries):
+    assert student_data_loader.load(db, 'missing', ANALYSIS_FIELDS) is None
+    assert queries.count == 1
+
+# Student lookup, data version, then one query per table the endpoint reads
+ENDPOINT_QUERIES = {
+    '/api/performance/student/S0000': 1 + 1 + 3,
+    '/api/performance/student/S0000/predictions': 1 + 1 + 1 + 3,  # plus the stored features lookup
+    '/api/performance/student/S0000/improvement-areas': 1 + 1 + 1 + 3,  # plus the aggregates lookup
+    '/api/performance/student/S0000/trends': 1 + 1 + 3,
+    '/api/performance/student/S0000/trends?period=all': 1 + 1 + 3,
+    '/api/reports/student/S0000/full-report?charts=compact': 1 + 1 + 5,
+    '/api/reports/student/S0000/summary-report?charts=compact': 1 + 1 + 3,
+    '/api/reports/student/S0000/recommendations-report': 1 + 1 + 3,
+    '/api/reports/student/S0000/visualizations?charts=compact': 1 + 1 + 3
+}
+
+@pytest.mark.parametrize('rows', [5, 60])
+@pytest.mark.parametrize('path', list(ENDPOINT_QUERIES))
+def test_endpoint_query_count(client, db, queries, path, rows):
+    seed_students(db, 1, rows)
+    queries.reset()
+
+    response = client.get(path)
+
+    assert response.status_code == 200, response.text
+    assert queries.count == ENDPOINT_QUERIES[path], queries.statements
+
+@pytest.mark.parametrize('path', list(ENDPOINT_QUERIES))
+def test_cached_endpoint_only_checks_version(client, db, queries, path):
+    seed_students(db, 1, 20)
+    assert client.get(path).status_code == 200
+    queries.reset()
+
+    assert client.get(path).status_code == 200
+
+    # Student lookup and data version, plus the features or aggregates lookup where the endpoint has one
+    expected = 3 if path.endswith(('/predictions', '/improvement-areas')) else 2
+    assert queries.count == expected, queries.statements
+
+@pytest.mark.parametrize('path', [path.split('?')[0] for path in ENDPOINT_QUERIES])
+def test_unknown_student_endpoint_costs_one_query(client, queries, path):
+    response = client.get(path.replace('S0000', 'missing'))
+
+    assert response.status_code == 404
+    assert queries.count == 1
+
+def test_ranks_query_count(client, db, queries, monkeypatch):
+    seed_students(db, 1, 20)
+    monkeypatch.setattr(cohort_rank_service, 'refreshed_at', datetime.utcnow())
+    queries.reset()
+
+    assert client.get('/api/performance/student/S0000/ranks').status_code == 200
+    assert queries.count == 1
+
+def test_at_risk_query_count(client, queries):
+    assert client.get('/api/performance/courses/MATH101/at-risk').status_code == 200
+    assert queries.count == 1
+
+@pytest.mark.parametrize('format', ['zip', 'ndjson'])
+@pytest.mark.parametrize('students', [3, 7])
+def test_bulk_query_count(client, db, queries, monkeypatch, format, students):
+    from app.services.bulk_reports import bulk_report_service
+
+    monkeypatch.setattr(bulk_report_service, 'chunk_size', 3)
+    seed_students(db, students, 10)
+    queries.reset()
+
+    response = client.post('/api/reports/bulk', json={'course_id': 'MATH101', 'format': format})
+
+    assert response.status_code == 200, response.text
+    # One query for the students, then one per table for each chunk of three
+    chunks = -(-students // 3)
+    assert queries.count == 1 + 5 * chunks, queries.statements
@@ -0,0 +1,23 @@
+"""Grade trends are plotted and downsampled in date order, whatever order the rows arrive in."""
+import numpy as np
+import pandas as pd
+from app.services.report_generator import ReportGenerator
+
+def test_grade_trend_is_downsampled_in_date_order():
+    rng = np.random.default_rng(3)
+    dates = pd.date_range('2024-01-01', periods=200, freq='D')
+    order = rng.permutation(len(dates))
+    grades = pd.DataFrame({
+        'course_id': 'MATH101',
+        'date': dates[order],
+        'score': rng.uniform(50, 100, len(dates))[order]
+    })
+
+    chart = ReportGenerator()._create_grade_trend_plot(grades, 'compact', max_points=20)
+
+    [series] = chart['series']
+    x = pd.to_datetime(series['x'])
+    assert len(x) == 20
+    assert x.is_monotonic_increasing
+    # LTTB keeps both ends of the series
+    assert x[0] == dates[0] and x[-1] == dates[-1]
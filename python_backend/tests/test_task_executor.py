@@ -0,0 +1,49 @@
+"""Pool slots stay taken until the worker is done, and a broken pool is replaced."""
+import asyncio
+import os
+import time
+import pytest
+from app.services.task_executor import AnalysisExecutor, ExecutorBrokenError, ExecutorSaturatedError, ExecutorTimeoutError
+
+def nap(seconds):
+    time.sleep(seconds)
+    return seconds
+
+def crash():
+    os._exit(1)
+
+@pytest.fixture
+def executor():
+    executor = AnalysisExecutor(max_workers=1, max_queue_depth=0, task_timeout=5)
+    yield executor
+    executor.shutdown()
+
+def test_timed_out_tasks_hold_their_slot_until_the_worker_finishes(executor):
+    async def scenario():
+        # Start the worker first so the timeout only covers the task itself
+        await executor.run(nap, 0)
+
+        with pytest.raises(ExecutorTimeoutError):
+            await executor.run(nap, 0.5, timeout=0.05)
+        assert executor.pending == 1
+        with pytest.raises(ExecutorSaturatedError):
+            await executor.run(nap, 0)
+
+        await asyncio.sleep(1)
+        assert executor.pending == 0
+        return await executor.run(nap, 0)
+
+    assert asyncio.run(scenario()) == 0
+    assert executor.stats()['timed_out'] == 1
+
+def test_a_crashed_worker_fails_its_task_and_the_pool_is_replaced(executor):
+    async def scenario():
+        with pytest.raises(ExecutorBrokenError):
+            await executor.run(crash)
+        return await executor.run(nap, 0)
+
+    assert asyncio.run(scenario()) == 0
+    stats = executor.stats()
+    assert stats['pool_restarts'] == 1
+    assert stats['failed'] == 1 and stats['completed'] == 1
+    assert executor.pending == 0
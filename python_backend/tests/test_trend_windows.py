@@ -0,0 +1,47 @@
+"""Trends windows accept timezone-aware bounds, and their rows are read in date order."""
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert
+import numpy as np
+import pytest
+from app.models.student import Grade
+from app.services.student_data_loader import student_data_loader
+from app.services.trend_windows import TrendWindowError, resolve_window
+from tests.conftest import seed_students
+
+NOW = datetime(2024, 6, 1, 12)
+
+def test_aware_custom_bounds_become_naive_utc():
+    start = datetime(2024, 3, 1, 2, tzinfo=timezone(timedelta(hours=2)))
+    end = datetime(2024, 4, 1, tzinfo=timezone.utc)
+
+    window = resolve_window('custom', NOW, start=start, end=end)
+
+    assert window.start == datetime(2024, 3, 1, 0)
+    assert window.end == datetime(2024, 4, 1)
+
+def test_aware_start_compares_with_the_naive_default_end():
+    with pytest.raises(TrendWindowError):
+        resolve_window('custom', NOW, start=datetime(2024, 7, 1, tzinfo=timezone.utc))
+
+def test_aware_start_date_is_accepted_by_the_endpoint(client, db):
+    seed_students(db, 1, 5)
+
+    response = client.get('/api/performance/student/S0000/trends', params={'period': 'custom', 'start_date': '2024-01-01T00:00:00+02:00'})
+
+    assert response.status_code == 200, response.text
+    assert response.json()['start_date'] == '2023-12-31T22:00:00'
+
+def test_rows_load_in_date_order_whatever_order_they_were_recorded(db):
+    [pk] = seed_students(db, 1, 0)
+    dates = [datetime(2024, 3, day) for day in (5, 1, 3, 1)]
+    db.execute(insert(Grade), [
+        {'student_id': pk, 'course_id': 'MATH101', 'assignment_id': f"A{number}", 'score': float(number), 'max_score': 100.0, 'grade_type': 'quiz', 'date': date, 'created_at': date}
+        for number, date in enumerate(dates)
+    ])
+    db.commit()
+
+    grades = student_data_loader.load_tables(db, pk, {'grades': ('score', 'date')})['grades']
+
+    assert np.all(np.diff(grades['date']) >= np.timedelta64(0))
+    # Rows on the same date keep their recorded order
+    assert grades['score'].tolist() == [1.0, 3.0, 2.0, 0.0]